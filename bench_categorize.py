@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Микро-бенчмарк категоризации: прежний вложенный цикл `keyword in content`
+против KeywordCategorizer (server/utils/categorize.py).
+
+Замеры выполняются на ключевых словах сервиса и на расширенном наборе
+(ключевые слова с синтетическими суффиксами), чтобы показать зависимость
+от числа ключевых слов: прежний алгоритм растет линейно, автомат - нет.
+"""
+
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server.utils.categorize import KeywordCategorizer
+
+PRIORITY = ['gifts', 'crypto', 'nft', 'tech', 'community']
+
+KEYWORDS = {
+    'gifts': [
+        'подарок', 'подарки', 'бесплатно', 'халява', 'промокод', 'скидка',
+        'акция', 'розыгрыш', 'бонус', 'даром', 'гифт', 'gift', 'freebie',
+        'раздача', 'конкурс', 'приз', 'награда', 'cashback', 'кэшбек'
+    ],
+    'nft': [
+        'nft', 'нфт', 'токен', 'коллекция', 'мета', 'opensea', 'digital art',
+        'коллекционный', 'цифровое искусство', 'метавселенная', 'avatar',
+        'аватар', 'pfp', 'mint', 'минт', 'drop', 'дроп', 'rare', 'раритет'
+    ],
+    'crypto': [
+        'криптовалюта', 'биткоин', 'bitcoin', 'ethereum', 'блокчейн', 'деф',
+        'defi', 'торги', 'курс', 'btc', 'eth', 'usdt', 'binance', 'трейдинг',
+        'стейкинг', 'майнинг', 'altcoin', 'альткоин', 'pump', 'dump', 'hodl'
+    ],
+    'tech': [
+        'технологии', 'it', 'ит', 'программирование', 'разработка', 'стартап',
+        'инновации', 'ai', 'ии', 'machine learning', 'блокчейн', 'веб3',
+        'app', 'приложение', 'software', 'hardware', 'gadget', 'гаджет'
+    ],
+    'community': [
+        'сообщество', 'чат', 'общение', 'форум', 'дискуссия', 'мнение',
+        'обсуждение', 'новости', 'анонс', 'встреча', 'event', 'мероприятие'
+    ]
+}
+
+TEXTS = [
+    "🎁 Новые бесплатные подарки в Telegram! Успейте забрать лимитированные гифты до конца недели",
+    "📈 Bitcoin снова выше $70k, альткоины догоняют. Обзор рынка за день #btc #crypto",
+    "NFT коллекция Plush Pepe распродана за 3 минуты. Минт следующего дропа в пятницу",
+    "TON Foundation анонсировала новую программу грантов для разработчиков мини-приложений",
+    "Обсуждение в чате: какие подарки стоит держать, а какие продавать? Делитесь мнением",
+] * 200
+
+
+def legacy_categorize(keywords, title, description=""):
+    """Прежний алгоритм TelegramNewsService.categorize_content"""
+    content = (title + " " + description).lower()
+    category_scores = {}
+    for category, words in keywords.items():
+        score = sum(1 for keyword in words if keyword in content)
+        if score > 0:
+            category_scores[category] = score
+    if not category_scores:
+        return 'general'
+    max_score = max(category_scores.values())
+    best_categories = [cat for cat, score in category_scores.items() if score == max_score]
+    for priority_cat in PRIORITY:
+        if priority_cat in best_categories:
+            return priority_cat
+    return list(category_scores.keys())[0]
+
+
+def expand(keywords, factor):
+    """Расширенный набор ключевых слов: каждое слово плюс factor-1 синтетических вариантов"""
+    return {
+        category: words + [f"{word}{suffix}x" for word in words for suffix in range(1, factor)]
+        for category, words in keywords.items()
+    }
+
+
+def measure(func, texts, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            func(text)
+    return (time.perf_counter() - started) / (rounds * len(texts)) * 1e6
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    for factor in (1, 10):
+        keywords = expand(KEYWORDS, factor)
+        total = sum(len(words) for words in keywords.values())
+
+        started = time.perf_counter()
+        categorizer = KeywordCategorizer(keywords, priority=PRIORITY)
+        build_ms = (time.perf_counter() - started) * 1e3
+
+        legacy = measure(lambda text: legacy_categorize(keywords, text), TEXTS, rounds)
+        automaton = measure(categorizer.categorize, TEXTS, rounds)
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            categorizer.categorize_many(TEXTS)
+        batch = (time.perf_counter() - started) / (rounds * len(TEXTS)) * 1e6
+
+        print(f"Ключевых слов: {total} (построение автомата {build_ms:.1f} мс)")
+        print(f"  прежний цикл:        {legacy:7.2f} мкс/текст")
+        print(f"  автомат:             {automaton:7.2f} мкс/текст ({legacy / automaton:.2f}x)")
+        print(f"  автомат, пакетно:    {batch:7.2f} мкс/текст")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк сжатия страницы списка новостей (100 элементов): размер на проводе и
+процессорное время на ответ для gzip разных уровней и brotli разных качеств,
+а также стоимость ответа из кэша с заранее сжатым телом
+(server/utils/compression.py:encoded_body). БД не используется.
+"""
+
+import sys
+import os
+import gzip
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bench_serialization import META, PAGE_SIZE, make_rows
+from server.api.news import LIST_FIELDS, SUMMARY_FIELDS, render_list_body
+from server.utils.compression import brotli, encoded_body
+
+GZIP_LEVELS = (1, 6, 9)
+BROTLI_QUALITIES = (1, 4, 5, 6, 11)
+
+
+def measure(func, rounds):
+    func()
+    started = time.process_time()
+    for _ in range(rounds):
+        result = func()
+    return (time.process_time() - started) / rounds * 1e3, result
+
+
+def report(title, body, rounds):
+    print(f"{title}: {len(body)} байт, раундов: {rounds}")
+    variants = [(f"gzip -{level}", lambda level=level: gzip.compress(body, compresslevel=level, mtime=0))
+                for level in GZIP_LEVELS]
+    if brotli is not None:
+        variants += [(f"brotli q{quality}",
+                      lambda quality=quality: brotli.compress(body, quality=quality, mode=brotli.MODE_TEXT))
+                     for quality in BROTLI_QUALITIES]
+    for name, func in variants:
+        elapsed, data = measure(func, rounds)
+        print(f"  {name:12s} {len(data):8d} байт ({len(data) / len(body):6.1%}) {elapsed:8.3f} мс CPU")
+
+    accept = 'br, gzip' if brotli is not None else 'gzip'
+    cached = {}
+    encoded_body(body, accept, cached)
+    elapsed, (data, _) = measure(lambda: encoded_body(body, accept, cached), rounds * 100)
+    print(f"  {'из кэша':12s} {len(data):8d} байт ({len(data) / len(body):6.1%}) {elapsed:8.4f} мс CPU")
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rows = make_rows(PAGE_SIZE)
+    report("Страница (view=full)", render_list_body(rows, LIST_FIELDS, 'full', META), rounds)
+    report("Страница (view=summary)", render_list_body(rows, SUMMARY_FIELDS, 'summary', META), rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк расписания опроса: прежний цикл раз в час против адаптивного
+PollScheduler (server/services/poll_scheduler.py) на смоделированных источниках.
+
+Посты источников - пуассоновские потоки с разной частотой (от десятков в час до
+одного в неделю, с дневным циклом). Время модельное, сеть и БД не используются.
+Показывает число запросов и задержку между публикацией поста и его загрузкой.
+"""
+
+import sys
+import os
+import math
+import random
+import statistics
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server.services.poll_scheduler import NOT_MODIFIED, OK, PollScheduler
+
+DAYS = 14
+HISTORY_DAYS = 7
+# Постов в час: горячие каналы, средние, редкие
+SOURCE_RATES = [30, 12, 6, 3, 2, 1, 1, 0.5, 0.3, 0.2, 0.1, 0.05, 0.02, 0.01, 1 / 168, 1 / 168, 1 / 336]
+
+
+def generate_posts(rate_per_hour, seconds, rng):
+    """Моменты публикаций: пуассоновский поток, ночью в 4 раза реже"""
+    posts, t = [], 0.0
+    peak = rate_per_hour / 3600 * 1.6
+    while True:
+        t += rng.expovariate(peak)
+        if t >= seconds:
+            return posts
+        hour = (t / 3600) % 24
+        if rng.random() < (0.25 if hour < 7 else 1.0):
+            posts.append(t)
+
+
+def fixed_schedule(sources, seconds, interval=3600):
+    fetches, delays = 0, []
+    for posts in sources.values():
+        for post in posts:
+            delays.append(math.ceil(post / interval) * interval - post)
+        fetches += int(seconds // interval) + 1
+    return fetches, delays
+
+
+def adaptive_schedule(sources, history, seconds, rng):
+    now = [0.0]
+    scheduler = PollScheduler(clock=lambda: now[0])
+    scheduler._random = rng
+    for name, posts in history.items():
+        scheduler.add(name, len(posts) / (HISTORY_DAYS * 86400))
+
+    position = {name: 0 for name in sources}
+    fetches, delays = 0, []
+    while True:
+        now[0] += scheduler.next_run_in()
+        if now[0] > seconds:
+            break
+        for name in scheduler.pop_due(window=0):
+            posts = sources[name]
+            start = position[name]
+            while position[name] < len(posts) and posts[position[name]] <= now[0]:
+                delays.append(now[0] - posts[position[name]])
+                position[name] += 1
+            fetches += 1
+            new_items = position[name] - start
+            scheduler.record(name, OK if new_items else NOT_MODIFIED, new_items)
+    return fetches, delays
+
+
+def describe(label, fetches, delays):
+    delays = sorted(delays)
+    p95 = delays[int(len(delays) * 0.95)] if delays else 0.0
+    print(f"{label:<22} запросов {fetches:6d}   задержка: средняя {statistics.mean(delays) / 60:6.1f} мин, "
+          f"p95 {p95 / 60:6.1f} мин")
+
+
+def main():
+    seed = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    rng = random.Random(seed)
+    seconds = DAYS * 86400
+    history = {f"source_{i}": generate_posts(rate, HISTORY_DAYS * 86400, rng) for i, rate in enumerate(SOURCE_RATES)}
+    sources = {f"source_{i}": generate_posts(rate, seconds, rng) for i, rate in enumerate(SOURCE_RATES)}
+
+    print(f"Источников: {len(sources)}, постов за {DAYS} дней: {sum(map(len, sources.values()))}")
+    describe("раз в час (прежний)", *fixed_schedule(sources, seconds))
+    describe("адаптивный", *adaptive_schedule(sources, history, seconds, rng))
+
+    hot = {name: sources[name] for name in list(sources)[:3]}
+    hot_history = {name: history[name] for name in hot}
+    print("Три самых частых источника:")
+    describe("  раз в час (прежний)", *fixed_schedule(hot, seconds))
+    describe("  адаптивный", *adaptive_schedule(hot, hot_history, seconds, rng))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк сериализации страницы списка новостей (100 элементов):
+Pydantic (NewsResponse / NewsItemResponse, прежний путь), json.dumps словарей,
+orjson.dumps словарей и сборка ответа из кэша JSON фрагментов
+(server/api/news.py:render_list_body). БД не используется.
+"""
+
+import sys
+import os
+import json
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import orjson
+
+from server.api.news import LIST_FIELDS, list_item, render_list_body
+from server.models import NewsResponse, NewsItemResponse
+from server.utils.cache import news_fragment_cache
+
+PAGE_SIZE = 100
+
+
+class Row:
+    """Строка проекции списка (как sqlalchemy Row: доступ по атрибутам и через _mapping)"""
+
+    def __init__(self, mapping):
+        self._mapping = mapping
+        self.__dict__.update(mapping)
+
+
+def make_rows(count):
+    now = datetime(2026, 10, 1, 12, 0)
+    rows = []
+    for i in range(count):
+        content = f"Новость {i}: обзор подарков, NFT и криптовалют в Telegram. " * 5
+        rows.append(Row({
+            'id': i + 1,
+            'title': f"Новые подарки в Telegram, выпуск {i}",
+            'content': content,
+            'content_html': f"<p>{content}</p>" * 2,
+            'link': f"https://t.me/gift_newstg/{1000 + i}",
+            'publish_date': now - timedelta(minutes=i),
+            'category': 'gifts',
+            'media': [{'type': 'photo', 'url': f"https://cdn.example/{i}.jpg", 'thumbnail': None}],
+            'reading_time': 1,
+            'views_count': 100 + i,
+            'author': 'Gift News TG',
+            'source_name': 'Gift News TG',
+            'source_url': 'https://t.me/gift_newstg',
+            'source__id': 1,
+            'source__name': 'Gift News TG',
+            'source__url': 'https://t.me/gift_newstg',
+            'source__source_type': 'telegram',
+            'source__category': 'gifts',
+            'source__is_active': True,
+            'row_updated_at': now,
+        }))
+    return rows
+
+
+META = {'total': None, 'page': 1, 'pages': None, 'next_cursor': None}
+
+
+def pydantic_page(rows):
+    """Прежний путь: валидация и сериализация моделями Pydantic"""
+    return NewsResponse(
+        data=[NewsItemResponse(**list_item(row, LIST_FIELDS)) for row in rows],
+        **META
+    ).model_dump_json().encode()
+
+
+def json_page(rows):
+    data = [list_item(row, LIST_FIELDS) for row in rows]
+    return json.dumps({'data': data, **META}, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def orjson_page(rows):
+    return orjson.dumps({'data': [list_item(row, LIST_FIELDS) for row in rows], **META})
+
+
+def fragments_page(rows):
+    return render_list_body(rows, LIST_FIELDS, 'full', META)
+
+
+def measure(func, rows, rounds):
+    func(rows)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func(rows)
+    return (time.perf_counter() - started) / rounds * 1e3
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rows = make_rows(PAGE_SIZE)
+
+    # Все варианты дают один и тот же JSON
+    expected = json.loads(pydantic_page(rows))
+    for func in (json_page, orjson_page, fragments_page):
+        assert json.loads(func(rows)) == expected, func.__name__
+
+    print(f"Страница: {PAGE_SIZE} новостей, {len(orjson_page(rows))} байт, раундов: {rounds}")
+    baseline = measure(pydantic_page, rows, rounds)
+    results = [
+        ("Pydantic (прежний)", baseline),
+        ("json.dumps", measure(json_page, rows, rounds)),
+        ("orjson.dumps", measure(orjson_page, rows, rounds)),
+        ("фрагменты (кэш)", measure(fragments_page, rows, rounds)),
+    ]
+    for name, elapsed in results:
+        print(f"  {name:20s} {elapsed:7.3f} мс/страница ({baseline / elapsed:5.1f}x)")
+    print(f"  кэш фрагментов: {news_fragment_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк поиска почти-дубликатов: SimHashIndex (server/utils/simhash.py)
+против перебора всех отпечатков окна.
+
+Отпечатки окна - синтетические тексты (словарь с распределением Ципфа-Мандельброта); запросы - измененные
+копии (эмодзи, ссылка, замена слова) части новостей окна и новые тексты.
+Показывает время поиска и число проверенных кандидатов для окон разного размера
+и долю найденных измененных копий. БД не используется.
+"""
+
+import sys
+import os
+import random
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server.config import NEWS_DEDUP_MAX_DISTANCE
+from server.utils.simhash import SimHashIndex, hamming_distance, simhash
+
+# Синтетический словарь с распределением Ципфа-Мандельброта (вес 1 / (ранг + 3)):
+# частые слова общие для всех текстов, как предлоги и термины в реальной ленте.
+# Параметры подобраны так, чтобы расстояния между отпечатками несвязанных текстов
+# были как у абзацев естественного текста (медиана ~28-30 бит)
+LETTERS = "абвгдежзийклмнопрстуфхцчшщыьэюя"
+VOCABULARY_SIZE = 20000
+WINDOWS = (1000, 10000, 50000)
+QUERIES = 500
+
+
+def make_vocabulary(rng):
+    words = {''.join(rng.choices(LETTERS, k=rng.randint(2, 10))) for _ in range(VOCABULARY_SIZE * 2)}
+    words = sorted(words)[:VOCABULARY_SIZE]
+    rng.shuffle(words)
+    return words, [1 / (rank + 3) for rank in range(len(words))]
+
+
+def make_text(rng, vocabulary):
+    words, weights = vocabulary
+    return ' '.join(rng.choices(words, weights, k=rng.randint(8, 60)))
+
+
+def repost(rng, text, vocabulary):
+    """Репост: эмодзи, ссылка, упоминание канала и замена одного слова"""
+    words = text.split()
+    words[rng.randrange(len(words))] = rng.choices(*vocabulary)[0]
+    return "🎁🔥 " + ' '.join(words) + " Подписывайтесь: https://t.me/giftnews @giftnews"
+
+
+def linear_find(hashes, value, max_distance):
+    best = None
+    for key, other in hashes.items():
+        distance = hamming_distance(value, other)
+        if distance <= max_distance and (best is None or distance < best[1]):
+            best = (key, distance)
+    return best
+
+
+def main():
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(rng)
+    texts = [make_text(rng, vocabulary) for _ in range(max(WINDOWS))]
+
+    started = time.perf_counter()
+    hashes = [simhash(text) for text in texts]
+    per_text = (time.perf_counter() - started) / len(texts) * 1e3
+    print(f"SimHash: {per_text:.3f} мс/текст, расстояние: {NEWS_DEDUP_MAX_DISTANCE}")
+
+    for window in WINDOWS:
+        index = SimHashIndex(NEWS_DEDUP_MAX_DISTANCE, window)
+        by_key = {}
+        for key in range(window):
+            index.add(key, hashes[key])
+            by_key[key] = hashes[key]
+
+        reposted = [rng.randrange(window) for _ in range(QUERIES // 2)]
+        queries = [(key, simhash(repost(rng, texts[key], vocabulary))) for key in reposted]
+        queries += [(None, simhash(make_text(rng, vocabulary))) for _ in range(QUERIES - len(queries))]
+
+        started = time.perf_counter()
+        found = [index.find(value) for _, value in queries]
+        indexed = (time.perf_counter() - started) / len(queries) * 1e3
+
+        started = time.perf_counter()
+        expected = [linear_find(by_key, value, NEWS_DEDUP_MAX_DISTANCE) for _, value in queries]
+        linear = (time.perf_counter() - started) / len(queries) * 1e3
+
+        assert [item and item[1] for item in found] == [item and item[1] for item in expected]
+        recall = sum(1 for (key, _), item in zip(queries, found) if key is not None and item and item[0] == key)
+        false_matches = sum(1 for (key, _), item in zip(queries, found) if key is None and item)
+        print(f"  окно {window:6d}: индекс {indexed:7.3f} мс, перебор {linear:7.3f} мс "
+              f"({linear / indexed:5.1f}x), кандидатов {index.stats()['candidates_per_lookup']:7.1f}, "
+              f"найдено репостов {recall}/{len(reposted)}, ложных {false_matches}")
+
+
+if __name__ == "__main__":
+    main()
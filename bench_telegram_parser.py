@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк парсера страниц t.me/s/<channel>: прежний regex-парсер против
+однопроходного парсера server/parsers/telegram_html.py на сохраненных страницах
+из fixtures/telegram. Выводит пропускную способность в страницах в секунду.
+
+Каждый парсер измеряется несколько раз поочередно, берется лучший результат
+(как в timeit): отдельные прогоны отличаются на десятки процентов из-за
+нагрузки на машину. Запуск: python bench_telegram_parser.py [раундов] [повторов].
+На двух страницах fixtures/telegram ускорение 2.0-2.8x в зависимости от
+машины и прогона.
+"""
+
+import sys
+import os
+import re
+import glob
+import time
+from html import unescape
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from server.parsers.telegram_html import parse_telegram_page
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'telegram')
+
+
+def legacy_parse(html_content):
+    """Прежний алгоритм _parse_telegram_html (только извлечение, без сборки постов)"""
+    post_pattern = r'<div class="tgme_widget_message.*?</div>\s*</div>\s*</div>'
+    text_pattern = r'<div class="tgme_widget_message_text.*?".*?>(.*?)</div>'
+    date_pattern = r'<time.*?datetime="([^"]+)"'
+    photo_pattern = r'<a.*?class="tgme_widget_message_photo_wrap.*?style="background-image:url\(&quot;([^&]+)&quot;\)"'
+    video_pattern = r'<video.*?src="([^"]+)".*?poster="([^"]*)".*?>'
+    video_thumb_pattern = r'<video.*?poster="([^"]+)".*?>'
+
+    results = []
+    for post_html in re.findall(post_pattern, html_content, re.DOTALL):
+        text_match = re.search(text_pattern, post_html, re.DOTALL)
+        text = unescape(re.sub(r'<[^>]+>', '', text_match.group(1))) if text_match else ""
+        re.search(date_pattern, post_html)
+        re.search(photo_pattern, post_html)
+        if not re.search(video_pattern, post_html):
+            re.search(video_thumb_pattern, post_html)
+        results.append(text)
+    return results
+
+
+def measure(parse, pages, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for page in pages:
+            parse(page)
+    elapsed = time.perf_counter() - started
+    return rounds * len(pages) / elapsed
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    pages = [open(path, encoding='utf-8').read() for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html')))]
+    if not pages:
+        print(f"Нет страниц в {FIXTURES_DIR}")
+        return
+
+    print(f"Страниц: {len(pages)}, средний размер: {sum(map(len, pages)) // len(pages)} символов, "
+          f"раундов: {rounds}, повторов: {repeat}")
+    print(f"Сообщений (новый парсер): {sum(len(parse_telegram_page(p)) for p in pages)}")
+
+    legacy = single_pass = 0.0
+    for _ in range(repeat):
+        legacy = max(legacy, measure(legacy_parse, pages, rounds))
+        single_pass = max(single_pass, measure(parse_telegram_page, pages, rounds))
+
+    print(f"regex (прежний):      {legacy:8.1f} страниц/с")
+    print(f"однопроходный:        {single_pass:8.1f} страниц/с")
+    print(f"ускорение:            {single_pass / legacy:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Локальная подмена t.me для проверки загрузки Telegram каналов без сети.
+
+Отдает страницы /s/<channel> из сохраненных страниц fixtures/telegram с той же
+пагинацией, что и t.me: без параметров - последние сообщения, ?before=<id> -
+сообщения старше id, ?after=<id> - сообщения новее id (сообщения на странице
+от старых к новым). Поддерживает ETag / If-None-Match.
+
+Лента воспроизводится: при --initial N сначала видны только N первых сообщений
+каждого канала, остальные "публикуются" запросом POST /_publish/<channel>?count=K
+(или POST /_publish для всех каналов). GET /_stats - число запросов по путям.
+
+Запуск:
+    python fake_telegram.py --port 8081 --page-size 5 --initial 8
+    TELEGRAM_BASE_URL=http://127.0.0.1:8081 uvicorn server.main:app
+"""
+
+import os
+import sys
+import glob
+import hashlib
+import argparse
+from collections import Counter
+
+from aiohttp import web
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'telegram')
+
+_MESSAGE_MARKER = '<div class="tgme_widget_message_wrap'
+_POST_MARKER = 'data-post="'
+_HISTORY_END = '</section>'
+
+
+class FixtureChannel:
+    """Страница канала, разобранная на шапку, сообщения и подвал"""
+
+    def __init__(self, html_content: str):
+        first = html_content.find(_MESSAGE_MARKER)
+        end = html_content.rfind(_HISTORY_END)
+        if first == -1 or end == -1:
+            raise ValueError("на странице нет сообщений")
+        self.head = html_content[:first]
+        self.tail = html_content[end:]
+
+        # (id, html) в порядке страницы
+        self.messages = []
+        starts = []
+        index = first
+        while index != -1 and index < end:
+            starts.append(index)
+            index = html_content.find(_MESSAGE_MARKER, index + 1)
+        for start, stop in zip(starts, starts[1:] + [end]):
+            block = html_content[start:stop]
+            value_start = block.find(_POST_MARKER) + len(_POST_MARKER)
+            post = block[value_start:block.find('"', value_start)]
+            self.messages.append((int(post.rsplit('/', 1)[1]), block))
+        self.name = post.rsplit('/', 1)[0]
+        self.visible = len(self.messages)
+
+    def page(self, page_size: int, before: int = None, after: int = None) -> str:
+        messages = self.messages[:self.visible]
+        if after is not None:
+            window = [m for m in messages if m[0] > after][:page_size]
+        else:
+            if before is not None:
+                messages = [m for m in messages if m[0] < before]
+            window = messages[-page_size:] if page_size else []
+        return self.head + ''.join(block for _, block in window) + self.tail
+
+
+def load_channels(directory: str, initial: int = None):
+    channels = {}
+    for path in sorted(glob.glob(os.path.join(directory, '*.html'))):
+        with open(path, encoding='utf-8') as f:
+            channel = FixtureChannel(f.read())
+        if initial is not None:
+            channel.visible = min(initial, len(channel.messages))
+        channels[channel.name] = channel
+    return channels
+
+
+def make_app(channels, page_size: int) -> web.Application:
+    requests = Counter()
+
+    def int_param(request, name):
+        value = request.query.get(name)
+        if value is None:
+            return None
+        if not value.isdigit():
+            raise web.HTTPBadRequest(text=f"{name} must be an integer")
+        return int(value)
+
+    async def channel_page(request):
+        name = request.match_info['channel']
+        channel = channels.get(name)
+        requests[request.path_qs] += 1
+        if channel is None:
+            raise web.HTTPNotFound()
+
+        body = channel.page(page_size, int_param(request, 'before'), int_param(request, 'after')).encode('utf-8')
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+        return web.Response(body=body, content_type='text/html', charset='utf-8', headers={'ETag': etag})
+
+    async def publish(request):
+        count = int_param(request, 'count') or 1
+        name = request.match_info.get('channel')
+        if name is None:
+            targets = list(channels.values())
+        elif name in channels:
+            targets = [channels[name]]
+        else:
+            raise web.HTTPNotFound()
+        published = {}
+        for channel in targets:
+            before = channel.visible
+            channel.visible = min(channel.visible + count, len(channel.messages))
+            published[channel.name] = [m[0] for m in channel.messages[before:channel.visible]]
+        return web.json_response(published)
+
+    async def stats(request):
+        return web.json_response({
+            'requests': dict(requests),
+            'visible': {name: channel.visible for name, channel in channels.items()},
+        })
+
+    app = web.Application()
+    app.router.add_get('/s/{channel}', channel_page)
+    app.router.add_post('/_publish', publish)
+    app.router.add_post('/_publish/{channel}', publish)
+    app.router.add_get('/_stats', stats)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальная подмена t.me на сохраненных страницах")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--fixtures', default=FIXTURES_DIR)
+    parser.add_argument('--page-size', type=int, default=20, help="сообщений на странице (на t.me около 20)")
+    parser.add_argument('--initial', type=int, default=None, help="сколько сообщений канала видно при старте")
+    args = parser.parse_args()
+
+    channels = load_channels(args.fixtures, args.initial)
+    if not channels:
+        print(f"Нет страниц в {args.fixtures}")
+        sys.exit(1)
+    for name, channel in channels.items():
+        print(f"{name}: {len(channel.messages)} сообщений, видно {channel.visible}")
+    web.run_app(make_app(channels, args.page_size), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
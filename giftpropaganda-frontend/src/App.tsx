@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import styled from 'styled-components';
-import { fetchNews, NewsItem } from './api/news';
+import { fetchNews, searchNews, subscribeNews, NewsItem } from './api/news';
 import NewsModal from './components/NewsModal';
 import SearchBar from './components/SearchBar';
 import MediaViewer from './components/MediaViewer';
@@ -358,6 +358,7 @@ const App: React.FC = () => {
   const [error, setError] = useState<string | null>(null);
   const [selectedCategory, setSelectedCategory] = useState('all');
   const [searchQuery, setSearchQuery] = useState('');
+  const [searchResults, setSearchResults] = useState<NewsItem[] | null>(null);
   const [selectedNews, setSelectedNews] = useState<NewsItem | null>(null);
 
   const categories = [
@@ -391,6 +392,17 @@ const App: React.FC = () => {
     getNews();
   }, [selectedCategory]);
 
+  // Новые новости приходят с сервера по SSE и добавляются в начало ленты
+  useEffect(() => {
+    return subscribeNews((items) => {
+      setNews((prev) => {
+        const known = new Set(prev.map((item) => item.id));
+        const fresh = items.filter((item) => !known.has(item.id)).reverse();
+        return fresh.length ? [...fresh, ...prev] : prev;
+      });
+    }, selectedCategory === 'all' ? undefined : selectedCategory);
+  }, [selectedCategory]);
+
   const handleNewsClick = (newsItem: NewsItem) => {
     TelegramWebApp.triggerHapticFeedback('impact');
     setSelectedNews(newsItem);
@@ -401,10 +413,32 @@ const App: React.FC = () => {
     setSelectedCategory(categoryId);
   };
 
-  const filteredNews = news.filter(item =>
-    item.title.toLowerCase().includes(searchQuery.toLowerCase()) ||
-    item.content.toLowerCase().includes(searchQuery.toLowerCase())
-  );
+  // Поиск выполняется на сервере (GET /api/news/search) с задержкой после ввода
+  useEffect(() => {
+    const query = searchQuery.trim();
+    if (query.length < 2) {
+      setSearchResults(null);
+      return;
+    }
+
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const response = await searchNews(query, selectedCategory === 'all' ? undefined : selectedCategory);
+        if (!cancelled) setSearchResults(response.data);
+      } catch (err) {
+        console.error('Ошибка при поиске новостей:', err);
+        if (!cancelled) setSearchResults([]);
+      }
+    }, 300);
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchQuery, selectedCategory]);
+
+  const filteredNews = searchResults ?? news;
 
   const isNewNews = (dateString: string): boolean => {
     const now = new Date();
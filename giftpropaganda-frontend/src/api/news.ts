@@ -40,11 +40,16 @@ export interface NewsResponse {
   total?: number;
   page?: number;
   limit?: number;
+  next_cursor?: string | null; // Курсор следующей страницы (бесконечная прокрутка)
 }
 
-export const fetchNews = async (category?: string): Promise<NewsResponse> => {
+export const fetchNews = async (category?: string, cursor?: string): Promise<NewsResponse> => {
   try {
-    const url = category ? `${API_URL}?category=${category}` : API_URL;
+    const params = new URLSearchParams();
+    if (category) params.append('category', category);
+    if (cursor) params.append('cursor', cursor);
+    const query = params.toString();
+    const url = query ? `${API_URL}?${query}` : API_URL;
 
     const response = await axios.get<NewsResponse>(url, {
       headers: {
@@ -69,6 +74,64 @@ export const fetchNews = async (category?: string): Promise<NewsResponse> => {
   }
 };
 
+export interface NewsUpdatesResponse {
+  data: NewsItem[];
+  since: number; // id последней полученной новости
+}
+
+// Подписка на новые новости (SSE GET /api/news/stream) вместо повторной загрузки списка.
+// EventSource сам переподключается и догружает пропущенное по Last-Event-ID.
+export const subscribeNews = (onNews: (items: NewsItem[]) => void, category?: string): (() => void) => {
+  const params = new URLSearchParams();
+  if (category) params.append('category', category);
+  const query = params.toString();
+  const source = new EventSource(query ? `${API_URL}stream?${query}` : `${API_URL}stream`);
+
+  source.addEventListener('news', (event) => {
+    try {
+      const update: NewsUpdatesResponse = JSON.parse((event as MessageEvent).data);
+      if (update.data.length) onNews(update.data);
+    } catch (error) {
+      console.error('Ошибка при обработке новых новостей:', error);
+    }
+  });
+
+  return () => source.close();
+};
+
+export interface SearchNewsItem extends NewsItem {
+  rank: number;
+  title_headline: string; // Заголовок с подсветкой <mark>
+  headline: string;       // Фрагменты текста с подсветкой <mark>
+}
+
+export interface SearchNewsResponse {
+  data: SearchNewsItem[];
+  query: string;
+  next_offset?: number | null;
+}
+
+export const searchNews = async (query: string, category?: string): Promise<SearchNewsResponse> => {
+  try {
+    const params = new URLSearchParams({ q: query });
+    if (category) params.append('category', category);
+
+    const response = await axios.get<SearchNewsResponse>(`${API_URL}search?${params.toString()}`, {
+      headers: {
+        'ngrok-skip-browser-warning': 'true',
+        'Content-Type': 'application/json',
+        'Accept': 'application/json'
+      },
+      timeout: 10000
+    });
+
+    return response.data;
+  } catch (error: any) {
+    console.error('Ошибка при поиске новостей:', error);
+    throw new Error('Не удалось выполнить поиск');
+  }
+};
+
 export const fetchNewsById = async (id: number): Promise<NewsItem> => {
   try {
     const response = await axios.get<NewsItem>(`${API_URL}${id}`, {
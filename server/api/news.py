@@ -1,133 +1,637 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List, Optional
-from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, func, literal_column, select, text, tuple_
+from sqlalchemy.orm import joinedload
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
 import logging
-
-from server.db import get_db, NewsItem, NewsSource, recreate_engine, recreate_models
-from server.models import NewsResponse, NewsItemResponse, MediaItem
+import time
+
+import orjson
+
+from server.config import (
+    NEWS_SUMMARY_CONTENT_LENGTH,
+    SEARCH_MAX_CANDIDATES,
+    NEWS_HTTP_MAX_AGE,
+    NEWS_ITEM_HTTP_MAX_AGE,
+    NEWS_HTTP_STALE_WHILE_REVALIDATE,
+    NEWS_STREAM_KEEPALIVE,
+    NEWS_POLL_TIMEOUT,
+    NEWS_STREAM_CATCHUP_LIMIT,
+)
+from server.db import AsyncSessionLocal, get_async_db, NewsItem, NewsSource, SEARCH_CONFIG_RU, SEARCH_CONFIG_EN
+from server.services.circuit_breaker import CLOSED, CircuitBreakers
+from server.services.dedup_service import news_seen_set, news_simhash_index
+from server.services.news_stream import StreamItem, news_broker
+from server.services.leader import cluster_stats, leader_election
+from server.services.news_sync import news_sync
+from server.services.poll_scheduler import poll_scheduler
+from server.services.source_service import load_source_health
+from server.services.stats_service import get_category_counts, list_categories
+from server.services.view_counter import view_counter
+from server.utils.cache import news_cache, news_fragment_cache
+from server.utils.compression import compression_stats, encoded_body
+from server.utils.http_cache import cache_headers, etag_matches, make_etag, not_modified
+from server.models import (
+    NewsResponse, NewsItemResponse, NewsSearchItemResponse, NewsSearchResponse, NewsUpdatesResponse, MediaItem
+)
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+# Параметры подсветки ts_headline: совпадения оборачиваются в <mark>
+SEARCH_HEADLINE_TITLE = 'StartSel=<mark>, StopSel=</mark>, HighlightAll=true'
+SEARCH_HEADLINE_CONTENT = 'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10'
+
+
+def regconfig(name: str):
+    """
+    Конфигурация поиска литералом SQL: параметр $n::regconfig не сворачивается
+    в константу при планировании, и планировщик не видит селективность запроса.
+    """
+    return literal_column(f"'{name}'::regconfig")
+
+# Ответы роутера сериализуются orjson
+router = APIRouter(default_response_class=ORJSONResponse)
+
+
+def parse_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Разбирает курсор вида <publish_date ISO>,<id>"""
+    try:
+        raw_date, raw_id = cursor.rsplit(',', 1)
+        publish_date = datetime.fromisoformat(raw_date.strip().replace('Z', '+00:00'))
+        if publish_date.tzinfo is not None:
+            # В БД publish_date хранится без часового пояса (UTC)
+            publish_date = publish_date.astimezone(timezone.utc).replace(tzinfo=None)
+        return publish_date, int(raw_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный курсор, ожидается <publish_date>,<id>")
+
+
+def make_cursor(item: NewsItem) -> str:
+    """Курсор, указывающий на позицию сразу после новости"""
+    return f"{item.publish_date.isoformat()},{item.id}"
+
+
+async def load_sources(db: AsyncSession, news_items) -> Dict[int, NewsSource]:
+    """Источники для списка новостей одним запросом"""
+    source_ids = {item.source_id for item in news_items if item.source_id is not None}
+    if not source_ids:
+        return {}
+    sources_list = (await db.execute(select(NewsSource).where(NewsSource.id.in_(source_ids)))).scalars().all()
+    return {source.id: source for source in sources_list}
+
+
+def build_item_response(item: NewsItem, source: Optional[NewsSource], response_model=NewsItemResponse, **extra):
+    """Преобразует строку news_items в response модель"""
+    return response_model(
+        id=item.id,
+        title=item.title or "",
+        content=item.content or "",  # Plain text
+        content_html=item.content_html or "",  # HTML контент
+        link=item.link or "",
+        publish_date=item.publish_date.isoformat() if item.publish_date else datetime.now().isoformat(),
+        category=item.category or "general",
+        media=media_list(item.id, item.media),
+        reading_time=item.reading_time,
+        views_count=item.views_count or 0,
+        author=item.author,
+        source_name=source.name if source else None,
+        source_url=source.url if source else None,
+        source=source,
+        **extra
+    )
+
+
+# Колонки списка новостей по полям ответа (NewsItemResponse)
+LIST_ITEM_COLUMNS = {
+    'id': NewsItem.id,
+    'title': NewsItem.title,
+    'content': NewsItem.content,
+    'content_html': NewsItem.content_html,
+    'link': NewsItem.link,
+    'publish_date': NewsItem.publish_date,
+    'category': NewsItem.category,
+    'media': NewsItem.media,
+    'reading_time': NewsItem.reading_time,
+    'views_count': NewsItem.views_count,
+    'author': NewsItem.author,
+    'source_name': NewsSource.name,
+    'source_url': NewsSource.url,
+}
+LIST_SOURCE_COLUMNS = {
+    'id': NewsSource.id,
+    'name': NewsSource.name,
+    'url': NewsSource.url,
+    'source_type': NewsSource.source_type,
+    'category': NewsSource.category,
+    'is_active': NewsSource.is_active,
+}
+LIST_FIELDS = list(LIST_ITEM_COLUMNS) + ['source']
+
+# Режим summary: без HTML тела, текст обрезается в БД
+SUMMARY_FIELDS = [field for field in LIST_FIELDS if field != 'content_html']
+
+# Значения по умолчанию для пустых колонок (как в build_item_response)
+LIST_FIELD_DEFAULTS = {
+    'title': "", 'content': "", 'content_html': "", 'link': "", 'category': "general", 'views_count': 0,
+}
+
+
+def parse_fields(fields: Optional[str], view: str) -> List[str]:
+    """Поля ответа списка: ?fields= (через запятую) или набор режима view; id включается всегда"""
+    if not fields:
+        return SUMMARY_FIELDS if view == "summary" else LIST_FIELDS
+
+    requested = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in LIST_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестные поля: {', '.join(unknown)}. Доступны: {', '.join(LIST_FIELDS)}"
+        )
+    return [field for field in LIST_FIELDS if field == 'id' or field in requested]
+
+
+def list_columns(fields: List[str], view: str):
+    """SQL колонки для выбранных полей; id и publish_date нужны всегда (сортировка и курсор)"""
+    columns = []
+    for field in LIST_ITEM_COLUMNS:
+        if field in fields or field in ('id', 'publish_date'):
+            column = LIST_ITEM_COLUMNS[field]
+            if field == 'content' and view == "summary":
+                column = func.left(column, NEWS_SUMMARY_CONTENT_LENGTH)
+            columns.append(column.label(field))
+    if 'source' in fields:
+        columns.extend(column.label(f'source__{field}') for field, column in LIST_SOURCE_COLUMNS.items())
+    # Версия строки для кэша JSON фрагментов
+    columns.append(NewsItem.updated_at.label('row_updated_at'))
+    return columns
+
+
+def list_item(row, fields: List[str]) -> Dict[str, Any]:
+    """Строка проекции -> элемент ответа (только выбранные поля)"""
+    values = row._mapping
+    item = {}
+    for field in fields:
+        if field == 'source':
+            item['source'] = (
+                {name: values[f'source__{name}'] for name in LIST_SOURCE_COLUMNS}
+                if values['source__id'] is not None else None
+            )
+            continue
+        value = values[field]
+        if field == 'publish_date':
+            value = value.isoformat() if value else datetime.now().isoformat()
+        elif field == 'media':
+            value = media_list(row.id, value)
+        elif value is None:
+            value = LIST_FIELD_DEFAULTS.get(field)
+        item[field] = value
+    return item
+
+
+def list_fragments(rows, fields: List[str], view: str) -> List[Tuple[Any, bytes]]:
+    """
+    JSON фрагменты элементов списка: [(строка, фрагмент)].
+    Фрагмент элемента сериализуется один раз и переиспользуется, пока не изменились
+    updated_at строки и (если поле выбрано) счетчик просмотров.
+    """
+    fields_key = ','.join(fields)
+    with_views = 'views_count' in fields
+    fragments = []
+    for row in rows:
+        key = (row.id, view, fields_key)
+        stamp = (row.row_updated_at, row.views_count if with_views else None)
+        fragment = news_fragment_cache.get(key, stamp)
+        if fragment is None:
+            try:
+                fragment = orjson.dumps(list_item(row, fields))
+            except Exception as e:
+                logger.warning(f"Ошибка при обработке новости {row.id}: {e}")
+                continue
+            news_fragment_cache.set(key, stamp, fragment)
+        fragments.append((row, fragment))
+    return fragments
+
+
+def render_list_body(rows, fields: List[str], view: str, meta: Dict[str, Any]) -> bytes:
+    """Собирает JSON ответа списка из готовых фрагментов элементов"""
+    fragments = [fragment for _, fragment in list_fragments(rows, fields, view)]
+    # {"data":[...], <остальные поля meta>}
+    return b'{"data":[' + b','.join(fragments) + b'],' + orjson.dumps(meta)[1:]
+
+
+async def load_new_items(db: AsyncSession, since: Optional[int] = None, news_ids: Optional[List[int]] = None,
+                         category: Optional[str] = None) -> List[StreamItem]:
+    """
+    Новости для потока в порядке добавления: с id больше since или с перечисленными id.
+    Элементы в формате списка (view=full); выборка идет по первичному ключу.
+    Выборка по since ограничена news_sync.settled_id: новости с большими id еще
+    могут появиться не по порядку (id выдаются до коммита), и клиент, сдвинувший
+    since за них, пропустил бы задержавшуюся новость.
+    """
+    query = select(*list_columns(LIST_FIELDS, "full")).select_from(NewsItem).outerjoin(
+        NewsSource, NewsSource.id == NewsItem.source_id
+    )
+    if news_ids is not None:
+        query = query.where(NewsItem.id.in_(news_ids))
+    else:
+        if news_sync.settled_id is None or since >= news_sync.settled_id:
+            return []
+        query = query.where(NewsItem.id > since, NewsItem.id <= news_sync.settled_id).limit(NEWS_STREAM_CATCHUP_LIMIT)
+    if category and category != "all":
+        query = query.where(NewsItem.category == category)
+    rows = (await db.execute(query.order_by(NewsItem.id))).all()
+    return [(row.id, row.category, fragment) for row, fragment in list_fragments(rows, LIST_FIELDS, "full")]
+
+
+async def latest_news_id(db: AsyncSession) -> int:
+    """id последней добавленной новости"""
+    return (await db.execute(select(func.max(NewsItem.id)))).scalar_one() or 0
+
+
+async def stream_position(db: AsyncSession) -> int:
+    """Начальное значение since: граница зафиксированных новостей news_sync"""
+    if news_sync.settled_id is not None:
+        return news_sync.settled_id
+    # Сразу после запуска процесса граница еще не известна
+    return await latest_news_id(db)
+
+
+async def publish_new_items(news_ids: List[int]) -> None:
+    """Публикует новые новости подписчикам потока (вызывается после коммита записи)"""
+    if not news_ids or not news_broker.has_subscribers:
+        return
+    async with AsyncSessionLocal() as db:
+        items = await load_new_items(db, news_ids=news_ids)
+    news_broker.publish(items)
+
+
+def render_updates(items: List[StreamItem], since: int) -> bytes:
+    """JSON ответа NewsUpdatesResponse; since - id последней отданной новости"""
+    if items:
+        since = items[-1][0]
+    return b'{"data":[' + b','.join(fragment for _, _, fragment in items) + b'],"since":' + str(since).encode() + b'}'
+
+
+def media_list(news_id: int, media) -> List[Dict[str, Any]]:
+    """Медиа из JSON поля в формате MediaItem"""
+    if not media:
+        return []
+    try:
+        return [MediaItem(**entry).model_dump() for entry in media]
+    except Exception as e:
+        logger.warning(f"Error parsing media for {news_id}: {e}")
+        return []
 
 
 @router.get("/news/", response_model=NewsResponse)
 async def get_news(
         category: Optional[str] = Query(None, description="Фильтр по категории"),
-        limit: int = Query(50, description="Количество новостей", le=100),
-        offset: int = Query(0, description="Смещение для пагинации"),
-        db: Session = Depends(get_db)
+        limit: int = Query(50, description="Количество новостей", ge=1, le=100),
+        offset: int = Query(0, ge=0, description="Смещение для пагинации"),
+        cursor: Optional[str] = Query(None, description="Курсор <publish_date>,<id> из next_cursor предыдущей страницы"),
+        include_total: Optional[bool] = Query(
+            None, description="Считать общее количество (по умолчанию только без курсора)"
+        ),
+        view: str = Query("full", pattern="^(full|summary)$",
+                          description="summary - без content_html, текст обрезан"),
+        fields: Optional[str] = Query(None, description="Поля ответа через запятую (sparse fieldset)"),
+        if_none_match: Optional[str] = Header(None),
+        accept_encoding: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_async_db)
 ):
-    """Получить список новостей с фильтрацией"""
-    try:
-        logger.info(f"Запрос новостей: category={category}, limit={limit}, offset={offset}")
+    """
+    Получить список новостей с фильтрацией.
+
+    Список выбирается одним запросом-проекцией: только нужные колонки, источник
+    присоединяется в том же запросе. ?view=summary исключает HTML тело и обрезает
+    текст до NEWS_SUMMARY_CONTENT_LENGTH символов, ?fields= оставляет в ответе
+    только перечисленные поля.
+
+    Поддерживаются два режима пагинации: offset/limit и курсорный (?cursor=...).
+    Курсорный режим читает индекс (category, publish_date DESC, id DESC) с нужной
+    позиции, поэтому стоимость страницы не зависит от ее глубины; общее количество
+    в этом режиме по умолчанию не считается.
+
+    Готовый JSON хранится в news_cache до следующей записи новостей. ETag
+    зависит только от версии данных и параметров запроса, поэтому повторный
+    запрос неизменной ленты получает 304 без обращения к БД. Сжатые варианты тела
+    хранятся вместе с ним, поэтому одинаковый ответ сжимается один раз.
+    """
+    position = parse_cursor(cursor) if cursor else None
+    if include_total is None:
+        include_total = position is None
+    selected_fields = parse_fields(fields, view)
+
+    cache_key = (
+        category or "all", limit, offset if position is None else None, cursor, include_total,
+        view, ','.join(selected_fields)
+    )
+    headers = cache_headers(
+        make_etag('news', news_cache.version, *cache_key), NEWS_HTTP_MAX_AGE, NEWS_HTTP_STALE_WHILE_REVALIDATE
+    )
+    if etag_matches(if_none_match, headers['ETag']):
+        return not_modified(headers)
+
+    cached = news_cache.get_entry(cache_key)
+    if cached is not None:
+        body, variants = encoded_body(cached[0], accept_encoding, cached[1])
+        return Response(content=body, media_type="application/json", headers={**headers, **variants})
+    generation = news_cache.generation
 
-        # Принудительно обновляем метаданные и модели
-        recreate_engine()
-        NewsItem, NewsSource = recreate_models()
+    try:
+        logger.info(f"Запрос новостей: category={category}, limit={limit}, offset={offset}, cursor={cursor}")
 
-        # Базовый запрос
-        query = db.query(NewsItem)
+        # Базовый запрос: проекция с источником в том же запросе
+        query = select(*list_columns(selected_fields, view)).select_from(NewsItem)
+        if 'source_name' in selected_fields or 'source_url' in selected_fields or 'source' in selected_fields:
+            query = query.outerjoin(NewsSource, NewsSource.id == NewsItem.source_id)
+        count_query = select(func.count()).select_from(NewsItem)
 
         # Фильтр по категории
         if category and category != "all":
-            query = query.filter(NewsItem.category == category)
+            query = query.where(NewsItem.category == category)
+            count_query = count_query.where(NewsItem.category == category)
+
+        # Сортировка по дате публикации; id делает порядок однозначным для курсора
+        query = query.order_by(desc(NewsItem.publish_date), desc(NewsItem.id))
+
+        # Пагинация: лишняя строка показывает, есть ли следующая страница
+        if position is not None:
+            query = query.where(tuple_(NewsItem.publish_date, NewsItem.id) < tuple_(*position))
+        else:
+            query = query.offset(offset)
+        news_items = (await db.execute(query.limit(limit + 1))).all()
+
+        next_cursor = None
+        if len(news_items) > limit:
+            news_items = news_items[:limit]
+            next_cursor = make_cursor(news_items[-1])
+
+        total = (await db.execute(count_query)).scalar_one() if include_total else None
+
+        logger.info(f"Найдено {len(news_items)} новостей из {total if total is not None else '?'} общих")
+
+        # Преобразование в ответ (поля NewsResponse / NewsItemResponse)
+        body = render_list_body(news_items, selected_fields, view, {
+            'total': total,
+            'page': offset // limit + 1 if position is None else None,
+            'pages': (total + limit - 1) // limit if total is not None else None,
+            'next_cursor': next_cursor,
+        })
+        variants: Dict[str, bytes] = {}
+        news_cache.set(cache_key, body, generation, variants)
+        body, encoding_headers = encoded_body(body, accept_encoding, variants)
+        return Response(content=body, media_type="application/json", headers={**headers, **encoding_headers})
+
+    except Exception as e:
+        logger.error(f"Ошибка при получении новостей: {e}")
+        raise HTTPException(status_code=500, detail=f"Ошибка при получении новостей: {str(e)}")
 
-        # Сортировка по дате публикации
-        query = query.order_by(desc(NewsItem.publish_date))
 
-        # Пагинация
-        total = query.count()
-        news_items = query.offset(offset).limit(limit).all()
+@router.get("/news/search", response_model=NewsSearchResponse)
+async def search_news(
+        q: str = Query(..., min_length=2, max_length=200, description="Поисковый запрос"),
+        category: Optional[str] = Query(None, description="Фильтр по категории"),
+        limit: int = Query(20, description="Количество результатов", ge=1, le=100),
+        offset: int = Query(0, ge=0, description="Смещение для пагинации"),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Полнотекстовый поиск по заголовку и тексту новостей.
+
+    Запрос разбирается websearch_to_tsquery (кавычки, OR, минус) в русской и
+    английской конфигурациях и сопоставляется с generated колонкой search_vector
+    через GIN индекс. Ранжируются (ts_rank_cd, совпадения в заголовке весят больше)
+    только SEARCH_MAX_CANDIDATES самых свежих совпадений: для частых слов, которые
+    есть в большинстве строк, ранжирование всех совпадений стоило бы секунды.
+    Подсветка ts_headline строится только для строк страницы.
+    """
+    try:
+        logger.info(f"Поиск новостей: q={q!r}, category={category}, limit={limit}, offset={offset}")
 
-        logger.info(f"Найдено {len(news_items)} новостей из {total} общих")
+        ts_query = func.websearch_to_tsquery(regconfig(SEARCH_CONFIG_RU), q).op('||')(
+            func.websearch_to_tsquery(regconfig(SEARCH_CONFIG_EN), q)
+        )
+        rank = func.ts_rank_cd(NewsItem.search_vector, ts_query).label('rank')
 
-        # Соберем source_id для всех новостей
-        source_ids = [item.source_id for item in news_items if item.source_id is not None]
-        sources = {}
-        if source_ids:
-            sources_list = db.query(NewsSource).filter(NewsSource.id.in_(source_ids)).all()
-            sources = {source.id: source for source in sources_list}
+        # Кандидаты: самые свежие совпадения (только id)
+        candidates = select(NewsItem.id).where(NewsItem.search_vector.op('@@')(ts_query))
+        if category and category != "all":
+            candidates = candidates.where(NewsItem.category == category)
+        candidates = candidates.order_by(desc(NewsItem.publish_date), desc(NewsItem.id))
+        candidates = candidates.limit(SEARCH_MAX_CANDIDATES).subquery()
+
+        # Ранжирование кандидатов и страница результатов, затем строки страницы
+        matches = (
+            select(NewsItem.id, rank)
+            .join(candidates, NewsItem.id == candidates.c.id)
+            .order_by(desc('rank'), desc(NewsItem.publish_date), desc(NewsItem.id))
+            .offset(offset)
+            .limit(limit + 1)
+            .subquery()
+        )
 
-        # Преобразование в response модель
-        news_data = []
-        for item in news_items:
+        query = (
+            select(
+                NewsItem,
+                matches.c.rank,
+                func.ts_headline(regconfig(SEARCH_CONFIG_RU), NewsItem.title, ts_query, SEARCH_HEADLINE_TITLE),
+                func.ts_headline(regconfig(SEARCH_CONFIG_RU), NewsItem.content, ts_query, SEARCH_HEADLINE_CONTENT),
+            )
+            .join(matches, NewsItem.id == matches.c.id)
+            .order_by(desc(matches.c.rank), desc(NewsItem.publish_date), desc(NewsItem.id))
+        )
+        # asyncpg кэширует подготовленные запросы, и после нескольких выполнений Postgres
+        # может перейти на generic план без значения запроса, а он не отличает частые
+        # слова от редких. Для поиска план строится на каждый запрос
+        await db.execute(text("SET LOCAL plan_cache_mode = force_custom_plan"))
+        rows = (await db.execute(query)).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        sources = await load_sources(db, [row[0] for row in rows])
+
+        results = []
+        for item, item_rank, title_headline, headline in rows:
             try:
-                # Получаем медиа из JSON поля
-                media_list = []
-                if item.media:
-                    try:
-                        media_list = [MediaItem(**media) for media in item.media]
-                    except Exception as e:
-                        logger.warning(f"Error parsing media for {item.id}: {e}")
-
-                # Получаем источник
-                source = sources.get(item.source_id)
-                source_name = source.name if source else None
-                source_url = source.url if source else None
-
-                news_data.append(NewsItemResponse(
-                    id=item.id,
-                    title=item.title or "",
-                    content=item.content or "",  # Plain text
-                    content_html=item.content_html or "",  # HTML контент
-                    link=item.link or "",
-                    publish_date=item.publish_date.isoformat() if item.publish_date else datetime.now().isoformat(),
-                    category=item.category or "general",
-                    media=media_list,
-                    reading_time=item.reading_time,
-                    views_count=item.views_count or 0,
-                    author=item.author,
-                    source_name=source_name,
-                    source_url=source_url,
-                    source=source  # <-- добавлено, чтобы поле source было заполнено
+                results.append(build_item_response(
+                    item,
+                    sources.get(item.source_id),
+                    response_model=NewsSearchItemResponse,
+                    rank=item_rank,
+                    title_headline=title_headline,
+                    headline=headline
                 ))
             except Exception as e:
                 logger.warning(f"Ошибка при обработке новости {item.id}: {e}")
                 continue
 
-        return NewsResponse(
-            data=news_data,
-            total=total,
-            page=offset // limit + 1,
-            pages=(total + limit - 1) // limit
+        return NewsSearchResponse(
+            data=results,
+            query=q,
+            next_offset=offset + limit if has_more else None
         )
 
     except Exception as e:
-        logger.error(f"Ошибка при получении новостей: {e}")
-        raise HTTPException(status_code=500, detail=f"Ошибка при получении новостей: {str(e)}")
+        logger.error(f"Ошибка при поиске новостей: {e}")
+        raise HTTPException(status_code=500, detail=f"Ошибка при поиске новостей: {str(e)}")
+
+
+def sse_event(event: str, items: List[StreamItem], since: int) -> bytes:
+    """Событие SSE: id события - since, по нему EventSource продолжает поток после переподключения"""
+    return f"id: {since}\nevent: {event}\ndata: ".encode() + render_updates(items, since) + b"\n\n"
+
+
+@router.get("/news/stream")
+async def stream_news(
+        request: Request,
+        since: Optional[int] = Query(None, description="id последней полученной новости"),
+        category: Optional[str] = Query(None, description="Фильтр по категории"),
+        last_event_id: Optional[str] = Header(None),
+):
+    """
+    Поток новых новостей (Server-Sent Events) вместо периодической перезагрузки списка.
+
+    Событие news содержит JSON вида NewsUpdatesResponse. Новости приходят из
+    внутрипроцессной рассылки news_sync в порядке id, поэтому открытый поток не
+    держит соединение с БД. Пропущенное (id > since или Last-Event-ID при переподключении
+    EventSource) догружается из БД; без since поток начинается с события ready,
+    содержащего текущее значение since.
+    """
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+
+    # Подписка до догоняющей выборки, чтобы не потерять новости между ними
+    subscription = news_broker.subscribe(category)
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="Слишком много подписчиков, повторите позже")
+
+    async def events():
+        position = since
+        try:
+            yield b"retry: 5000\n\n"
+            async with AsyncSessionLocal() as db:
+                if position is None:
+                    position = await stream_position(db)
+                    yield sse_event("ready", [], position)
+                else:
+                    while True:
+                        items = await load_new_items(db, since=position, category=category)
+                        if items:
+                            position = items[-1][0]
+                            yield sse_event("news", items, position)
+                        if len(items) < NEWS_STREAM_CATCHUP_LIMIT:
+                            break
+
+            while True:
+                batch = await subscription.get(NEWS_STREAM_KEEPALIVE)
+                if batch is None:
+                    # Подписка закрыта (переполнение или остановка) - клиент переподключится
+                    break
+                items = [item for item in batch if item[0] > position]
+                if items:
+                    position = items[-1][0]
+                    yield sse_event("news", items, position)
+                elif await request.is_disconnected():
+                    break
+                else:
+                    yield b": ping\n\n"
+        except Exception as e:
+            logger.error(f"Ошибка в потоке новостей: {e}")
+        finally:
+            news_broker.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+@router.get("/news/poll", response_model=NewsUpdatesResponse)
+async def poll_news(
+        since: Optional[int] = Query(None, description="id последней полученной новости (since из прошлого ответа)"),
+        category: Optional[str] = Query(None, description="Фильтр по категории"),
+        timeout: float = Query(NEWS_POLL_TIMEOUT, ge=0, le=NEWS_POLL_TIMEOUT, description="Максимальное ожидание, с"),
+):
+    """
+    Long-poll новых новостей для клиентов без EventSource.
+
+    Пропущенные новости (id > since) отдаются сразу одним запросом по первичному
+    ключу; если их нет, запрос ждет публикации новых новостей до timeout секунд,
+    не занимая соединение с БД. Без since сразу возвращает текущее значение since.
+    """
+    headers = {'Cache-Control': 'no-store'}
+    subscription = news_broker.subscribe(category) if since is not None else None
+    if since is not None and subscription is None:
+        raise HTTPException(status_code=503, detail="Слишком много подписчиков, повторите позже")
+
+    try:
+        async with AsyncSessionLocal() as db:
+            if since is None:
+                return Response(content=render_updates([], await stream_position(db)),
+                                media_type="application/json", headers=headers)
+            items = await load_new_items(db, since=since, category=category)
+
+        deadline = time.monotonic() + timeout
+        while not items:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            batch = await subscription.get(remaining)
+            if batch is None:
+                break
+            items = [item for item in batch if item[0] > since]
+
+        return Response(content=render_updates(items, since), media_type="application/json", headers=headers)
+
+    except Exception as e:
+        logger.error(f"Ошибка при ожидании новых новостей: {e}")
+        raise HTTPException(status_code=500, detail=f"Ошибка при ожидании новых новостей: {str(e)}")
+    finally:
+        if subscription is not None:
+            news_broker.unsubscribe(subscription)
 
 
 @router.get("/news/{news_id}", response_model=NewsItemResponse)
 async def get_news_item(
         news_id: int,
-        db: Session = Depends(get_db)
+        response: Response,
+        if_none_match: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_async_db)
 ):
-    """Получить конкретную новость по ID"""
+    """
+    Получить конкретную новость по ID.
+    ETag строится по updated_at; счетчик просмотров в него не входит (слабый валидатор).
+    Просмотр учитывается в view_counter и записывается в БД пачкой, так что запрос
+    выполняет только один SELECT новости вместе с источником.
+    """
     try:
-        news_item = db.query(NewsItem).filter(NewsItem.id == news_id).first()
+        news_item = (await db.execute(
+            select(NewsItem).options(joinedload(NewsItem.source)).where(NewsItem.id == news_id)
+        )).scalar_one_or_none()
 
         if not news_item:
             raise HTTPException(status_code=404, detail="Новость не найдена")
 
+        headers = cache_headers(
+            make_etag('news_item', news_item.id, news_item.updated_at),
+            NEWS_ITEM_HTTP_MAX_AGE,
+            NEWS_HTTP_STALE_WHILE_REVALIDATE
+        )
+
         # Получаем источник
-        source = db.query(NewsSource).get(news_item.source_id) if news_item.source_id else None
+        source = news_item.source
 
-        # Получаем медиа
-        media_list = []
-        if news_item.media:
-            try:
-                media_list = [MediaItem(**media) for media in news_item.media]
-            except Exception as e:
-                logger.warning(f"Error parsing media for {news_item.id}: {e}")
+        # Учитываем просмотр; в ответе - значение из БД плюс еще не записанные просмотры
+        view_counter.record(news_item.id)
+        views_count = (news_item.views_count or 0) + view_counter.pending(news_item.id)
 
-        # Увеличиваем счетчик просмотров
-        if news_item.views_count is None:
-            news_item.views_count = 0
-        news_item.views_count += 1
-        db.commit()
+        if etag_matches(if_none_match, headers['ETag']):
+            return not_modified(headers)
+        response.headers.update(headers)
 
         return NewsItemResponse(
             id=news_item.id,
@@ -137,12 +641,13 @@ async def get_news_item(
             link=news_item.link or "",
             publish_date=news_item.publish_date.isoformat() if news_item.publish_date else datetime.now().isoformat(),
             category=news_item.category or "general",
-            media=media_list,
+            media=media_list(news_item.id, news_item.media),
             reading_time=news_item.reading_time,
-            views_count=news_item.views_count,
+            views_count=views_count,
             author=news_item.author,
             source_name=source.name if source else None,
-            source_url=source.url if source else None
+            source_url=source.url if source else None,
+            source=source
         )
 
     except HTTPException:
@@ -152,36 +657,113 @@ async def get_news_item(
         raise HTTPException(status_code=500, detail=f"Ошибка при получении новости: {str(e)}")
 
 
+@router.get("/cache/stats")
+async def get_cache_stats(db: AsyncSession = Depends(get_async_db)):
+    """
+    Статистика кэша ответов (hit ratio) и служб процесса.
+
+    Все поля, кроме cluster, относятся к процессу, обработавшему запрос (process -
+    его идентификатор). scheduler есть только у ведущего процесса загрузки: у
+    остальных active = false, а кто ведет опрос, видно в cluster - он читается из
+    БД и одинаков на всех воркерах.
+    """
+    try:
+        cluster = await cluster_stats(db)
+    except Exception as e:
+        logger.error(f"Ошибка при чтении состояния загрузки: {e}")
+        cluster = {'error': str(e)}
+
+    scheduler: Dict[str, Any] = {'active': leader_election.is_leader}
+    if leader_election.is_leader:
+        scheduler.update(poll_scheduler.stats())
+    return {
+        "process": leader_election.owner,
+        "news": news_cache.stats(),
+        "news_fragments": news_fragment_cache.stats(),
+        "compression": compression_stats.stats(),
+        "stream": news_broker.stats(),
+        "seen_set": news_seen_set.stats(),
+        "dedup": news_simhash_index.stats(),
+        "scheduler": scheduler,
+        "leader": leader_election.stats(),
+        "sync": news_sync.stats(),
+        "cluster": cluster,
+    }
+
+
+@router.get("/sources/health")
+async def get_sources_health(db: AsyncSession = Depends(get_async_db)):
+    """
+    Состояние источников: автоматы защиты (closed/open/half_open), последние ошибки.
+    Автоматы ведет только ведущий процесс загрузки, поэтому состояние читается из
+    news_sources (ведущий сохраняет его в конце каждого цикла опроса), и ответ не
+    зависит от воркера, обработавшего запрос.
+    """
+    try:
+        breakers = CircuitBreakers()
+        breakers.load(await load_source_health(db))
+        sources = breakers.stats()
+    except Exception as e:
+        logger.error(f"Ошибка при получении состояния источников: {e}")
+        raise HTTPException(status_code=500, detail=f"Ошибка при получении состояния источников: {str(e)}")
+
+    for source in sources:
+        # Счетчик пропусков есть только в памяти ведущего процесса
+        del source['skipped']
+    return {
+        "unavailable": sum(1 for source in sources if source['state'] != CLOSED),
+        "sources": sources,
+    }
+
+
 @router.get("/categories/")
-async def get_categories(db: Session = Depends(get_db)):
-    """Получить список доступных категорий"""
+async def get_categories(
+        response: Response,
+        if_none_match: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """Получить список доступных категорий (из таблицы category_counts)"""
+    # Категории меняются только при записи новостей
+    headers = cache_headers(make_etag('categories', news_cache.version), NEWS_HTTP_MAX_AGE,
+                            NEWS_HTTP_STALE_WHILE_REVALIDATE)
+    if etag_matches(if_none_match, headers['ETag']):
+        return not_modified(headers)
+    response.headers.update(headers)
+
     try:
-        categories = db.query(NewsItem.category).distinct().all()
-        return {"categories": [cat[0] for cat in categories if cat[0]]}
+        return {"categories": [cat for cat in await list_categories(db) if cat]}
     except Exception as e:
         logger.error(f"Ошибка при получении категорий: {e}")
         raise HTTPException(status_code=500, detail="Ошибка при получении категорий")
 
 
 @router.get("/stats/")
-async def get_stats(db: Session = Depends(get_db)):
-    """Получить статистику новостей"""
+async def get_stats(
+        response: Response,
+        if_none_match: Optional[str] = Header(None),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Получить статистику новостей.
+    Читается таблица category_counts (одна строка на категорию), news_items не сканируется.
+    """
+    # Статистика меняется только при записи новостей
+    headers = cache_headers(make_etag('stats', news_cache.version), NEWS_HTTP_MAX_AGE,
+                            NEWS_HTTP_STALE_WHILE_REVALIDATE)
+    if etag_matches(if_none_match, headers['ETag']):
+        return not_modified(headers)
+    response.headers.update(headers)
+
     try:
-        total_news = db.query(NewsItem).count()
+        counts, last_updated = await get_category_counts(db)
 
         # Статистика по категориям
-        categories_stats = {}
-        categories = db.query(NewsItem.category).distinct().all()
-
-        for cat in categories:
-            if cat[0]:
-                count = db.query(NewsItem).filter(NewsItem.category == cat[0]).count()
-                categories_stats[cat[0]] = count
+        categories_stats = {cat: count for cat, count in counts.items() if cat}
 
         return {
-            "total_news": total_news,
+            "total_news": sum(counts.values()),
             "categories": categories_stats,
-            "last_updated": datetime.now().isoformat()
+            "last_updated": (last_updated or datetime.now()).isoformat()
         }
 
     except Exception as e:
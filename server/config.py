@@ -1,4 +1,5 @@
 from dotenv import load_dotenv
+import hashlib
 import os
 
 load_dotenv()
@@ -18,7 +19,125 @@ REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 DEBUG = os.getenv("DEBUG", "False").lower() == "true"
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
+# Настройки HTTP клиента для парсеров (общий пул соединений)
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "50"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "10"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "600"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "60"))
+HTTP_REQUEST_TIMEOUT = float(os.getenv("HTTP_REQUEST_TIMEOUT", "10"))
+
+# Параллельная загрузка источников в периодическом обновлении
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "16"))
+FETCH_CONCURRENCY_PER_HOST = int(os.getenv("FETCH_CONCURRENCY_PER_HOST", "8"))
+
+# Адрес t.me (для локальной подмены, см. fake_telegram.py) и сколько страниц
+# ?before= догружается за цикл, если с прошлого цикла вышло больше одной страницы
+TELEGRAM_BASE_URL = os.getenv("TELEGRAM_BASE_URL", "https://t.me").rstrip("/")
+TELEGRAM_MAX_PAGES = int(os.getenv("TELEGRAM_MAX_PAGES", "5"))
+
+# Пул для разбора RSS/HTML вне event loop: "thread" или "process"
+PARSE_EXECUTOR = os.getenv("PARSE_EXECUTOR", "thread").lower()
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "2"))
+
+# Полнотекстовый поиск: сколько самых свежих совпадений ранжируется
+SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", "1000"))
+
+# Кэш ответов GET /api/news/ (сбрасывается при записи новостей)
+NEWS_CACHE_TTL = float(os.getenv("NEWS_CACHE_TTL", "300"))
+NEWS_CACHE_MAX_ENTRIES = int(os.getenv("NEWS_CACHE_MAX_ENTRIES", "256"))
+# JSON фрагменты отдельных новостей для сборки списка (0 - отключить)
+NEWS_FRAGMENT_CACHE_MAX_ENTRIES = int(os.getenv("NEWS_FRAGMENT_CACHE_MAX_ENTRIES", "5000"))
+
+# HTTP кэширование (Cache-Control) для браузера и CDN, в секундах
+NEWS_HTTP_MAX_AGE = int(os.getenv("NEWS_HTTP_MAX_AGE", "30"))
+NEWS_ITEM_HTTP_MAX_AGE = int(os.getenv("NEWS_ITEM_HTTP_MAX_AGE", "60"))
+NEWS_HTTP_STALE_WHILE_REVALIDATE = int(os.getenv("NEWS_HTTP_STALE_WHILE_REVALIDATE", "300"))
+
+# Буферизованный счетчик просмотров: запись пачкой по таймеру (с) или по числу просмотров
+VIEW_COUNTER_FLUSH_INTERVAL = float(os.getenv("VIEW_COUNTER_FLUSH_INTERVAL", "10"))
+VIEW_COUNTER_FLUSH_THRESHOLD = int(os.getenv("VIEW_COUNTER_FLUSH_THRESHOLD", "500"))
+
+# Длина текста новости в списке при ?view=summary
+NEWS_SUMMARY_CONTENT_LENGTH = int(os.getenv("NEWS_SUMMARY_CONTENT_LENGTH", "300"))
+
+# Сжатие ответов API (brotli, если установлен, иначе gzip)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+
+# Поток новых новостей (SSE /api/news/stream и long-poll /api/news/poll)
+NEWS_STREAM_QUEUE_SIZE = int(os.getenv("NEWS_STREAM_QUEUE_SIZE", "100"))
+NEWS_STREAM_MAX_SUBSCRIBERS = int(os.getenv("NEWS_STREAM_MAX_SUBSCRIBERS", "1000"))
+# Интервал комментария-пинга в SSE и максимальное ожидание long-poll, в секундах
+NEWS_STREAM_KEEPALIVE = float(os.getenv("NEWS_STREAM_KEEPALIVE", "15"))
+NEWS_POLL_TIMEOUT = float(os.getenv("NEWS_POLL_TIMEOUT", "25"))
+# Сколько пропущенных новостей отдается за один запрос догоняющей выборки из БД
+NEWS_STREAM_CATCHUP_LIMIT = int(os.getenv("NEWS_STREAM_CATCHUP_LIMIT", "100"))
+
+# Почти-дубликаты (SimHash): максимальное расстояние Хэмминга между отпечатками
+# 64 бит и число последних новостей, с которыми сравниваются новые
+NEWS_DEDUP_MAX_DISTANCE = int(os.getenv("NEWS_DEDUP_MAX_DISTANCE", "7"))
+NEWS_DEDUP_WINDOW = int(os.getenv("NEWS_DEDUP_WINDOW", "20000"))
+
+# Множество уже сохраненных новостей (fingerprint): точный LRU последних ключей
+# и масштабируемый фильтр Блума по всему архиву с заданной долей ложных срабатываний
+SEEN_SET_LRU_SIZE = int(os.getenv("SEEN_SET_LRU_SIZE", "20000"))
+SEEN_SET_CAPACITY = int(os.getenv("SEEN_SET_CAPACITY", "100000"))
+SEEN_SET_ERROR_RATE = float(os.getenv("SEEN_SET_ERROR_RATE", "0.001"))
+# Снимок множества на диске и минимальный интервал между записями снимка, с.
+# По умолчанию - в кэше пользователя, отдельный файл для каждой БД (DATABASE_URL)
+SEEN_SET_SNAPSHOT_PATH = os.getenv(
+    "SEEN_SET_SNAPSHOT_PATH",
+    os.path.join(
+        os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+        "giftpropaganda",
+        f"seen_set_{hashlib.sha1(DATABASE_URL.encode('utf-8')).hexdigest()[:12]}.bin",
+    ),
+)
+SEEN_SET_SNAPSHOT_INTERVAL = float(os.getenv("SEEN_SET_SNAPSHOT_INTERVAL", "300"))
+
+# Адаптивный опрос источников: интервал (секунды) подбирается так, чтобы на опрос
+# приходилось около POLL_TARGET_ITEMS новых постов, в пределах [MIN, MAX]
+POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", "120"))
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "10800"))
+POLL_TARGET_ITEMS = float(os.getenv("POLL_TARGET_ITEMS", "6"))
+# Интервал для источника без истории публикаций
+POLL_DEFAULT_INTERVAL = float(os.getenv("POLL_DEFAULT_INTERVAL", "3600"))
+# За сколько дней истории оценивается частота публикаций при старте
+POLL_RATE_HISTORY_DAYS = int(os.getenv("POLL_RATE_HISTORY_DAYS", "7"))
+# Удлинение интервала за каждый опрос подряд без новых постов (304 или только старые)
+POLL_EMPTY_BACKOFF = float(os.getenv("POLL_EMPTY_BACKOFF", "1.25"))
+# Первая пауза после ошибки, дальше удваивается до POLL_MAX_INTERVAL
+POLL_ERROR_BACKOFF = float(os.getenv("POLL_ERROR_BACKOFF", "60"))
+# Случайное отклонение интервала (доля), чтобы источники не опрашивались синхронно
+POLL_JITTER = float(os.getenv("POLL_JITTER", "0.1"))
+# Источники, срок которых наступает в пределах окна, опрашиваются одним циклом
+POLL_BATCH_WINDOW = float(os.getenv("POLL_BATCH_WINDOW", "10"))
+
+# Автомат защиты источника: после BREAKER_FAILURE_THRESHOLD ошибок подряд источник
+# не запрашивается BREAKER_COOLDOWN секунд, пауза удваивается до BREAKER_MAX_COOLDOWN
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "300"))
+BREAKER_MAX_COOLDOWN = float(os.getenv("BREAKER_MAX_COOLDOWN", "21600"))
+
+# Загрузку источников ведет только процесс, держащий advisory lock Postgres
+# (ключи LEADER_LOCK_KEY .. LEADER_LOCK_KEY + LEADER_SLOTS - 1, по одному ведущему на ключ)
+LEADER_LOCK_KEY = int(os.getenv("LEADER_LOCK_KEY", "1852143987"))
+LEADER_SLOTS = int(os.getenv("LEADER_SLOTS", "1"))
+# Как часто ведомые пытаются взять блокировку и ведущий проверяет свое соединение
+LEADER_RETRY_INTERVAL = float(os.getenv("LEADER_RETRY_INTERVAL", "15"))
+LEADER_HEARTBEAT_INTERVAL = float(os.getenv("LEADER_HEARTBEAT_INTERVAL", "15"))
+# Аренда источника ведущим: продлевается каждые LEADER_HEARTBEAT_INTERVAL,
+# после падения ведущего источник переходит к другому через SOURCE_LEASE_TTL
+SOURCE_LEASE_TTL = float(os.getenv("SOURCE_LEASE_TTL", "90"))
+# Как часто каждый процесс проверяет в БД новые новости (подписчики получают их через 2-3 интервала)
+NEWS_SYNC_INTERVAL = float(os.getenv("NEWS_SYNC_INTERVAL", "2"))
+
+# Мок данные вместо недоступных источников - только для локальной разработки
+USE_MOCK_DATA = os.getenv("USE_MOCK_DATA", "False").lower() == "true"
+
 # Логирование для отладки
 print(f"DATABASE_URL: {DATABASE_URL[:50]}...")
 print(f"TOKEN: {'SET' if TOKEN else 'NOT SET'}")
 print(f"WEBHOOK_URL: {WEBHOOK_URL}")
+
@@ -1,9 +1,13 @@
 # server/db.py
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, JSON, ForeignKey, text
+from sqlalchemy import create_engine, BigInteger, Column, Integer, String, Text, DateTime, Boolean, JSON, ForeignKey, Index, Computed, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session, relationship
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import sessionmaker, Session, relationship, deferred
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from datetime import datetime
+from typing import AsyncIterator
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 import os
 
 # Получаем URL базы данных из переменных окружения
@@ -21,8 +25,53 @@ engine = create_engine(
 
 # Сессии
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def make_async_url(url: str) -> str:
+    """
+    Преобразует URL базы для драйвера asyncpg: postgresql:// -> postgresql+asyncpg://.
+    Параметр sslmode (psycopg2) asyncpg не понимает, SSL задается через connect_args.
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.split('+', 1)[0]
+    if scheme in ('postgres', 'postgresql'):
+        scheme = 'postgresql+asyncpg'
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if k != 'sslmode'])
+    return urlunsplit((scheme, parts.netloc, parts.path, query, parts.fragment))
+
+
+# Асинхронный движок (asyncpg) для API и записи новостей: запросы к БД не блокируют event loop.
+# Синхронный движок выше используется только при старте (DDL, миграции).
+async_engine = create_async_engine(
+    make_async_url(DATABASE_URL),
+    connect_args={"ssl": "require"},
+    echo=False,
+    pool_pre_ping=True,
+    pool_recycle=300,
+)
+
+# Объекты остаются доступными после commit: ответы собираются уже после записи
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
 Base = declarative_base()
 
+# Версия схемы БД. Увеличивается вместе с каждой новой миграцией в
+# server/main.py:apply_migrations; пока сохраненная версия совпадает,
+# миграции и отражение метаданных при старте не выполняются повторно.
+SCHEMA_VERSION = 10
+
+# Конфигурации полнотекстового поиска: контент смешанный, русский и английский
+SEARCH_CONFIG_RU = 'russian'
+SEARCH_CONFIG_EN = 'english'
+
+# Выражение generated колонки news_items.search_vector (заголовок весит больше текста).
+# Используется и моделью, и миграцией в server/main.py.
+SEARCH_VECTOR_EXPRESSION = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG_RU}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG_EN}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG_RU}', coalesce(content, '')), 'B') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG_EN}', coalesce(content, '')), 'B')"
+)
+
 
 class NewsSource(Base):
     __tablename__ = 'news_sources'
@@ -33,6 +82,18 @@ class NewsSource(Base):
     category = Column(String(100))
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # id последнего обработанного сообщения Telegram канала (дальше грузятся только более новые)
+    last_message_id = Column(BigInteger, nullable=True)
+    # Состояние автомата защиты (server/services/circuit_breaker.py)
+    health_state = Column(String(20), nullable=True)
+    consecutive_failures = Column(Integer, default=0)
+    last_error = Column(String(500), nullable=True)
+    last_success_at = Column(DateTime, nullable=True)
+    last_failure_at = Column(DateTime, nullable=True)
+    retry_at = Column(DateTime, nullable=True)
+    # Аренда источника ведущим процессом загрузки (server/services/leader.py)
+    lease_owner = Column(String(100), nullable=True)
+    lease_until = Column(DateTime, nullable=True)
 
 
 class NewsItem(Base):
@@ -54,18 +115,67 @@ class NewsItem(Base):
     subtitle = Column(String(500), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Уникальный ключ содержимого (server.utils.fingerprint.news_fingerprint) для INSERT ... ON CONFLICT
+    fingerprint = Column(String(64), unique=True, index=True, nullable=True)
+    # SimHash текста (server.utils.simhash) для поиска почти-дубликатов, знаковый 64-битный
+    simhash = Column(BigInteger, nullable=True)
+    # Поисковый вектор считает сама БД; в обычных запросах не загружается
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_EXPRESSION, persisted=True)))
     source = relationship("NewsSource")  # Для удобного доступа
 
+    # Индексы для курсорной пагинации ленты: по категории и по всей ленте
+    __table_args__ = (
+        Index('ix_news_items_category_publish_date_id', 'category', publish_date.desc(), id.desc()),
+        Index('ix_news_items_publish_date_id', publish_date.desc(), id.desc()),
+        Index('ix_news_items_search_vector', 'search_vector', postgresql_using='gin'),
+    )
+
+
+class SourceValidator(Base):
+    """Валидаторы условных запросов (ETag / Last-Modified / хэш) для URL источников"""
+    __tablename__ = 'source_validators'
+    id = Column(Integer, primary_key=True)
+    url = Column(String(1000), unique=True, nullable=False)
+    etag = Column(String(500), nullable=True)
+    last_modified = Column(String(100), nullable=True)
+    content_hash = Column(String(64), nullable=True)
+    checked_at = Column(DateTime, default=datetime.utcnow)
+
+
+class CategoryCount(Base):
+    """Количество новостей по категориям; обновляется в транзакции записи новостей"""
+    __tablename__ = 'category_counts'
+    category = Column(String(100), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class SchemaVersion(Base):
+    """Примененная версия схемы (одна строка)"""
+    __tablename__ = 'schema_version'
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+
 def get_db() -> Session:
     db = SessionLocal()
     try:
-        # Принудительно обновляем метаданные при каждом запросе
-        db.execute(text("SELECT 1"))
         yield db
     finally:
         db.close()
 
 
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    """Закрывает соединения асинхронного пула при остановке приложения"""
+    await async_engine.dispose()
+
+
 def create_tables():
     Base.metadata.create_all(bind=engine)
 
@@ -73,36 +183,26 @@ def create_tables():
 def get_db_session():
     return SessionLocal()
 
-def refresh_metadata():
-    """Принудительно обновляет метаданные SQLAlchemy"""
-    Base.metadata.reflect(bind=engine)
-    print("Метаданные SQLAlchemy обновлены")
 
-# Принудительно обновляем метаданные при импорте
-try:
-    refresh_metadata()
-except Exception as e:
-    print(f"Ошибка при обновлении метаданных: {e}")
-
-# Пересоздаем движок с обновленными метаданными
-def recreate_engine():
-    """Пересоздает движок базы данных с обновленными метаданными"""
-    global engine, SessionLocal
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args={"sslmode": "require"},
-        echo=False,
-        pool_pre_ping=True,
-        pool_recycle=300,
-        pool_reset_on_return='commit'
+def get_schema_version(connection) -> int:
+    """Возвращает примененную версию схемы (0, если миграции еще не применялись)"""
+    row = connection.execute(text("SELECT MAX(version) FROM schema_version")).fetchone()
+    return (row[0] or 0) if row else 0
+
+
+def set_schema_version(connection, version: int):
+    """Сохраняет примененную версию схемы"""
+    connection.execute(text("DELETE FROM schema_version"))
+    connection.execute(
+        text("INSERT INTO schema_version (id, version, applied_at) VALUES (1, :version, NOW())"),
+        {"version": version}
     )
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    refresh_metadata()
-    return engine
-
-# Пересоздаем модель с обновленными метаданными
-def recreate_models():
-    """Пересоздает модели с обновленными метаданными"""
-    global NewsItem, NewsSource
+
+
+def refresh_metadata():
+    """
+    Обновляет метаданные SQLAlchemy из базы.
+    Вызывается один раз при старте приложения, а не на каждый запрос.
+    """
     Base.metadata.reflect(bind=engine)
-    return NewsItem, NewsSource
+    print("Метаданные SQLAlchemy обновлены")
@@ -9,8 +9,21 @@ from sqlalchemy.orm import sessionmaker
 import time
 
 # Исправленные импорты
-from server.db import Base, NewsItem, NewsSource, engine, SessionLocal, create_tables, recreate_engine
+from server.db import (
+    Base, NewsItem, NewsSource, engine, SessionLocal, create_tables, refresh_metadata,
+    async_engine, AsyncSessionLocal, dispose_async_engine,
+    SCHEMA_VERSION, SEARCH_VECTOR_EXPRESSION, get_schema_version, set_schema_version
+)
 from server.parsers.telegram_news_service import TelegramNewsService
+from server.services.dedup_service import backfill_fingerprints, snapshot_seen_set, warm_dedup_indexes
+from server.services.stats_service import REFRESH_CATEGORY_COUNTS_SQL, ensure_category_counts
+from server.services.news_stream import news_broker
+from server.services.leader import run_ingestion
+from server.services.news_sync import news_sync
+from server.services.poll_scheduler import poll_scheduler
+from server.services.view_counter import view_counter
+from server.utils.compression import CompressionMiddleware
+from server.utils.executor import shutdown_parse_executor
 from server.config import TOKEN, WEBHOOK_URL
 
 logging.basicConfig(level=logging.INFO)
@@ -32,10 +45,7 @@ def init_db():
     max_attempts = 10
     for attempt in range(1, max_attempts + 1):
         try:
-            # Пересоздаем движок с обновленными метаданными
-            global engine, SessionLocal
-            engine = recreate_engine()
-            
+            # Используем единый движок процесса (server.db.engine)
             # Проверяем подключение
             with engine.connect() as connection:
                 logger.info("Успешное подключение к базе данных")
@@ -55,11 +65,19 @@ def init_db():
     raise Exception("Не удалось подключиться к базе данных после нескольких попыток")
 
 def apply_migrations():
-    """Применяет миграции базы данных"""
+    """
+    Применяет миграции базы данных, если сохраненная версия схемы меньше SCHEMA_VERSION.
+    Возвращает True, если миграции были применены.
+    """
     try:
-        logger.info("Проверка и применение миграций...")
-
         with engine.connect() as connection:
+            current_version = get_schema_version(connection)
+            if current_version >= SCHEMA_VERSION:
+                logger.info(f"Схема БД актуальна (версия {current_version}), миграции не требуются")
+                return False
+
+            logger.info(f"Применение миграций: версия {current_version} -> {SCHEMA_VERSION}")
+
             # Проверяем, существуют ли новые поля
             result = connection.execute(text("""
                 SELECT column_name 
@@ -67,7 +85,8 @@ def apply_migrations():
                 WHERE table_name = 'news_items' 
                 AND column_name IN (
                     'image_url', 'video_url', 'reading_time', 'views_count', 
-                    'author', 'subtitle', 'created_at', 'updated_at', 'content_html'
+                    'author', 'subtitle', 'created_at', 'updated_at', 'content_html',
+                    'fingerprint', 'simhash'
                 )
             """))
 
@@ -84,7 +103,9 @@ def apply_migrations():
                 ('subtitle', 'VARCHAR(500)'),
                 ('created_at', 'TIMESTAMP DEFAULT NOW()'),
                 ('updated_at', 'TIMESTAMP DEFAULT NOW()'),
-                ('content_html', 'TEXT')
+                ('content_html', 'TEXT'),
+                ('fingerprint', 'VARCHAR(64)'),
+                ('simhash', 'BIGINT')
             ]
 
             for field_name, field_type in fields_to_add:
@@ -99,12 +120,84 @@ def apply_migrations():
                 else:
                     logger.info(f"Поле {field_name} уже существует")
 
+            # Заполняем fingerprint для старых строк тем же news_fingerprint, что и парсер.
+            # При совпадении ключей ключ получает только одна строка, чтобы создать уникальный индекс
+            updated = backfill_fingerprints(connection)
+            logger.info(f"Fingerprint заполнен или исправлен у {updated} новостей")
+            connection.execute(text("""
+                CREATE UNIQUE INDEX IF NOT EXISTS ix_news_items_fingerprint
+                ON news_items (fingerprint)
+            """))
+            connection.commit()
+            logger.info("Уникальный индекс fingerprint проверен")
+
+            # Составные индексы для курсорной пагинации GET /api/news/
+            connection.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_news_items_category_publish_date_id
+                ON news_items (category, publish_date DESC, id DESC)
+            """))
+            connection.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_news_items_publish_date_id
+                ON news_items (publish_date DESC, id DESC)
+            """))
+            connection.commit()
+            logger.info("Индексы пагинации проверены")
+
+            # Полнотекстовый поиск: generated tsvector колонка и GIN индекс
+            connection.execute(text(f"""
+                ALTER TABLE news_items
+                ADD COLUMN IF NOT EXISTS search_vector tsvector
+                GENERATED ALWAYS AS ({SEARCH_VECTOR_EXPRESSION}) STORED
+            """))
+            connection.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_news_items_search_vector
+                ON news_items USING GIN (search_vector)
+            """))
+            connection.commit()
+            logger.info("Поисковый индекс проверен")
+
+            # Последнее обработанное сообщение Telegram канала
+            connection.execute(text("""
+                ALTER TABLE news_sources
+                ADD COLUMN IF NOT EXISTS last_message_id BIGINT
+            """))
+            connection.commit()
+            logger.info("Поле news_sources.last_message_id проверено")
+
+            # Состояние автоматов защиты источников
+            for field_name, field_type in [
+                ('health_state', 'VARCHAR(20)'),
+                ('consecutive_failures', 'INTEGER DEFAULT 0'),
+                ('last_error', 'VARCHAR(500)'),
+                ('last_success_at', 'TIMESTAMP'),
+                ('last_failure_at', 'TIMESTAMP'),
+                ('retry_at', 'TIMESTAMP'),
+            ]:
+                connection.execute(text(f"ALTER TABLE news_sources ADD COLUMN IF NOT EXISTS {field_name} {field_type}"))
+            connection.commit()
+            logger.info("Поля состояния источников проверены")
+
+            # Аренда источников ведущими процессами загрузки
+            connection.execute(text("ALTER TABLE news_sources ADD COLUMN IF NOT EXISTS lease_owner VARCHAR(100)"))
+            connection.execute(text("ALTER TABLE news_sources ADD COLUMN IF NOT EXISTS lease_until TIMESTAMP"))
+            connection.commit()
+            logger.info("Поля аренды источников проверены")
+
+            # Счетчики категорий для /api/stats/ и /api/categories/
+            connection.execute(text(REFRESH_CATEGORY_COUNTS_SQL))
+            connection.commit()
+            logger.info("Счетчики категорий пересчитаны")
+
+            set_schema_version(connection, SCHEMA_VERSION)
+            connection.commit()
+
             logger.info("Миграции применены успешно!")
+            return True
 
     except Exception as e:
         logger.error(f"Ошибка при применении миграций: {e}")
         # Не прерываем запуск приложения из-за ошибки миграции
-        pass
+        return False
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -113,8 +206,20 @@ async def lifespan(app: FastAPI):
     # Инициализация базы данных
     init_db()
 
-    # Применение миграций
+    # Применение миграций (только при смене версии схемы) и однократное отражение метаданных
     apply_migrations()
+    try:
+        refresh_metadata()
+    except Exception as e:
+        logger.warning(f"Ошибка при обновлении метаданных: {e}")
+
+    # Счетчики категорий пересчитываются в миграции; пустая таблица - без нее
+    try:
+        async with AsyncSessionLocal() as db:
+            if await ensure_category_counts(db):
+                logger.info("Счетчики категорий пересчитаны")
+    except Exception as e:
+        logger.error(f"Ошибка при проверке счетчиков категорий: {e}")
 
     # Настройка webhook
     try:
@@ -130,24 +235,44 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Ошибка при установке webhook: {e}")
 
+    # Индексы дедупликации заполняются в фоне, не задерживая старт
+    warm_task = asyncio.create_task(warm_dedup_indexes())
+
     # Запуск периодических задач
     news_service = TelegramNewsService()
+    # Общий пул HTTP соединений живет все время работы приложения
+    await news_service.start()
 
-    async def periodic_update():
-        while True:
-            try:
-                await news_service.update_news_async()
-                logger.info("Периодическое обновление завершено")
-            except Exception as e:
-                logger.error(f"Ошибка при обновлении новостей: {e}")
-            await asyncio.sleep(3600)  # обновляем каждый час
+    # Источники опрашивает только ведущий процесс (advisory lock Postgres), каждый
+    # источник - со своим интервалом по частоте его публикаций
+    update_task = asyncio.create_task(run_ingestion(news_service, poll_scheduler))
+    # Версия данных для ETag читается до первого запроса: у всех воркеров она одна
+    try:
+        await news_sync.refresh_version()
+    except Exception as e:
+        logger.error(f"Ошибка при чтении версии данных: {e}")
+    # Новости, записанные ведущим процессом, - в кэш ответов и SSE подписчикам этого процесса
+    sync_task = asyncio.create_task(news_sync.run())
 
-    asyncio.create_task(periodic_update())
+    # Просмотры новостей записываются в БД пачками
+    view_counter.start()
 
     yield
 
     # Shutdown
     logger.info("Приложение завершает работу")
+    # Открытые SSE потоки завершаются, клиенты переподключатся к другому процессу
+    news_broker.close()
+    update_task.cancel()
+    sync_task.cancel()
+    warm_task.cancel()
+    # Ведущий снимает блокировку и аренды сразу, не дожидаясь их истечения
+    await asyncio.gather(update_task, return_exceptions=True)
+    await view_counter.stop()
+    await snapshot_seen_set(force=True)
+    await news_service.close()
+    shutdown_parse_executor()
+    await dispose_async_engine()
 
 # Создаем FastAPI приложение
 app = FastAPI(
@@ -166,6 +291,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Сжатие ответов (brotli / gzip); заранее сжатые тела из кэша ответов не пересжимаются
+app.add_middleware(CompressionMiddleware)
+
 # Импортируем роутеры после создания app
 from server.api.news import router as news_router
 
@@ -179,7 +307,8 @@ async def root():
 async def health():
     try:
         # Проверяем подключение к БД
-        with engine.connect() as connection:
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
             return {"status": "healthy", "database": "connected"}
     except Exception as e:
         return {"status": "unhealthy", "error": str(e)}
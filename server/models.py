@@ -43,9 +43,27 @@ class NewsItemResponse(BaseModel):
 
 class NewsResponse(BaseModel):
     data: List[NewsItemResponse]
-    total: int
-    page: int
-    pages: int
+    total: Optional[int] = None  # None, если количество не запрашивалось (курсорный режим)
+    page: Optional[int] = None
+    pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # Передать в ?cursor= для следующей страницы
+
+class NewsSearchItemResponse(NewsItemResponse):
+    rank: float
+    title_headline: str  # Заголовок с подсветкой совпадений (<mark>)
+    headline: str  # Фрагменты текста с подсветкой совпадений (<mark>)
+
+
+class NewsSearchResponse(BaseModel):
+    data: List[NewsSearchItemResponse]
+    query: str
+    next_offset: Optional[int] = None  # Передать в ?offset= для следующей страницы
+
+
+class NewsUpdatesResponse(BaseModel):
+    data: List[NewsItemResponse]  # Новые новости в порядке добавления (по возрастанию id)
+    since: int  # Передать в ?since= следующего запроса
+
 
 class CategoryResponse(BaseModel):
     categories: List[str]
@@ -1,40 +1,184 @@
 import feedparser
+import hashlib
 import logging
-from sqlalchemy.orm import Session
+import re
+import time
+from datetime import datetime
 from typing import List, Dict, Any
 
 logger = logging.getLogger(__name__)
 
-async def fetch_rss_feeds(session: Session) -> List[Dict[str, Any]]:
-    """Получение новостей из RSS источников"""
-    try:
-        logger.info("Fetching RSS feeds...")
+# Функции разбора ниже - чистые функции уровня модуля: они выполняются
+# в пуле потоков/процессов (server.utils.executor), поэтому не должны
+# зависеть от состояния сервиса и возвращают только простые dict.
 
-        # Список RSS источников
-        rss_sources = [
-            {"url": "https://vc.ru/rss", "name": "VC.ru", "category": "tech"},
-            {"url": "https://forklog.com/feed/", "name": "ForkLog", "category": "crypto"}
-        ]
+def parse_rss_feed(content: bytes, source: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Разбор RSS ленты с медиа и HTML контентом (для TelegramNewsService.fetch_rss_feed).
+    Если у источника нет категории, поле 'category' остается пустым.
+    """
+    feed = feedparser.parse(content)
 
-        articles = []
-        for source in rss_sources:
+    if not feed.entries:
+        logger.warning(f"No entries found in RSS feed: {source['url']}")
+        return []
+
+    articles = []
+    for entry in feed.entries[:10]:  # Берем только последние 10 новостей
+        # Получаем описание из различных полей
+        description = ""
+        if hasattr(entry, 'summary'):
+            description = entry.summary
+        elif hasattr(entry, 'description'):
+            description = entry.description
+        elif hasattr(entry, 'content'):
+            description = entry.content[0].value if entry.content else ""
+
+        # Очищаем HTML теги
+        clean_description = re.sub(r'<[^>]+>', '', description)
+        clean_description = clean_description[:200] + "..." if len(
+            clean_description) > 200 else clean_description
+
+        # Получаем дату публикации
+        pub_date = datetime.now()
+        if hasattr(entry, 'published_parsed') and entry.published_parsed:
+            pub_date = datetime.fromtimestamp(time.mktime(entry.published_parsed))
+        elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
+            pub_date = datetime.fromtimestamp(time.mktime(entry.updated_parsed))
+
+        # Категория источника; если ее нет, категоризация выполняется в сервисе
+        final_category = source.get('category')
+
+        # Извлекаем медиа контент
+        media_list = []
+
+        # Проверяем enclosures (вложения)
+        if hasattr(entry, 'enclosures') and entry.enclosures:
+            for enclosure in entry.enclosures:
+                if hasattr(enclosure, 'type'):
+                    if enclosure.type.startswith('image/'):
+                        media_list.append({
+                            'type': 'photo',
+                            'url': enclosure.href,
+                            'thumbnail': enclosure.href
+                        })
+                    elif enclosure.type.startswith('video/'):
+                        media_list.append({
+                            'type': 'video',
+                            'url': enclosure.href,
+                            'thumbnail': None
+                        })
+
+        # Проверяем media:content (альтернативный способ)
+        if hasattr(entry, 'media_content') and entry.media_content:
+            for media_item in entry.media_content:
+                if media_item.get('type', '').startswith('image/'):
+                    media_list.append({
+                        'type': 'photo',
+                        'url': media_item.get('url', ''),
+                        'thumbnail': media_item.get('url', '')
+                    })
+
+        # Формируем HTML контент
+        content_html = clean_description
+        for media in media_list:
+            if media.get('type') == 'photo' and media.get('url'):
+                content_html += f'<br><img src="{media["url"]}" style="max-width:100%; height:auto; border-radius:8px; margin:10px 0;"/>'
+            elif media.get('type') == 'video' and media.get('url'):
+                thumbnail = media.get('thumbnail', '')
+                content_html += f'<br><video controls poster="{thumbnail}" style="max-width:100%; height:auto; border-radius:8px; margin:10px 0;">'
+                content_html += f'<source src="{media["url"]}" type="video/mp4">'
+                content_html += '</video>'
+
+        article = {
+            'id': hashlib.md5((entry.link + entry.title).encode()).hexdigest(),
+            'title': entry.title,
+            'text': clean_description,  # Plain text
+            'content_html': content_html,  # HTML с медиа
+            'link': entry.link,
+            'date': pub_date.isoformat(),
+            'source': source['name'],
+            'category': final_category,
+            'channel': 'rss_' + source['name'].lower().replace(' ', '_'),
+            'media': media_list
+        }
+
+        articles.append(article)
+
+    return articles
+
+
+def parse_rss_source(content: bytes, url: str, name: str, category: str) -> List[Dict[str, Any]]:
+    """Разбор RSS ленты (для TelegramNewsService.fetch_rss_source)"""
+    feed = feedparser.parse(content)
+
+    if not feed.entries:
+        logger.warning(f"No entries found in RSS feed: {url}")
+        return []
+
+    articles = []
+    for entry in feed.entries[:10]:  # Берем только 10 последних статей
+        # Извлекаем основную информацию
+        title = entry.get('title', 'Без заголовка')
+        description = entry.get('description', '') or entry.get('summary', '')
+        link = entry.get('link', '')
+
+        # Парсим дату
+        date = datetime.now().isoformat()
+        if hasattr(entry, 'published_parsed') and entry.published_parsed:
             try:
-                feed = feedparser.parse(source["url"])
-                for entry in feed.entries[:5]:  # Берем только 5 последних
-                    article = {
-                        "title": entry.title,
-                        "link": entry.link,
-                        "description": getattr(entry, 'summary', ''),
-                        "source": source["name"],
-                        "category": source["category"]
+                date = datetime.fromtimestamp(time.mktime(entry.published_parsed)).isoformat()
+            except:
+                pass
+
+        # Извлекаем медиа контент
+        media = None
+
+        # Проверяем enclosures (вложения)
+        if hasattr(entry, 'enclosures') and entry.enclosures:
+            for enclosure in entry.enclosures:
+                if hasattr(enclosure, 'type'):
+                    if enclosure.type.startswith('image/'):
+                        media = {
+                            'type': 'photo',
+                            'url': enclosure.href,
+                            'thumbnail': enclosure.href
+                        }
+                        break
+                    elif enclosure.type.startswith('video/'):
+                        media = {
+                            'type': 'video',
+                            'url': enclosure.href,
+                            'thumbnail': None
+                        }
+                        break
+
+        # Проверяем media:content (альтернативный способ)
+        if not media and hasattr(entry, 'media_content') and entry.media_content:
+            for media_item in entry.media_content:
+                if media_item.get('type', '').startswith('image/'):
+                    media = {
+                        'type': 'photo',
+                        'url': media_item.get('url', ''),
+                        'thumbnail': media_item.get('url', '')
                     }
-                    articles.append(article)
-            except Exception as e:
-                logger.error(f"Error parsing RSS {source['url']}: {e}")
+                    break
 
-        logger.info(f"RSS feeds fetched successfully, {len(articles)} articles")
-        return articles
+        # Очищаем HTML теги из описания
+        clean_description = re.sub(r'<[^>]+>', '', description)
+        clean_description = clean_description.strip()[:300] + "..." if len(clean_description) > 300 else clean_description.strip()
 
-    except Exception as e:
-        logger.error(f"Error fetching RSS feeds: {e}")
-        return []
+        article = {
+            'id': hashlib.md5(f"{url}_{title}".encode()).hexdigest(),
+            'title': title,
+            'text': clean_description,
+            'link': link,
+            'date': date,
+            'source': name,
+            'category': category,
+            'media': media
+        }
+
+        articles.append(article)
+
+    return articles
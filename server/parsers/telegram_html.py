@@ -0,0 +1,299 @@
+# server/parsers/telegram_html.py
+"""
+Однопроходный парсер страниц t.me/s/<channel>.
+
+Страница просматривается строго вперед: сообщения находятся по маркеру
+атрибута data-post, и каждое сообщение разбирается только в пределах своего
+фрагмента [data-post текущего, data-post следующего) фиксированным набором
+поисков подстрок (текст, дата, просмотры, медиа). Регулярные выражения
+применяются лишь к отдельным тегам, без DOTALL `.*?` по всей странице,
+поэтому общее время линейно от размера страницы.
+
+При известном id последнего обработанного сообщения (after_id) сообщения
+разбираются с конца страницы (t.me выводит их от старых к новым), и разбор
+останавливается на первом уже виденном.
+"""
+import re
+from datetime import datetime
+from html import unescape
+from typing import Any, Dict, List, Optional, Tuple
+
+_POST_MARKER = 'data-post="'
+_TEXT_MARKER = 'tgme_widget_message_text'
+_DATE_MARKER = 'datetime="'
+_VIEWS_MARKER = 'tgme_widget_message_views">'
+_PHOTO_MARKER = 'tgme_widget_message_photo_wrap'
+_THUMB_MARKER = 'tgme_widget_message_video_thumb'
+_VIDEO_MARKER = '<video'
+_SCRIPT_MARKER = '<script'
+
+_DIV_RE = re.compile(r'<(/?)div\b', re.IGNORECASE)
+_BR_RE = re.compile(r'<br\s*/?>', re.IGNORECASE)
+_TAGS_RE = re.compile(r'<[^>]+>')
+_ATTR_RE = re.compile(r'([a-zA-Z_:][-a-zA-Z0-9_:.]*)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))')
+_CLASS_RE = re.compile(r'\bclass="([^"]*)"')
+_BG_URL_RE = re.compile(r'background-image:\s*url\([\'"]?([^\'")]+)[\'"]?\)')
+
+_MESSAGE_CLASS = 'tgme_widget_message'
+
+
+def _attrs(raw: str) -> Dict[str, str]:
+    """Разбирает строку атрибутов тега в словарь (значения с раскрытыми HTML сущностями)"""
+    result = {}
+    for match in _ATTR_RE.finditer(raw):
+        value = match.group(2)
+        if value is None:
+            value = match.group(3) if match.group(3) is not None else match.group(4)
+        result[match.group(1).lower()] = unescape(value)
+    return result
+
+
+def _tag_at(html_content: str, index: int) -> Tuple[str, int]:
+    """Возвращает содержимое тега, в котором находится index, и позицию после него"""
+    start = html_content.rfind('<', 0, index)
+    end = html_content.find('>', index)
+    if end == -1:
+        end = len(html_content)
+    return html_content[start + 1:end], end + 1
+
+
+def _background_url(raw_tag: str) -> Optional[str]:
+    match = _BG_URL_RE.search(unescape(raw_tag))
+    return match.group(1) if match else None
+
+
+def _block_end(html_content: str, pos: int, limit: int) -> int:
+    """Находит начало закрывающего </div> блока, открытого перед pos"""
+    depth = 1
+    while True:
+        match = _DIV_RE.search(html_content, pos, limit)
+        if match is None:
+            return limit
+        if match.group(1):
+            depth -= 1
+            if depth == 0:
+                return match.start()
+        else:
+            depth += 1
+        pos = match.end()
+
+
+def _html_to_text(fragment: str) -> str:
+    return unescape(_TAGS_RE.sub('', _BR_RE.sub('\n', fragment))).strip()
+
+
+def parse_views(value: Optional[str]) -> Optional[int]:
+    """Преобразует счетчик просмотров t.me ("1.2K", "3M", "845") в число"""
+    if not value:
+        return None
+    value = value.strip().upper()
+    multiplier = 1
+    if value.endswith('K'):
+        multiplier, value = 1000, value[:-1]
+    elif value.endswith('M'):
+        multiplier, value = 1000000, value[:-1]
+    try:
+        return int(float(value) * multiplier)
+    except ValueError:
+        return None
+
+
+def _message_id(post: str) -> Optional[int]:
+    """id сообщения из data-post ("channel/123")"""
+    tail = post.rsplit('/', 1)[-1]
+    return int(tail) if tail.isdigit() else None
+
+
+def _new_message(post: str) -> Dict[str, Any]:
+    return {
+        'post': post,
+        'message_id': _message_id(post),
+        'text': '',
+        'date': None,
+        'views': None,
+        'photo': None,
+        'video': None,
+        'video_thumb': None,
+    }
+
+
+def _parse_message(html_content: str, post: str, start: int, end: int) -> Dict[str, Any]:
+    """Разбирает одно сообщение в пределах его фрагмента страницы [start, end)"""
+    message = _new_message(post)
+    find = html_content.find
+
+    index = find(_TEXT_MARKER, start, end)
+    if index != -1:
+        # Первый блок текста сообщения; цитаты ответов имеют класс ..._metatext и сюда не попадают
+        _, text_start = _tag_at(html_content, index)
+        message['text'] = _html_to_text(html_content[text_start:_block_end(html_content, text_start, end)])
+
+    index = find(_DATE_MARKER, start, end)
+    if index != -1:
+        value_start = index + len(_DATE_MARKER)
+        message['date'] = html_content[value_start:find('"', value_start, end)]
+
+    index = find(_VIEWS_MARKER, start, end)
+    if index != -1:
+        value_start = index + len(_VIEWS_MARKER)
+        message['views'] = unescape(html_content[value_start:find('<', value_start, end)]).strip()
+
+    index = find(_PHOTO_MARKER, start, end)
+    if index != -1:
+        message['photo'] = _background_url(_tag_at(html_content, index)[0])
+
+    index = find(_THUMB_MARKER, start, end)
+    if index != -1:
+        message['video_thumb'] = _background_url(_tag_at(html_content, index)[0])
+
+    index = find(_VIDEO_MARKER, start, end)
+    if index != -1:
+        attrs = _attrs(_tag_at(html_content, index + 1)[0])
+        message['video'] = attrs.get('src')
+        if attrs.get('poster') and message['video_thumb'] is None:
+            message['video_thumb'] = attrs['poster']
+
+    return message
+
+
+def _scan_page(html_content: str, after_id: Optional[int] = None) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Сообщения страницы новее after_id и признак того, что страница дошла до after_id
+    (на ней есть уже виденное сообщение, то есть пропусков до него нет).
+    """
+    # Границы сообщений: (пост, начало тела, конец фрагмента)
+    bounds: List[Tuple[str, int, int]] = []
+    find = html_content.find
+    length = len(html_content)
+
+    index = find(_POST_MARKER)
+    while index != -1:
+        raw_tag, body_start = _tag_at(html_content, index)
+        next_index = find(_POST_MARKER, body_start)
+
+        # Фрагмент сообщения заканчивается на следующем сообщении (или на скриптах в конце страницы)
+        end = length if next_index == -1 else next_index
+        script_index = find(_SCRIPT_MARKER, body_start, end)
+        if script_index != -1:
+            end = script_index
+
+        if raw_tag[:3].lower() == 'div':
+            class_match = _CLASS_RE.search(raw_tag)
+            value_start = index + len(_POST_MARKER)
+            post = html_content[value_start:find('"', value_start)]
+            if class_match and _MESSAGE_CLASS in class_match.group(1).split() and post:
+                bounds.append((unescape(post), body_start, end))
+
+        index = next_index
+
+    messages: List[Dict[str, Any]] = []
+    reached = False
+    for post, body_start, end in reversed(bounds):
+        if after_id is not None:
+            message_id = _message_id(post)
+            if message_id is not None and message_id <= after_id:
+                reached = True
+                break
+        messages.append(_parse_message(html_content, post, body_start, end))
+    messages.reverse()
+    return messages, reached
+
+
+def parse_telegram_page(html_content: str, after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Извлекает сообщения со страницы t.me/s/<channel> за один проход.
+
+    Args:
+        after_id: если задан, возвращаются только сообщения с большим id
+
+    Returns:
+        Список сообщений в порядке страницы (на t.me - от старых к новым):
+        {'post': 'channel/123', 'message_id': 123, 'text', 'date', 'views',
+         'photo', 'video', 'video_thumb'}
+    """
+    return _scan_page(html_content, after_id)[0]
+
+
+def _media(message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Медиа поста в формате сервиса; видео имеет приоритет над фото"""
+    if message['video'] or message['video_thumb']:
+        return {
+            'type': 'video',
+            'url': message['video'],
+            'thumbnail': message['video_thumb'],
+            'width': None,
+            'height': None
+        }
+    if message['photo']:
+        return {
+            'type': 'photo',
+            'url': message['photo'],
+            'thumbnail': message['photo'],  # Для фото thumbnail = основное изображение
+            'width': None,
+            'height': None
+        }
+    return None
+
+
+def build_posts(messages: List[Dict[str, Any]], channel_data: Dict,
+                limit: Optional[int] = 10) -> List[Dict[str, Any]]:
+    """
+    Преобразует сообщения страницы в посты сервиса (только сообщения с текстом).
+    При ограничении limit берутся самые новые сообщения; порядок страницы сохраняется.
+    """
+    posts = []
+
+    for message in reversed(messages):
+        text = message['text']
+        if not text:
+            continue
+        text = text[:300] + "..." if len(text) > 300 else text
+
+        date = datetime.now().isoformat()
+        if message['date']:
+            try:
+                date = datetime.fromisoformat(message['date'].replace('Z', '+00:00')).isoformat()
+            except ValueError:
+                pass
+
+        posts.append({
+            'id': message['post'],
+            'message_id': message['message_id'],
+            'title': text.split('.')[0][:100],
+            'text': text,
+            'link': f"https://t.me/{message['post']}",
+            'date': date,
+            'views': parse_views(message['views']),
+            'source': channel_data['name'],
+            'category': channel_data['category'],
+            'channel': channel_data['username'],
+            'media': _media(message)
+        })
+
+        if limit is not None and len(posts) >= limit:
+            break
+
+    posts.reverse()
+    return posts
+
+
+def parse_telegram_html(content: bytes, channel_data: Dict, limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Парсинг HTML содержимого Telegram канала с поддержкой медиа.
+    Выполняется в пуле разбора (server.utils.executor), поэтому не зависит от сервиса.
+    """
+    return build_posts(parse_telegram_page(content.decode('utf-8', errors='replace')), channel_data, limit)
+
+
+def parse_telegram_updates(content: bytes, channel_data: Dict,
+                           after_id: Optional[int] = None) -> Tuple[List[Dict[str, Any]], List[int], bool]:
+    """
+    Разбор страницы при инкрементальной загрузке канала: все посты новее after_id.
+
+    Returns:
+        (посты, id всех новых сообщений страницы, включая сообщения без текста,
+         признак того, что страница дошла до after_id)
+    """
+    messages, reached = _scan_page(content.decode('utf-8', errors='replace'), after_id)
+    ids = [message['message_id'] for message in messages if message['message_id'] is not None]
+    return build_posts(messages, channel_data, limit=None), ids, reached
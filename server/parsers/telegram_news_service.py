@@ -1,12 +1,38 @@
 import aiohttp
 import asyncio
-import feedparser
-from typing import List, Dict, Any, Optional
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import List, Dict, Any, Iterable, Optional, Set, Tuple
 import json
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import logging
-import re
 import hashlib
+import time
+from functools import partial
+from urllib.parse import urlparse
+
+from server.config import (
+    FETCH_CONCURRENCY,
+    FETCH_CONCURRENCY_PER_HOST,
+    HTTP_POOL_LIMIT,
+    HTTP_POOL_LIMIT_PER_HOST,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_REQUEST_TIMEOUT,
+    NEWS_DEDUP_MAX_DISTANCE,
+    TELEGRAM_BASE_URL,
+    TELEGRAM_MAX_PAGES,
+    USE_MOCK_DATA,
+)
+from server.parsers.rss import parse_rss_feed, parse_rss_source
+from server.parsers.telegram_html import parse_telegram_html, parse_telegram_updates
+from server.services.circuit_breaker import SourceParseError, SourceUnavailable, source_breakers
+from server.services.news_sync import news_sync
+from server.utils.cache import news_cache
+from server.utils.categorize import KeywordCategorizer
+from server.utils.executor import run_in_parse_executor
+from server.utils.fingerprint import news_fingerprint
+from server.utils.seen_set import MAYBE, SEEN
+from server.utils.simhash import SimHashIndex, dedupe_posts, post_text, simhash, to_signed, to_unsigned
 
 logger = logging.getLogger(__name__)
 
@@ -54,6 +80,27 @@ class TelegramNewsService:
         self.cache = {}
         self.cache_ttl = timedelta(minutes=30)  # Кэш на 30 минут согласно ТЗ
 
+        # Общий HTTP клиент сервиса (создается в start(), закрывается в close())
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        # Валидаторы условных запросов: url -> {'etag', 'last_modified', 'content_hash'}
+        # Новые значения попадают в _pending_validators и сохраняются только после записи в БД
+        self.validators: Dict[str, Dict[str, Optional[str]]] = {}
+        self._pending_validators: Dict[str, Dict[str, Optional[str]]] = {}
+        self._validators_loaded = False
+
+        # id последних обработанных сообщений каналов: username -> id
+        # Так же, как валидаторы, новые значения сохраняются только после записи в БД
+        self.last_message_ids: Dict[str, int] = {}
+        self._pending_message_ids: Dict[str, int] = {}
+        self._message_ids_loaded = False
+
+        # Состояние автоматов защиты источников загружается из news_sources один раз
+        self._health_loaded = False
+
+        # HTTP статус последнего условного запроса по URL (0 - ошибка соединения)
+        self.last_status: Dict[str, int] = {}
+
         # Ключевые слова для категоризации согласно ТЗ
         self.keywords = {
             'gifts': [
@@ -82,40 +129,227 @@ class TelegramNewsService:
             ]
         }
 
-    def categorize_content(self, title: str, description: str = "") -> str:
+        # Автомат для категоризации строится один раз из self.keywords
+        # Приоритет при равенстве очков: gifts > crypto > nft > tech > community
+        self.categorizer = KeywordCategorizer(
+            self.keywords,
+            priority=['gifts', 'crypto', 'nft', 'tech', 'community']
+        )
+
+    async def start(self):
         """
-        Автоматическая категоризация контента по ключевым словам согласно ТЗ
-        Приоритет: gifts > crypto > nft > tech > community
+        Создает долгоживущий HTTP клиент с пулом соединений.
+        Keep-alive и кэш DNS позволяют не платить за DNS + TCP + TLS
+        на каждый запрос к одному и тому же хосту (t.me).
         """
-        content = (title + " " + description).lower()
+        if self._session is not None and not self._session.closed:
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=HTTP_REQUEST_TIMEOUT),
+        )
+        logger.info(
+            f"HTTP client started (limit={HTTP_POOL_LIMIT}, per_host={HTTP_POOL_LIMIT_PER_HOST})"
+        )
+
+    async def close(self):
+        """Закрывает HTTP клиент и освобождает соединения пула"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("HTTP client closed")
+        self._session = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Возвращает общий HTTP клиент, создавая его при первом обращении"""
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+
+    async def _fetch(self, url: str, conditional: bool = False) -> Tuple[int, Optional[bytes]]:
+        """
+        GET запрос через общий HTTP клиент.
+        При conditional=True отправляет If-None-Match / If-Modified-Since и возвращает
+        (304, None), если источник не изменился: сервер ответил 304 или хэш тела совпал.
+        """
+        known = self.validators.get(url) if conditional else None
+        headers = {}
+        if known:
+            if known.get('etag'):
+                headers['If-None-Match'] = known['etag']
+            if known.get('last_modified'):
+                headers['If-Modified-Since'] = known['last_modified']
+
+        session = await self._get_session()
+        try:
+            async with session.get(url, headers=headers) as response:
+                if conditional:
+                    self.last_status[url] = response.status
+                if response.status == 304:
+                    return 304, None
+                if response.status != 200:
+                    return response.status, None
+                body = await response.read()
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+        except Exception:
+            if conditional:
+                self.last_status[url] = 0
+            raise
 
-        # Подсчитываем совпадения для каждой категории
-        category_scores = {}
-        for category, keywords in self.keywords.items():
-            score = sum(1 for keyword in keywords if keyword in content)
-            if score > 0:
-                category_scores[category] = score
+        if conditional:
+            content_hash = hashlib.sha256(body).hexdigest()
+            if known and known.get('content_hash') == content_hash:
+                return 304, None
+            self._pending_validators[url] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'content_hash': content_hash,
+            }
 
-        if not category_scores:
-            return 'general'
+        return 200, body
 
-        # Возвращаем категорию с наибольшим количеством совпадений
-        # При равенстве очков используем приоритет
-        priority = ['gifts', 'crypto', 'nft', 'tech', 'community']
+    async def _load_validators(self):
+        """Загружает валидаторы из БД один раз за время жизни сервиса"""
+        if self._validators_loaded:
+            return
 
-        max_score = max(category_scores.values())
-        best_categories = [cat for cat, score in category_scores.items() if score == max_score]
+        from server.db import AsyncSessionLocal
+        from server.services.validator_service import load_validators
 
-        for priority_cat in priority:
-            if priority_cat in best_categories:
-                return priority_cat
+        try:
+            async with AsyncSessionLocal() as db:
+                self.validators = await load_validators(db)
+            self._validators_loaded = True
+            logger.info(f"Loaded {len(self.validators)} conditional GET validators")
+        except Exception as e:
+            logger.error(f"Error loading validators: {e}")
+
+    async def _commit_validators(self):
+        """Сохраняет валидаторы, полученные в текущем цикле, после успешной записи новостей"""
+        if not self._pending_validators:
+            return
+
+        from server.db import AsyncSessionLocal
+        from server.services.validator_service import save_validators
+
+        try:
+            async with AsyncSessionLocal() as db:
+                await save_validators(db, self._pending_validators)
+                await db.commit()
+            self.validators.update(self._pending_validators)
+            self._pending_validators = {}
+        except Exception as e:
+            logger.error(f"Error saving validators: {e}")
+
+    async def _load_message_ids(self):
+        """Загружает id последних обработанных сообщений каналов один раз за время жизни сервиса"""
+        if self._message_ids_loaded:
+            return
 
-        return list(category_scores.keys())[0]  # Fallback
+        from server.db import AsyncSessionLocal
+        from server.services.source_service import load_last_message_ids
 
-    async def fetch_telegram_channel(self, channel_username: str) -> List[Dict[str, Any]]:
+        try:
+            async with AsyncSessionLocal() as db:
+                marks = await load_last_message_ids(db)
+            usernames = {channel['name']: channel['username'] for channel in self.channels}
+            self.last_message_ids = {usernames[name]: value for name, value in marks.items() if name in usernames}
+            self._message_ids_loaded = True
+            logger.info(f"Loaded last message ids for {len(self.last_message_ids)} Telegram channels")
+        except Exception as e:
+            logger.error(f"Error loading last message ids: {e}")
+
+    async def _commit_message_ids(self):
+        """Сохраняет id последних сообщений, полученные в текущем цикле, после успешной записи новостей"""
+        if not self._pending_message_ids:
+            return
+
+        from server.db import AsyncSessionLocal
+        from server.services.source_service import save_last_message_ids
+
+        names = {channel['username']: channel['name'] for channel in self.channels}
+        try:
+            async with AsyncSessionLocal() as db:
+                await save_last_message_ids(db, {
+                    names[username]: value for username, value in self._pending_message_ids.items()
+                })
+                await db.commit()
+            self.last_message_ids.update(self._pending_message_ids)
+            self._pending_message_ids = {}
+        except Exception as e:
+            logger.error(f"Error saving last message ids: {e}")
+
+    async def _load_health(self):
+        """Восстанавливает состояние автоматов защиты источников один раз за время жизни сервиса"""
+        if self._health_loaded:
+            return
+
+        from server.db import AsyncSessionLocal
+        from server.services.source_service import load_source_health
+
+        try:
+            async with AsyncSessionLocal() as db:
+                rows = await load_source_health(db)
+            source_breakers.load(rows)
+            self._health_loaded = True
+            logger.info(f"Loaded health state for {len(rows)} sources")
+        except Exception as e:
+            logger.error(f"Error loading source health: {e}")
+
+    async def _commit_health(self):
+        """Сохраняет изменившееся за цикл состояние автоматов защиты в news_sources"""
+        states = source_breakers.take_dirty()
+        if not states:
+            return
+
+        from server.db import AsyncSessionLocal
+        from server.services.news_service import get_or_create_sources
+        from server.services.source_service import save_source_health
+
+        try:
+            async with AsyncSessionLocal() as db:
+                # Строка источника нужна и тем, кто еще ни разу не дал ни одной новости
+                await get_or_create_sources(db, self.source_rows(states))
+                await save_source_health(db, states)
+                await db.commit()
+        except Exception as e:
+            logger.error(f"Error saving source health: {e}")
+
+    def _hold_back_message_ids(self, dropped_posts: List[Dict[str, Any]]):
+        """
+        Не сдвигает отметку канала дальше постов, которые не попали в запись
+        (ограничение размера пачки), чтобы они загрузились в следующем цикле.
+        Новый валидатор страницы канала тоже не сохраняется, иначе она вернет 304.
+        """
+        for post in dropped_posts:
+            channel, message_id = post.get('channel'), post.get('message_id')
+            if channel not in self._pending_message_ids or message_id is None:
+                continue
+            previous = self.last_message_ids.get(channel, 0)
+            self._pending_message_ids[channel] = max(previous, min(self._pending_message_ids[channel], message_id - 1))
+            self._pending_validators.pop(f"{TELEGRAM_BASE_URL}/s/{channel}", None)
+
+    def categorize_content(self, title: str, description: str = "") -> str:
+        """
+        Автоматическая категоризация контента по ключевым словам согласно ТЗ
+        Приоритет: gifts > crypto > nft > tech > community
+        """
+        return self.categorizer.categorize(title, description)
+
+    async def fetch_telegram_channel(self, channel_username: str, conditional: bool = False,
+                                     incremental: bool = False) -> List[Dict[str, Any]]:
         """
         Получение новостей из Telegram канала через веб-скрапинг
         Согласно ТЗ - интеграция с Telegram каналами для получения актуальных новостей
+        При conditional=True неизмененная страница не скачивается и не парсится
+        При incremental=True возвращаются только сообщения новее последнего обработанного
         """
         try:
             channel_data = next((ch for ch in self.channels if ch['username'] == channel_username), None)
@@ -124,124 +358,105 @@ class TelegramNewsService:
                 return []
 
             # Используем публичный API Telegram для получения постов
-            url = f"https://t.me/s/{channel_username}"
+            url = f"{TELEGRAM_BASE_URL}/s/{channel_username}"
 
-            async with aiohttp.ClientSession() as session:
-                try:
-                    async with session.get(url, timeout=10) as response:
-                        if response.status == 200:
-                            html_content = await response.text()
-                            return self._parse_telegram_html(html_content, channel_data)
-                        else:
-                            logger.warning(f"Failed to fetch {url}, status: {response.status}")
-                            return self._generate_mock_posts(channel_data)
-                except aiohttp.ClientTimeout:
-                    logger.warning(f"Timeout fetching {url}, using mock data")
-                    return self._generate_mock_posts(channel_data)
-                except Exception as e:
-                    logger.warning(f"Error fetching {url}: {e}, using mock data")
-                    return self._generate_mock_posts(channel_data)
+            try:
+                status, body = await self._fetch(url, conditional=conditional)
+            except asyncio.TimeoutError:
+                return self._source_unavailable(channel_data, f"Timeout fetching {url}")
+            except aiohttp.ClientError as e:
+                return self._source_unavailable(channel_data, f"Error fetching {url}: {e}")
+
+            if status == 304:
+                logger.info(f"{url} not modified, skipping")
+                return []
+            if status != 200:
+                return self._source_unavailable(channel_data, f"Failed to fetch {url}, status: {status}")
+            if incremental:
+                return await self._fetch_channel_updates(channel_data, url, body)
+
+            # Разбор страницы выполняется вне event loop
+            posts = await run_in_parse_executor(parse_telegram_html, body, channel_data)
+            if not posts:
+                return self._source_unavailable(channel_data, f"No posts parsed from {url}", SourceParseError)
+            return posts
 
+        except SourceUnavailable:
+            raise
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            raise SourceUnavailable(f"Error fetching {channel_username}: {e or 'timeout'}")
         except Exception as e:
-            logger.error(f"Error in fetch_telegram_channel for {channel_username}: {e}")
-            return []
-
-    def _parse_telegram_html(self, html_content: str, channel_data: Dict) -> List[Dict[str, Any]]:
-        """Парсинг HTML содержимого Telegram канала с поддержкой медиа"""
-        import re
-        from html import unescape
+            raise SourceParseError(f"Error in fetch_telegram_channel for {channel_username}: {e}") from e
 
-        posts = []
-
-        # Простой парсер для получения постов из HTML
-        # В реальном проекте лучше использовать BeautifulSoup
-        post_pattern = r'<div class="tgme_widget_message.*?</div>\s*</div>\s*</div>'
-        text_pattern = r'<div class="tgme_widget_message_text.*?".*?>(.*?)</div>'
-        date_pattern = r'<time.*?datetime="([^"]+)"'
-
-        # Паттерны для медиа контента
-        photo_pattern = r'<a.*?class="tgme_widget_message_photo_wrap.*?style="background-image:url\(&quot;([^&]+)&quot;\)"'
-        video_pattern = r'<video.*?src="([^"]+)".*?poster="([^"]*)".*?>'
-        video_thumb_pattern = r'<video.*?poster="([^"]+)".*?>'
-
-        post_matches = re.findall(post_pattern, html_content, re.DOTALL)
-
-        for i, post_html in enumerate(post_matches[:10]):  # Берем только первые 10 постов
-            # Извлекаем текст поста
-            text_match = re.search(text_pattern, post_html, re.DOTALL)
-            text = ""
-            if text_match:
-                text = unescape(re.sub(r'<[^>]+>', '', text_match.group(1)))
-                text = text.strip()[:300] + "..." if len(text) > 300 else text.strip()
-
-            # Извлекаем дату
-            date_match = re.search(date_pattern, post_html)
-            date = datetime.now().isoformat()
-            if date_match:
-                try:
-                    date = datetime.fromisoformat(date_match.group(1).replace('Z', '+00:00')).isoformat()
-                except:
-                    pass
-
-            # Извлекаем медиа контент
-            media = None
-
-            # Проверяем на фото
-            photo_match = re.search(photo_pattern, post_html)
-            if photo_match:
-                photo_url = photo_match.group(1).replace('&amp;', '&')
-                media = {
-                    'type': 'photo',
-                    'url': photo_url,
-                    'thumbnail': photo_url,  # Для фото thumbnail = основное изображение
-                    'width': None,
-                    'height': None
-                }
-
-            # Проверяем на видео
-            video_match = re.search(video_pattern, post_html)
-            if video_match:
-                video_url = video_match.group(1)
-                thumbnail_url = video_match.group(2) if len(video_match.groups()) > 1 else None
-                media = {
-                    'type': 'video',
-                    'url': video_url,
-                    'thumbnail': thumbnail_url,
-                    'width': None,
-                    'height': None
-                }
-            elif not media:  # Если не нашли полное видео, ищем только thumbnail
-                video_thumb_match = re.search(video_thumb_pattern, post_html)
-                if video_thumb_match:
-                    media = {
-                        'type': 'video',
-                        'url': None,  # URL видео не найден
-                        'thumbnail': video_thumb_match.group(1),
-                        'width': None,
-                        'height': None
-                    }
-
-            if text:  # Только если удалось извлечь текст
-                # Генерируем заголовок из первых слов
-                title = text.split('.')[0][:100] if text else f"Пост от {channel_data['name']}"
-
-                post = {
-                    'id': hashlib.md5(f"{channel_data['username']}_{i}_{text[:50]}".encode()).hexdigest(),
-                    'title': title,
-                    'text': text,
-                    'link': f"https://t.me/{channel_data['username']}",
-                    'date': date,
-                    'source': channel_data['name'],
-                    'category': channel_data['category'],
-                    'channel': channel_data['username'],
-                    'media': media  # Добавляем медиа данные
-                }
-
-                posts.append(post)
-
-        if not posts:  # Если парсинг не удался, используем мок данные
+    def _source_unavailable(self, channel_data: Dict, reason: str,
+                            error: type = SourceUnavailable) -> List[Dict[str, Any]]:
+        """
+        Недоступный канал: SourceUnavailable (или SourceParseError) для автомата
+        защиты источника. Мок данные вместо канала - только при USE_MOCK_DATA
+        (локальная разработка).
+        """
+        if USE_MOCK_DATA:
+            logger.warning(f"{reason}, using mock data")
             return self._generate_mock_posts(channel_data)
+        raise error(reason)
 
+    async def _guarded_fetch(self, name: str, fetch) -> List[Dict[str, Any]]:
+        """
+        Загрузка источника через его автомат защиты: отключенный источник не
+        запрашивается, любое исключение загрузки считается ошибкой источника.
+        После ошибки новый валидатор страницы не сохраняется (иначе неразобранная
+        страница возвращала бы 304), а планировщик получает статус 0.
+        """
+        breaker = source_breakers.get(name)
+        if not breaker.allow():
+            logger.info(f"{name}: source disabled for {breaker.retry_in():.0f}s more, skipping")
+            return []
+        try:
+            posts = await fetch()
+        except Exception as e:
+            breaker.record_failure(str(e))
+            url = self._source_url(name)
+            if url:
+                self._pending_validators.pop(url, None)
+                self.last_status[url] = 0
+            raise
+        breaker.record_success()
+        return posts
+
+    async def _fetch_channel_updates(self, channel_data: Dict, url: str, body: bytes) -> List[Dict[str, Any]]:
+        """
+        Новые сообщения канала начиная с последней страницы: разбор останавливается на
+        уже обработанном сообщении, а если новых сообщений больше страницы, предыдущие
+        страницы догружаются через ?before=<самое старое новое сообщение>.
+        """
+        username = channel_data['username']
+        last_id = self.last_message_ids.get(username)
+
+        posts, ids, reached = await run_in_parse_executor(parse_telegram_updates, body, channel_data, last_id)
+        if not ids and not reached:
+            # На странице нет ни одного сообщения - разметка изменилась или канал недоступен
+            return self._source_unavailable(channel_data, f"No messages parsed from {url}", SourceParseError)
+
+        new_ids = list(ids)
+        pages = 1
+        # Без отметки (первый запуск) достаточно последней страницы
+        while last_id is not None and not reached and ids and pages < TELEGRAM_MAX_PAGES:
+            status, body = await self._fetch(f"{url}?before={min(ids)}")
+            if status != 200:
+                logger.warning(f"Failed to fetch {url}?before={min(ids)}, status: {status}")
+                break
+            older_posts, ids, reached = await run_in_parse_executor(
+                parse_telegram_updates, body, channel_data, last_id
+            )
+            posts = older_posts + posts
+            new_ids.extend(ids)
+            pages += 1
+
+        if last_id is not None and not reached and new_ids:
+            logger.warning(f"{username}: more than {pages} pages of new messages, older ones skipped")
+        if new_ids:
+            self._pending_message_ids[username] = max(new_ids)
+        logger.info(f"{username}: {len(new_ids)} new messages after {last_id} ({pages} pages)")
         return posts
 
     def _generate_mock_posts(self, channel_data: Dict) -> List[Dict[str, Any]]:
@@ -315,103 +530,28 @@ class TelegramNewsService:
     async def fetch_rss_feed(self, source: Dict[str, str]) -> List[Dict[str, Any]]:
         """Получение новостей из RSS источника"""
         try:
-            # Используем feedparser для парсинга RSS
-            feed = feedparser.parse(source['url'])
+            # Загружаем ленту через общий HTTP клиент (feedparser больше не ходит в сеть сам)
+            status, content = await self._fetch(source['url'])
+            if status != 200:
+                raise SourceUnavailable(f"Failed to fetch RSS {source['url']}, status: {status}")
 
-            if not feed.entries:
-                logger.warning(f"No entries found in RSS feed: {source['url']}")
-                return []
+            # Разбор ленты выполняется вне event loop
+            articles = await run_in_parse_executor(parse_rss_feed, content, source)
+            if not articles:
+                raise SourceParseError(f"No entries parsed from RSS {source['url']}")
 
-            articles = []
-            for entry in feed.entries[:10]:  # Берем только последние 10 новостей
-                # Получаем описание из различных полей
-                description = ""
-                if hasattr(entry, 'summary'):
-                    description = entry.summary
-                elif hasattr(entry, 'description'):
-                    description = entry.description
-                elif hasattr(entry, 'content'):
-                    description = entry.content[0].value if entry.content else ""
-
-                # Очищаем HTML теги
-                clean_description = re.sub(r'<[^>]+>', '', description)
-                clean_description = clean_description[:200] + "..." if len(
-                    clean_description) > 200 else clean_description
-
-                # Получаем дату публикации
-                pub_date = datetime.now()
-                if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                    import time
-                    pub_date = datetime.fromtimestamp(time.mktime(entry.published_parsed))
-                elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
-                    import time
-                    pub_date = datetime.fromtimestamp(time.mktime(entry.updated_parsed))
-
-                # Автоматическая категоризация
-                auto_category = self.categorize_content(entry.title, clean_description)
-                final_category = source.get('category', auto_category)
-
-                # Извлекаем медиа контент
-                media_list = []
-
-                # Проверяем enclosures (вложения)
-                if hasattr(entry, 'enclosures') and entry.enclosures:
-                    for enclosure in entry.enclosures:
-                        if hasattr(enclosure, 'type'):
-                            if enclosure.type.startswith('image/'):
-                                media_list.append({
-                                    'type': 'photo',
-                                    'url': enclosure.href,
-                                    'thumbnail': enclosure.href
-                                })
-                            elif enclosure.type.startswith('video/'):
-                                media_list.append({
-                                    'type': 'video',
-                                    'url': enclosure.href,
-                                    'thumbnail': None
-                                })
-
-                # Проверяем media:content (альтернативный способ)
-                if hasattr(entry, 'media_content') and entry.media_content:
-                    for media_item in entry.media_content:
-                        if media_item.get('type', '').startswith('image/'):
-                            media_list.append({
-                                'type': 'photo',
-                                'url': media_item.get('url', ''),
-                                'thumbnail': media_item.get('url', '')
-                            })
-
-                # Формируем HTML контент
-                content_html = clean_description
-                for media in media_list:
-                    if media.get('type') == 'photo' and media.get('url'):
-                        content_html += f'<br><img src="{media["url"]}" style="max-width:100%; height:auto; border-radius:8px; margin:10px 0;"/>'
-                    elif media.get('type') == 'video' and media.get('url'):
-                        thumbnail = media.get('thumbnail', '')
-                        content_html += f'<br><video controls poster="{thumbnail}" style="max-width:100%; height:auto; border-radius:8px; margin:10px 0;">'
-                        content_html += f'<source src="{media["url"]}" type="video/mp4">'
-                        content_html += '</video>'
-
-                article = {
-                    'id': hashlib.md5((entry.link + entry.title).encode()).hexdigest(),
-                    'title': entry.title,
-                    'text': clean_description,  # Plain text
-                    'content_html': content_html,  # HTML с медиа
-                    'link': entry.link,
-                    'date': pub_date.isoformat(),
-                    'source': source['name'],
-                    'category': final_category,
-                    'channel': 'rss_' + source['name'].lower().replace(' ', '_'),
-                    'media': media_list
-                }
-
-                articles.append(article)
+            uncategorized = [article for article in articles if not article['category']]
+            for article, category in zip(uncategorized, self.categorizer.categorize_many(uncategorized)):
+                article['category'] = category
 
             return articles
 
+        except SourceUnavailable:
+            raise
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            raise SourceUnavailable(f"Error fetching RSS feed {source['url']}: {e or 'timeout'}")
         except Exception as e:
-            logger.error(f"Error fetching RSS feed {source['url']}: {e}")
-            return []
+            raise SourceParseError(f"Error parsing RSS feed {source['url']}: {e}") from e
         """Получить информацию о канале через Telegram API"""
         try:
             # В реальной реализации здесь будет вызов к Telegram Bot API
@@ -435,7 +575,9 @@ class TelegramNewsService:
         """Получить последние посты из канала"""
         try:
             # В реальной реализации здесь будет вызов к Telegram Bot API
-            # Пока генерируем мок данные
+            # Пока генерируем мок данные - только для локальной разработки
+            if not USE_MOCK_DATA:
+                return []
             channel_data = next((ch for ch in self.channels if ch['username'] == username), None)
             if not channel_data:
                 return []
@@ -530,7 +672,9 @@ class TelegramNewsService:
             # Получаем посты из Telegram каналов
             telegram_tasks = []
             for channel in telegram_channels:
-                telegram_tasks.append(self.fetch_telegram_channel(channel['username']))
+                telegram_tasks.append(
+                    self._guarded_fetch(channel['name'], partial(self.fetch_telegram_channel, channel['username']))
+                )
 
             telegram_results = await asyncio.gather(*telegram_tasks, return_exceptions=True)
 
@@ -551,7 +695,7 @@ class TelegramNewsService:
             # Получаем статьи из RSS
             rss_tasks = []
             for source in rss_sources:
-                rss_tasks.append(self.fetch_rss_feed(source))
+                rss_tasks.append(self._guarded_fetch(source['name'], partial(self.fetch_rss_feed, source)))
 
             rss_results = await asyncio.gather(*rss_tasks, return_exceptions=True)
 
@@ -563,16 +707,8 @@ class TelegramNewsService:
                     logger.error(f"Error fetching RSS from {rss_sources[i]['url']}: {result}")
 
             # 3. Обработка и дедупликация согласно ТЗ
-            # Удаляем дубликаты по заголовку и ссылке
-            seen = set()
-            unique_posts = []
-            for post in all_posts:
-                # Создаем ключ для дедупликации
-                title_clean = re.sub(r'[^\w\s]', '', post['title'].lower()).strip()
-                key = (title_clean, post.get('link', ''))
-                if key not in seen:
-                    seen.add(key)
-                    unique_posts.append(post)
+            # Удаляем почти-дубликаты (репосты с другими эмодзи, ссылкой или словом)
+            unique_posts = dedupe_posts(all_posts, NEWS_DEDUP_MAX_DISTANCE)
 
             logger.info(f"After deduplication: {len(unique_posts)} unique posts from {len(all_posts)} total")
 
@@ -630,45 +766,154 @@ class TelegramNewsService:
             logger.error(f"Error getting channels info: {e}")
             return []
 
-    async def update_news_async(self):
+    def source_names(self) -> List[str]:
+        """Названия всех источников (Telegram каналов и RSS лент)"""
+        return [channel['name'] for channel in self.channels] + [source['name'] for source in self.rss_sources]
+
+    def source_rows(self, names: Iterable[str]) -> Dict[str, Dict[str, Optional[str]]]:
+        """Поля строк news_sources для источников names (для get_or_create_sources)"""
+        names = set(names)
+        rows: Dict[str, Dict[str, Optional[str]]] = {}
+        for channel in self.channels:
+            if channel['name'] in names:
+                rows[channel['name']] = {'url': f"https://t.me/{channel['username']}",
+                                         'source_type': 'telegram', 'category': channel['category']}
+        for source in self.rss_sources:
+            if source['name'] in names:
+                rows[source['name']] = {'url': source['url'], 'source_type': 'rss', 'category': source['category']}
+        return rows
+
+    def reload_source_state(self):
         """
-        Асинхронное обновление новостей из всех источников
-        Метод для периодического обновления в main.py
+        Валидаторы, отметки каналов и состояние источников будут заново прочитаны из БД
+        в следующем цикле: пока процесс не вел загрузку, их мог менять другой ведущий.
         """
-        try:
-            logger.info(f"Fetching from {len(self.channels)} Telegram channels")
-
-            # Получаем новости из Telegram каналов
-            all_posts = []
-            for channel in self.channels:
+        self._validators_loaded = False
+        self._message_ids_loaded = False
+        self._health_loaded = False
+
+    def _source_url(self, name: str) -> Optional[str]:
+        """URL страницы источника, по статусу которой судят об исходе опроса"""
+        for channel in self.channels:
+            if channel['name'] == name:
+                return f"{TELEGRAM_BASE_URL}/s/{channel['username']}"
+        for source in self.rss_sources:
+            if source['name'] == name:
+                return source['url']
+        return None
+
+    async def _fetch_all_sources(self, names: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Параллельная загрузка Telegram каналов и RSS источников (всех или только names).
+        Общее число одновременных запросов ограничено FETCH_CONCURRENCY,
+        число запросов к одному хосту - FETCH_CONCURRENCY_PER_HOST.
+        В конце цикла в лог выводится время загрузки каждого источника.
+        """
+        global_limit = asyncio.Semaphore(FETCH_CONCURRENCY)
+        host_limits: Dict[str, asyncio.Semaphore] = {}
+        timings: List[Tuple[str, float, int]] = []
+
+        async def run(label: str, url: str, fetch) -> List[Dict[str, Any]]:
+            host = urlparse(url).netloc
+            host_limit = host_limits.setdefault(host, asyncio.Semaphore(FETCH_CONCURRENCY_PER_HOST))
+            async with global_limit, host_limit:
+                started = time.perf_counter()
+                posts: List[Dict[str, Any]] = []
                 try:
-                    posts = await self.fetch_telegram_channel(channel['username'])
-                    logger.info(f"Got {len(posts)} posts from {channel['username']}")
-                    all_posts.extend(posts)
-                except Exception as e:
-                    logger.error(f"Error fetching from channel {channel['username']}: {e}")
-                    continue
+                    posts = await fetch()
+                    return posts
+                finally:
+                    timings.append((label, time.perf_counter() - started, len(posts)))
+
+        channels = [ch for ch in self.channels if names is None or ch['name'] in names]
+        rss_sources = [src for src in self.rss_sources if names is None or src['name'] in names]
+
+        jobs = []
+        for channel in channels:
+            jobs.append((
+                channel['username'],
+                run(
+                    channel['username'],
+                    f"{TELEGRAM_BASE_URL}/s/{channel['username']}",
+                    lambda ch=channel: self._guarded_fetch(ch['name'], partial(
+                        self.fetch_telegram_channel, ch['username'], conditional=True, incremental=True
+                    )),
+                ),
+            ))
+        for source in rss_sources:
+            jobs.append((
+                source['name'],
+                run(
+                    source['name'],
+                    source['url'],
+                    lambda src=source: self._guarded_fetch(src['name'], partial(
+                        self.fetch_rss_source, src['url'], src['name'], src['category'], conditional=True
+                    )),
+                ),
+            ))
+
+        logger.info(
+            f"Fetching {len(channels)} Telegram channels and {len(rss_sources)} RSS sources "
+            f"(concurrency={FETCH_CONCURRENCY}, per_host={FETCH_CONCURRENCY_PER_HOST})"
+        )
+        cycle_started = time.perf_counter()
+        results = await asyncio.gather(*(job for _, job in jobs), return_exceptions=True)
+        cycle_time = time.perf_counter() - cycle_started
+
+        all_posts = []
+        for (label, _), result in zip(jobs, results):
+            if isinstance(result, list):
+                all_posts.extend(result)
+            else:
+                logger.error(f"Error fetching from {label}: {result}")
+
+        for label, elapsed, count in sorted(timings, key=lambda t: t[1], reverse=True):
+            logger.info(f"  {label}: {elapsed:.2f}s, {count} posts")
+        slowest = max((t[1] for t in timings), default=0.0)
+        logger.info(
+            f"Fetched {len(all_posts)} posts from {len(jobs)} sources in {cycle_time:.2f}s "
+            f"(slowest source {slowest:.2f}s, sum {sum(t[1] for t in timings):.2f}s)"
+        )
+
+        return all_posts
+
+    async def update_news_async(self, names: Optional[Iterable[str]] = None) -> Dict[str, Tuple[int, int]]:
+        """
+        Асинхронное обновление новостей из всех источников или только из names
+        Метод для периодического обновления (server/services/poll_scheduler.py)
 
-            # Получаем новости из RSS источников
-            logger.info(f"Fetching from {len(self.rss_sources)} RSS sources")
-            for source in self.rss_sources:
-                try:
-                    articles = await self.fetch_rss_source(source['url'], source['name'], source['category'])
-                    logger.info(f"Got {len(articles)} articles from {source['name']}")
-                    all_posts.extend(articles)
-                except Exception as e:
-                    logger.error(f"Error fetching from RSS {source['name']}: {e}")
-                    continue
+        Returns:
+            Название источника -> (HTTP статус страницы источника, 0 при ошибке;
+            число сохраненных новых новостей)
+        """
+        selected = set(names) if names is not None else set(self.source_names())
+        urls = {name: self._source_url(name) for name in selected}
+        for url in urls.values():
+            self.last_status.pop(url, None)
+
+        def results(inserted: Optional[Dict[str, int]]) -> Dict[str, Tuple[int, int]]:
+            # Без успешной записи опрос считается неудачным: повторится после короткой паузы
+            return {
+                name: (self.last_status.get(url, 0) if inserted is not None else 0,
+                       inserted.get(name, 0) if inserted else 0)
+                for name, url in urls.items()
+            }
+
+        try:
+            # Валидаторы нужны для условных запросов (304 для неизмененных источников)
+            await self._load_validators()
+            self._pending_validators = {}
+            # Каналы загружаются начиная с последнего обработанного сообщения
+            await self._load_message_ids()
+            self._pending_message_ids = {}
+            # Отключенные после серии ошибок источники не запрашиваются до конца паузы
+            await self._load_health()
 
-            # Дедуплицируем по заголовкам
-            unique_posts = []
-            seen_titles = set()
+            # Получаем новости из источников параллельно
+            all_posts = await self._fetch_all_sources(selected)
 
-            for post in all_posts:
-                title_hash = hashlib.md5(post['title'].encode()).hexdigest()
-                if title_hash not in seen_titles:
-                    seen_titles.add(title_hash)
-                    unique_posts.append(post)
+            # Дедуплицируем почти-дубликаты (SimHash текста)
+            unique_posts = dedupe_posts(all_posts, NEWS_DEDUP_MAX_DISTANCE)
 
             logger.info(f"After deduplication: {len(unique_posts)} unique posts from {len(all_posts)} total")
 
@@ -678,180 +923,239 @@ class TelegramNewsService:
             except Exception as e:
                 logger.warning(f"Error sorting by date: {e}, using original order")
 
+            if not unique_posts:
+                # Все источники не изменились - ни парсинга, ни работы с БД
+                logger.info("No new content from sources, skipping database update")
+                await self._commit_validators()
+                await self._commit_message_ids()
+                return results({})
+
             # Сохраняем в базу данных
-            await self.save_to_database(unique_posts[:50])  # Сохраняем только 50 самых свежих
+            inserted = await self.save_to_database(unique_posts[:50])  # Сохраняем только 50 самых свежих
+            self._hold_back_message_ids(unique_posts[50:])
+
+            # Валидаторы и отметки каналов фиксируем только после успешной записи, иначе новые посты потеряются
+            if inserted is not None:
+                await self._commit_validators()
+                await self._commit_message_ids()
+                logger.info(f"Successfully updated {len(unique_posts[:50])} news items")
 
-            logger.info(f"Successfully updated {len(unique_posts[:50])} news items")
+            return results(inserted)
 
         except Exception as e:
             logger.error(f"Error in update_news_async: {e}")
             raise
+        finally:
+            await self._commit_health()
 
-    async def fetch_rss_source(self, url: str, name: str, category: str) -> List[Dict[str, Any]]:
+    async def fetch_rss_source(self, url: str, name: str, category: str,
+                               conditional: bool = False) -> List[Dict[str, Any]]:
         """Получение новостей из RSS источника"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=10) as response:
-                    if response.status != 200:
-                        logger.warning(f"Failed to fetch RSS {url}, status: {response.status}")
-                        return []
-
-                    content = await response.text()
-                    feed = feedparser.parse(content)
-
-                    if not feed.entries:
-                        logger.warning(f"No entries found in RSS feed: {url}")
-                        return []
-
-                    articles = []
-                    for entry in feed.entries[:10]:  # Берем только 10 последних статей
-                        # Извлекаем основную информацию
-                        title = entry.get('title', 'Без заголовка')
-                        description = entry.get('description', '') or entry.get('summary', '')
-                        link = entry.get('link', '')
-
-                        # Парсим дату
-                        date = datetime.now().isoformat()
-                        if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                            try:
-                                import time
-                                date = datetime.fromtimestamp(time.mktime(entry.published_parsed)).isoformat()
-                            except:
-                                pass
-
-                        # Извлекаем медиа контент
-                        media = None
-
-                        # Проверяем enclosures (вложения)
-                        if hasattr(entry, 'enclosures') and entry.enclosures:
-                            for enclosure in entry.enclosures:
-                                if hasattr(enclosure, 'type'):
-                                    if enclosure.type.startswith('image/'):
-                                        media = {
-                                            'type': 'photo',
-                                            'url': enclosure.href,
-                                            'thumbnail': enclosure.href
-                                        }
-                                        break
-                                    elif enclosure.type.startswith('video/'):
-                                        media = {
-                                            'type': 'video',
-                                            'url': enclosure.href,
-                                            'thumbnail': None
-                                        }
-                                        break
-
-                        # Проверяем media:content (альтернативный способ)
-                        if not media and hasattr(entry, 'media_content') and entry.media_content:
-                            for media_item in entry.media_content:
-                                if media_item.get('type', '').startswith('image/'):
-                                    media = {
-                                        'type': 'photo',
-                                        'url': media_item.get('url', ''),
-                                        'thumbnail': media_item.get('url', '')
-                                    }
-                                    break
-
-                        # Очищаем HTML теги из описания
-                        import re
-                        clean_description = re.sub(r'<[^>]+>', '', description)
-                        clean_description = clean_description.strip()[:300] + "..." if len(clean_description) > 300 else clean_description.strip()
-
-                        article = {
-                            'id': hashlib.md5(f"{url}_{title}".encode()).hexdigest(),
-                            'title': title,
-                            'text': clean_description,
-                            'link': link,
-                            'date': date,
-                            'source': name,
-                            'category': category,
-                            'media': media
-                        }
-
-                        articles.append(article)
-
-                    return articles
+            status, content = await self._fetch(url, conditional=conditional)
+            if status == 304:
+                logger.info(f"RSS {url} not modified, skipping")
+                return []
+            if status != 200:
+                raise SourceUnavailable(f"Failed to fetch RSS {url}, status: {status}")
 
+            # Разбор ленты выполняется вне event loop
+            articles = await run_in_parse_executor(parse_rss_source, content, url, name, category)
+            if not articles:
+                raise SourceParseError(f"No entries parsed from RSS {url}")
+            return articles
+
+        except SourceUnavailable:
+            raise
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            raise SourceUnavailable(f"Error fetching RSS from {url}: {e or 'timeout'}")
         except Exception as e:
-            logger.error(f"Error fetching RSS from {url}: {e}")
-            return []
+            raise SourceParseError(f"Error parsing RSS from {url}: {e}") from e
+
+    def _post_to_row(self, post: Dict[str, Any]) -> Dict[str, Any]:
+        """Преобразует пост в строку news_items (без source_id)"""
+        # Извлекаем медиа данные
+        image_url = None
+        video_url = None
+
+        media = post.get('media')
+        if isinstance(media, list):
+            media = media[0] if media else None
+        if media:
+            if media['type'] == 'photo':
+                image_url = media['url']
+            elif media['type'] == 'video':
+                video_url = media['url']
+                if not image_url and media.get('thumbnail'):
+                    image_url = media['thumbnail']
+
+        # Оценка времени чтения (200 слов в минуту)
+        word_count = len(post['text'].split()) if post.get('text') else 0
+        reading_time = max(1, word_count // 200)
+
+        # Колонки TIMESTAMP без часового пояса хранят UTC; asyncpg не приводит aware datetime сам
+        publish_date = datetime.fromisoformat(post['date'].replace('Z', '+00:00'))
+        if publish_date.tzinfo is not None:
+            publish_date = publish_date.astimezone(timezone.utc).replace(tzinfo=None)
+
+        text_hash = simhash(post_text(post))
+
+        now = datetime.utcnow()
+        return {
+            'title': post['title'],
+            'content': post['text'],
+            'link': post['link'],
+            'publish_date': publish_date,
+            'category': post.get('category') or 'general',
+            'image_url': image_url,
+            'video_url': video_url,
+            'reading_time': reading_time,
+            'views_count': 0,
+            'author': post.get('source'),
+            'subtitle': None,
+            'fingerprint': news_fingerprint(post['title']),
+            'simhash': to_signed(text_hash) if text_hash is not None else None,
+            'created_at': now,
+            'updated_at': now,
+        }
 
-    async def save_to_database(self, posts: List[Dict[str, Any]]):
-        """Сохранение новостей в базу данных"""
+    async def save_to_database(self, posts: List[Dict[str, Any]]) -> Optional[Dict[str, int]]:
+        """
+        Сохранение новостей в базу данных. Возвращает число вставленных новостей
+        по названиям источников или None при ошибке.
+        Источники разрешаются одним пакетным запросом, новости вставляются одним
+        INSERT ... ON CONFLICT (fingerprint) DO NOTHING: число запросов не зависит
+        от числа постов, а параллельные воркеры не создают дубликатов.
+        Почти-дубликаты последних новостей и пачки отбрасываются до записи по
+        индексу SimHash отпечатков (server/services/dedup_service.py), а уже
+        сохраненные новости - по множеству fingerprint, без подготовки строк.
+        """
         try:
-            # Импортируем здесь, чтобы избежать циркулярного импорта
-            import server.main as main_module
-            from server.db import NewsItem
-
-            if main_module.SessionLocal is None:
-                logger.error("Database not initialized")
-                return
-
-            db = main_module.SessionLocal()
+            from server.db import AsyncSessionLocal, NewsItem
+            from server.services.dedup_service import load_seen_set, load_simhash_index, snapshot_seen_set
+            from server.services.news_service import get_or_create_sources
+            from server.services.stats_service import increment_category_counts
 
             try:
-                news_items = []
-                for post in posts:
-                    # Получаем или создаём источник
-                    from server.services.news_service import get_or_create_source
-                    # Определяем тип источника и url
-                    source_type = 'telegram' if post.get('channel') and not post.get('link', '').startswith('http') else 'rss'
-                    source_url = post.get('link') or ''
-                    category = post.get('category') or 'general'
-                    source = get_or_create_source(db, post.get('source', 'unknown'), url=source_url, source_type=source_type, category=category)
-                    # Проверяем, существует ли уже такая новость
-                    existing = db.query(NewsItem).filter(
-                        NewsItem.title == post['title']
-                    ).first()
-
-                    if existing:
-                        continue  # Пропускаем дубликаты
-
-                    # Извлекаем медиа данные
-                    image_url = None
-                    video_url = None
-
-                    if post.get('media'):
-                        if post['media']['type'] == 'photo':
-                            image_url = post['media']['url']
-                        elif post['media']['type'] == 'video':
-                            video_url = post['media']['url']
-                            if not image_url and post['media'].get('thumbnail'):
-                                image_url = post['media']['thumbnail']
-
-                    # Оценка времени чтения (200 слов в минуту)
-                    word_count = len(post['text'].split()) if post.get('text') else 0
-                    reading_time = max(1, word_count // 200)
-
-                    news_item = NewsItem(
-                        source_id=source.id,
-                        title=post['title'],
-                        content=post['text'],
-                        link=post['link'],
-                        publish_date=datetime.fromisoformat(post['date'].replace('Z', '+00:00')),
-                        category=category,
-                        image_url=image_url,
-                        video_url=video_url,
-                        reading_time=reading_time,
-                        views_count=0,
-                        author=post.get('source'),
-                        subtitle=None
-                    )
-
-                    news_items.append(news_item)
-
-                if news_items:
-                    db.bulk_save_objects(news_items)
-                    db.commit()
-                    logger.info(f"Saved {len(news_items)} new items to database")
+                recent_index = await load_simhash_index()
+            except Exception as e:
+                # Без индекса остается только точная проверка по fingerprint
+                logger.error(f"Ошибка при загрузке индекса почти-дубликатов: {e}")
+                recent_index = None
+            try:
+                seen_set = await load_seen_set()
+            except Exception as e:
+                # Без множества уже сохраненные новости отсекает ON CONFLICT
+                logger.error(f"Ошибка при загрузке множества сохраненных новостей: {e}")
+                seen_set = None
+            batch_index = SimHashIndex(NEWS_DEDUP_MAX_DISTANCE, max(len(posts), 1))
+            near_duplicates = 0
+            already_seen = 0
+            # fingerprint, о которых фильтр Блума не уверен: проверит INSERT ... ON CONFLICT
+            maybe_seen: Set[str] = set()
+            processed: List[str] = []
+
+            # Дубликаты внутри пачки отбрасываем сразу
+            rows_by_fingerprint: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+            sources: Dict[str, Dict[str, Optional[str]]] = {}
+            for post in posts:
+                fingerprint = news_fingerprint(post['title'])
+                if fingerprint in rows_by_fingerprint:
+                    continue
+                if seen_set is not None:
+                    status = seen_set.check(fingerprint)
+                    if status == SEEN:
+                        already_seen += 1
+                        continue
+                    if status == MAYBE:
+                        maybe_seen.add(fingerprint)
+                processed.append(fingerprint)
+
+                row = self._post_to_row(post)
+                if row['simhash'] is not None:
+                    text_hash = to_unsigned(row['simhash'])
+                    if (recent_index is not None and recent_index.find(text_hash)) or batch_index.find(text_hash):
+                        near_duplicates += 1
+                        continue
+                    batch_index.add(row['fingerprint'], text_hash)
+
+                # Определяем тип источника и url
+                source_name = post.get('source', 'unknown')
+                channel = post.get('channel')
+                if channel and not channel.startswith('rss_'):
+                    source_type, source_url = 'telegram', f"https://t.me/{channel}"
                 else:
-                    logger.info("No new items to save")
+                    source_type, source_url = 'rss', post.get('link') or ''
+                sources.setdefault(source_name, {
+                    'url': source_url,
+                    'source_type': source_type,
+                    'category': row['category'],
+                })
+                rows_by_fingerprint[row['fingerprint']] = (source_name, row)
+
+            if already_seen:
+                logger.info(f"Skipped {already_seen} already seen items")
+            if near_duplicates:
+                logger.info(f"Skipped {near_duplicates} near-duplicate items")
+
+            if not rows_by_fingerprint:
+                logger.info("No new items to save")
+                return {}
+
+            async with AsyncSessionLocal() as db:
+                source_ids = await get_or_create_sources(db, sources)
+
+                rows = []
+                for source_name, row in rows_by_fingerprint.values():
+                    row['source_id'] = source_ids[source_name]
+                    rows.append(row)
+
+                stmt = pg_insert(NewsItem).values(rows).on_conflict_do_nothing(
+                    index_elements=['fingerprint']
+                ).returning(NewsItem.id, NewsItem.category, NewsItem.simhash, NewsItem.fingerprint)
+                inserted = (await db.execute(stmt)).all()
+                # Свои новости синхронизация не добавляет в индексы повторно (отмечаем до коммита)
+                news_sync.note_local(news_id for news_id, _, _, _ in inserted)
+
+                # Счетчики категорий обновляются в той же транзакции
+                deltas: Dict[str, int] = {}
+                for _, category, _, _ in inserted:
+                    deltas[category] = deltas.get(category, 0) + 1
+                await increment_category_counts(db, deltas)
+                await db.commit()
+
+            inserted_ids = [news_id for news_id, _, _, _ in inserted]
+            inserted_by_source: Dict[str, int] = {}
+            for *_, fingerprint in inserted:
+                source_name = rows_by_fingerprint[fingerprint][0]
+                inserted_by_source[source_name] = inserted_by_source.get(source_name, 0) + 1
+            if recent_index is not None:
+                for news_id, _, text_hash, _ in inserted:
+                    if text_hash is not None:
+                        recent_index.add(news_id, to_unsigned(text_hash))
+            if seen_set is not None:
+                # Почти-дубликаты тоже запоминаем: в следующих циклах они отсекаются без SimHash
+                seen_set.update(processed)
+                seen_set.record_false_positive(
+                    sum(1 for *_, fingerprint in inserted if fingerprint in maybe_seen)
+                )
+                # watermark не сдвигаем: строки других процессов с меньшими id догрузятся из БД
+                await snapshot_seen_set()
 
-            finally:
-                db.close()
+            if inserted_ids:
+                # Лента изменилась - новая версия данных для ETag, кэш ответов сбрасывается
+                try:
+                    await news_sync.refresh_version()
+                except Exception as e:
+                    logger.error(f"Ошибка при чтении версии данных: {e}")
+                    news_cache.bump_generation()
+                # Подписчикам SSE / long-poll их опубликует news_sync - в порядке id вместе с чужими
+                logger.info(f"Saved {len(inserted_ids)} new items to database")
+            else:
+                logger.info("No new items to save")
+
+            return inserted_by_source
 
         except Exception as e:
             logger.error(f"Ошибка при загрузке каналов: {e}")
-            if 'db' in locals():
-                db.rollback()
-                db.close()
+            return None
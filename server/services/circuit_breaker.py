@@ -0,0 +1,188 @@
+# server/services/circuit_breaker.py
+"""
+Автоматы защиты (circuit breaker) источников новостей.
+
+- closed    - источник работает, запросы идут как обычно;
+- open      - после BREAKER_FAILURE_THRESHOLD ошибок подряд источник не
+  запрашивается до retry_at; пауза удваивается с каждой следующей ошибкой
+  (от BREAKER_COOLDOWN до BREAKER_MAX_COOLDOWN);
+- half_open - пауза истекла, выполняется один пробный запрос: успех закрывает
+  автомат, ошибка снова открывает его с удвоенной паузой.
+
+Состояние хранится в полях news_sources (health_state, consecutive_failures,
+last_error, ...), поэтому переживает перезапуск и видно в БД.
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from server.config import BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN, BREAKER_MAX_COOLDOWN
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+_ERROR_MAX_LENGTH = 500
+
+
+class SourceUnavailable(Exception):
+    """Источник не ответил, ответил ошибкой или его страницу не удалось разобрать"""
+
+
+class SourceParseError(SourceUnavailable):
+    """Источник ответил 200, но страницу не удалось разобрать"""
+
+
+def _to_datetime(timestamp: Optional[float]) -> Optional[datetime]:
+    return datetime.utcfromtimestamp(timestamp) if timestamp is not None else None
+
+
+def _to_timestamp(value: Optional[datetime]) -> Optional[float]:
+    return (value - datetime(1970, 1, 1)).total_seconds() if value is not None else None
+
+
+class CircuitBreaker:
+    """Автомат защиты одного источника"""
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 cooldown: float = BREAKER_COOLDOWN, max_cooldown: float = BREAKER_MAX_COOLDOWN,
+                 clock=time.time):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.last_error: Optional[str] = None
+        self.last_success_at: Optional[float] = None
+        self.last_failure_at: Optional[float] = None
+        # До какого момента источник не запрашивается (open) или ждет итога пробы (half_open)
+        self.retry_at: Optional[float] = None
+        self.skipped = 0
+        # Состояние изменилось и еще не сохранено в БД
+        self.dirty = False
+
+    def cooldown(self) -> float:
+        """Пауза после текущей серии ошибок: удваивается с каждой ошибкой сверх порога"""
+        excess = max(0, self.consecutive_failures - self.failure_threshold)
+        return min(self.max_cooldown, self.base_cooldown * 2 ** excess)
+
+    def allow(self) -> bool:
+        """Можно ли запрашивать источник сейчас (при истекшей паузе - пробный запрос)"""
+        if self.state == CLOSED:
+            return True
+        now = self.clock()
+        if self.retry_at is not None and now < self.retry_at:
+            self.skipped += 1
+            return False
+        # Пауза истекла (или проба потерялась) - пропускаем один пробный запрос
+        self.state = HALF_OPEN
+        self.retry_at = now + self.cooldown()
+        self.dirty = True
+        return True
+
+    def retry_in(self) -> float:
+        """Секунды до момента, когда источник снова можно запросить (0 - можно сейчас)"""
+        if self.state == CLOSED or self.retry_at is None:
+            return 0.0
+        return max(0.0, self.retry_at - self.clock())
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            logger.info(f"Источник {self.name} снова доступен")
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.retry_at = None
+        self.last_success_at = self.clock()
+        self.dirty = True
+
+    def record_failure(self, error: str) -> None:
+        now = self.clock()
+        self.consecutive_failures += 1
+        self.last_error = error[:_ERROR_MAX_LENGTH]
+        self.last_failure_at = now
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = OPEN
+            self.retry_at = now + self.cooldown()
+            logger.warning(
+                f"Источник {self.name} отключен на {self.cooldown():.0f}s "
+                f"после {self.consecutive_failures} ошибок подряд: {self.last_error}"
+            )
+        self.dirty = True
+
+    def to_row(self) -> Dict[str, Any]:
+        """Поля news_sources"""
+        return {
+            'health_state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'last_error': self.last_error,
+            'last_success_at': _to_datetime(self.last_success_at),
+            'last_failure_at': _to_datetime(self.last_failure_at),
+            'retry_at': _to_datetime(self.retry_at),
+        }
+
+    def load_row(self, row: Dict[str, Any]) -> None:
+        self.state = row.get('health_state') or CLOSED
+        self.consecutive_failures = row.get('consecutive_failures') or 0
+        self.last_error = row.get('last_error')
+        self.last_success_at = _to_timestamp(row.get('last_success_at'))
+        self.last_failure_at = _to_timestamp(row.get('last_failure_at'))
+        self.retry_at = _to_timestamp(row.get('retry_at'))
+        self.dirty = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'last_error': self.last_error,
+            'last_success_at': _to_datetime(self.last_success_at),
+            'last_failure_at': _to_datetime(self.last_failure_at),
+            'retry_in': round(self.retry_in(), 1),
+            'skipped': self.skipped,
+        }
+
+
+class CircuitBreakers:
+    """Автоматы защиты всех источников (по названию источника)"""
+
+    def __init__(self, **options):
+        self._options = options
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = self._breakers[name] = CircuitBreaker(name, **self._options)
+        return breaker
+
+    def allow(self, name: str) -> bool:
+        return self.get(name).allow()
+
+    def retry_in(self, name: str) -> float:
+        breaker = self._breakers.get(name)
+        return breaker.retry_in() if breaker is not None else 0.0
+
+    def load(self, rows: Dict[str, Dict[str, Any]]) -> None:
+        """Восстанавливает состояние из БД (название источника -> поля news_sources)"""
+        for name, row in rows.items():
+            self.get(name).load_row(row)
+
+    def take_dirty(self) -> Dict[str, Dict[str, Any]]:
+        """Измененные состояния для записи в БД (флаг изменения сбрасывается)"""
+        rows = {}
+        for name, breaker in self._breakers.items():
+            if breaker.dirty:
+                rows[name] = breaker.to_row()
+                breaker.dirty = False
+        return rows
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [breaker.stats() for breaker in sorted(self._breakers.values(), key=lambda b: b.name)]
+
+
+source_breakers = CircuitBreakers()
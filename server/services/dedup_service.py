@@ -0,0 +1,256 @@
+# server/services/dedup_service.py
+import asyncio
+import logging
+import time
+from typing import Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select, text
+
+from server.config import (
+    NEWS_DEDUP_MAX_DISTANCE,
+    NEWS_DEDUP_WINDOW,
+    SEEN_SET_LRU_SIZE,
+    SEEN_SET_CAPACITY,
+    SEEN_SET_ERROR_RATE,
+    SEEN_SET_SNAPSHOT_PATH,
+    SEEN_SET_SNAPSHOT_INTERVAL,
+)
+from server.db import AsyncSessionLocal, NewsItem
+from server.utils.executor import run_in_parse_executor
+from server.utils.fingerprint import news_fingerprint
+from server.utils.seen_set import SeenSet, load_snapshot, save_snapshot
+from server.utils.simhash import SimHashIndex, simhash, to_signed, to_unsigned
+
+logger = logging.getLogger(__name__)
+
+# Отпечатки последних NEWS_DEDUP_WINDOW новостей (ключ - id новости)
+news_simhash_index = SimHashIndex(NEWS_DEDUP_MAX_DISTANCE, NEWS_DEDUP_WINDOW)
+
+# Fingerprint всех сохраненных новостей: проверка "уже видели" без запроса к БД
+news_seen_set = SeenSet(SEEN_SET_LRU_SIZE, SEEN_SET_CAPACITY, SEEN_SET_ERROR_RATE)
+
+_loaded = False
+_load_lock = asyncio.Lock()
+_seen_loaded = False
+_seen_lock = asyncio.Lock()
+_last_snapshot = 0.0
+
+# Сколько строк читать из БД за раз при заполнении множества
+_SEEN_SET_BATCH = 10000
+
+# Идентификатор БД для снимка множества (имя и oid базы) и последний id новостей
+_DATABASE_STATE_SQL = text("""
+    SELECT current_database() || ':' || (SELECT oid FROM pg_database WHERE datname = current_database()),
+           (SELECT max(id) FROM news_items)
+""")
+
+# Заполнение отпечатков строк, сохраненных до появления колонки; updated_at не меняется
+_BACKFILL_SQL = text("""
+    UPDATE news_items AS n
+    SET simhash = v.simhash
+    FROM unnest(CAST(:ids AS INTEGER[]), CAST(:hashes AS BIGINT[])) AS v(id, simhash)
+    WHERE n.id = v.id
+""")
+
+# Заполнение fingerprint в миграции (тем же news_fingerprint, что и при записи новостей)
+_FINGERPRINT_BATCH = 10000
+_FINGERPRINT_BACKFILL_SQL = text("""
+    UPDATE news_items AS n
+    SET fingerprint = v.fingerprint
+    FROM unnest(CAST(:ids AS INTEGER[]), CAST(:fingerprints AS VARCHAR[])) AS v(id, fingerprint)
+    WHERE n.id = v.id
+""")
+_TAKEN_FINGERPRINTS_SQL = text("""
+    SELECT fingerprint FROM news_items WHERE fingerprint = ANY(CAST(:fingerprints AS VARCHAR[]))
+""")
+
+
+def plan_fingerprints(rows: Iterable[Tuple[int, Optional[str], Optional[str]]],
+                      taken: Set[str]) -> List[Tuple[int, str]]:
+    """
+    (id, заголовок, текущий fingerprint) в порядке id -> строки, которым нужно
+    записать news_fingerprint(заголовок). Ключ, уже занятый другой строкой (taken)
+    или более ранней строкой пачки, не выдается: строка - дубликат, и уникальный
+    индекс не нарушается. taken дополняется выданными ключами.
+    """
+    changes = []
+    for news_id, title, fingerprint in rows:
+        expected = news_fingerprint(title)
+        if expected == fingerprint or expected in taken:
+            continue
+        taken.add(expected)
+        changes.append((news_id, expected))
+    return changes
+
+
+def backfill_fingerprints(connection) -> int:
+    """
+    Заполняет fingerprint строк, сохраненных до появления колонки, и исправляет
+    ключи, посчитанные иначе, чем news_fingerprint (ON CONFLICT (fingerprint)
+    сравнивает с ними ключи новых постов). Выполняется в apply_migrations на
+    синхронном соединении пачками по id; коммит - на вызывающей стороне.
+    Возвращает число измененных строк.
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select(NewsItem.id, NewsItem.title, NewsItem.fingerprint)
+            .where(NewsItem.id > last_id).order_by(NewsItem.id).limit(_FINGERPRINT_BATCH)
+        ).all()
+        if not rows:
+            return updated
+        last_id = rows[-1][0]
+
+        expected = list({news_fingerprint(title) for _, title, _ in rows})
+        taken = set(connection.execute(_TAKEN_FINGERPRINTS_SQL, {'fingerprints': expected}).scalars())
+        changes = plan_fingerprints(rows, taken)
+        if changes:
+            connection.execute(_FINGERPRINT_BACKFILL_SQL, {
+                'ids': [news_id for news_id, _ in changes],
+                'fingerprints': [fingerprint for _, fingerprint in changes],
+            })
+            updated += len(changes)
+
+
+def compute_simhashes(rows: List[Tuple[int, str]]) -> List[Tuple[int, Optional[int]]]:
+    """(id, текст) -> (id, знаковый отпечаток для колонки simhash)"""
+    result = []
+    for news_id, content in rows:
+        value = simhash(content)
+        result.append((news_id, to_signed(value) if value is not None else None))
+    return result
+
+
+async def load_simhash_index() -> SimHashIndex:
+    """
+    Заполняет индекс отпечатками последних новостей (один раз на процесс).
+    Отпечатки строк без simhash считаются в пуле разбора и записываются в БД,
+    поэтому при следующих запусках загрузка сводится к одному запросу по id.
+    """
+    global _loaded
+    if _loaded:
+        return news_simhash_index
+
+    async with _load_lock:
+        if _loaded:
+            return news_simhash_index
+
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(NewsItem.id, NewsItem.simhash).order_by(NewsItem.id.desc()).limit(NEWS_DEDUP_WINDOW)
+            )).all()
+
+            hashes = {news_id: value for news_id, value in rows}
+            missing = [news_id for news_id, value in rows if value is None]
+            if missing:
+                texts = (await db.execute(
+                    select(NewsItem.id, NewsItem.content, NewsItem.title)
+                    .where(NewsItem.id >= min(missing), NewsItem.simhash.is_(None))
+                )).all()
+                computed = await run_in_parse_executor(
+                    compute_simhashes, [(news_id, content or title) for news_id, content, title in texts]
+                )
+                computed = [(news_id, value) for news_id, value in computed if value is not None]
+                if computed:
+                    await db.execute(_BACKFILL_SQL, {
+                        'ids': [news_id for news_id, _ in computed],
+                        'hashes': [value for _, value in computed],
+                    })
+                    await db.commit()
+                hashes.update(computed)
+                logger.info(f"Посчитаны SimHash отпечатки для {len(computed)} новостей")
+
+        # От старых к новым: при переполнении окна вытесняются самые старые
+        for news_id in sorted(hashes):
+            if hashes[news_id] is not None:
+                news_simhash_index.add(news_id, to_unsigned(hashes[news_id]))
+        _loaded = True
+        logger.info(f"Индекс почти-дубликатов загружен: {len(news_simhash_index)} отпечатков")
+        return news_simhash_index
+
+
+async def load_seen_set() -> SeenSet:
+    """
+    Заполняет множество fingerprint (один раз на процесс): восстанавливает снимок
+    с диска и догружает из БД только строки, добавленные после него. Без снимка
+    читается весь архив - один последовательный проход по первичному ключу.
+    """
+    global _seen_loaded
+    if _seen_loaded:
+        return news_seen_set
+
+    async with _seen_lock:
+        if _seen_loaded:
+            return news_seen_set
+
+        added = 0
+        async with AsyncSessionLocal() as db:
+            database, max_id = (await db.execute(_DATABASE_STATE_SQL)).one()
+            data = await asyncio.to_thread(load_snapshot, SEEN_SET_SNAPSHOT_PATH)
+            if data is not None:
+                # Снимок другой или сброшенной БД ответил бы SEEN на никогда не сохраненные новости
+                if news_seen_set.loads(data, database=database, max_watermark=max_id or 0):
+                    logger.info(f"Снимок множества новостей загружен: {len(news_seen_set)} ключей, "
+                                f"до id {news_seen_set.watermark}")
+                else:
+                    logger.warning("Снимок множества новостей не подходит "
+                                   "(поврежден, другие параметры или другая БД)")
+            news_seen_set.database = database
+
+            result = await db.stream(
+                select(NewsItem.id, NewsItem.fingerprint)
+                .where(NewsItem.id > news_seen_set.watermark, NewsItem.fingerprint.is_not(None))
+                .order_by(NewsItem.id)
+                .execution_options(yield_per=_SEEN_SET_BATCH)
+            )
+            async for rows in result.partitions():
+                for news_id, fingerprint in rows:
+                    news_seen_set.add(fingerprint)
+                news_seen_set.watermark = rows[-1][0]
+                added += len(rows)
+                # Не блокируем event loop на больших архивах
+                await asyncio.sleep(0)
+
+        _seen_loaded = True
+        logger.info(f"Множество новостей загружено: {len(news_seen_set)} ключей, из БД добавлено {added}")
+        if added:
+            await snapshot_seen_set(force=True)
+        return news_seen_set
+
+
+async def snapshot_seen_set(force: bool = False) -> None:
+    """Сохраняет снимок множества на диск (не чаще SEEN_SET_SNAPSHOT_INTERVAL без force)"""
+    global _last_snapshot
+    if not _seen_loaded:
+        return
+    if not force and time.monotonic() - _last_snapshot < SEEN_SET_SNAPSHOT_INTERVAL:
+        return
+    _last_snapshot = time.monotonic()
+    data = news_seen_set.dumps()
+    try:
+        await asyncio.to_thread(save_snapshot, SEEN_SET_SNAPSHOT_PATH, data)
+    except OSError as e:
+        logger.warning(f"Не удалось сохранить снимок множества новостей: {e}")
+
+
+async def warm_dedup_indexes() -> None:
+    """Заполняет множество fingerprint и индекс SimHash при старте (в фоне)"""
+    for loader in (load_seen_set, load_simhash_index):
+        try:
+            await loader()
+        except Exception as e:
+            logger.error(f"Ошибка при загрузке индексов дедупликации: {e}")
+
+
+def remember_saved(rows: List[Tuple[int, Optional[str], Optional[int]]]) -> None:
+    """
+    Добавляет в загруженные индексы новости, записанные другим процессом:
+    (id, fingerprint, знаковый simhash). Незагруженные индексы не трогаем -
+    они прочитают эти строки из БД при заполнении.
+    """
+    for news_id, fingerprint, value in rows:
+        if _seen_loaded and fingerprint is not None:
+            news_seen_set.add(fingerprint)
+        if _loaded and value is not None:
+            news_simhash_index.add(news_id, to_unsigned(value))
@@ -0,0 +1,297 @@
+# server/services/leader.py
+"""
+Один ведущий процесс загрузки на все воркеры и реплики.
+
+Каждый процесс, импортирующий server.main, пытается взять advisory lock
+Postgres (pg_try_advisory_lock) на отдельном соединении. Загрузку источников
+ведет только тот, кто его взял; остальные обслуживают API и каждые
+LEADER_RETRY_INTERVAL секунд пробуют снова. Блокировка принадлежит сессии БД:
+если ведущий процесс падает или теряет соединение, Postgres снимает ее сам,
+и ведущим становится следующий процесс. Ведущий каждые
+LEADER_HEARTBEAT_INTERVAL секунд проверяет, что соединение с блокировкой живо,
+иначе останавливает загрузку.
+
+Ключей LEADER_SLOTS: при LEADER_SLOTS > 1 ведущих несколько, и они делят
+источники арендой (news_sources.lease_owner / lease_until): источник опрашивает
+тот, кто его арендовал, аренда продлевается вместе с проверкой блокировки и
+после падения владельца истекает через SOURCE_LEASE_TTL.
+
+Блокировка сессионная, поэтому DATABASE_URL не должен указывать на pgbouncer
+в режиме transaction pooling.
+"""
+import asyncio
+import logging
+import math
+import os
+import socket
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import text
+
+from server.config import (
+    LEADER_LOCK_KEY,
+    LEADER_SLOTS,
+    LEADER_RETRY_INTERVAL,
+    LEADER_HEARTBEAT_INTERVAL,
+    SOURCE_LEASE_TTL,
+)
+from server.services.poll_scheduler import run_polling
+
+logger = logging.getLogger(__name__)
+
+_TRY_LOCK_SQL = text("SELECT pg_try_advisory_lock(CAST(:key AS BIGINT))")
+_UNLOCK_SQL = text("SELECT pg_advisory_unlock(CAST(:key AS BIGINT))")
+# Блокировка с bigint ключом хранится в pg_locks как (classid, objid) = (старшие, младшие 32 бита)
+_HELD_SQL = text("""
+    SELECT EXISTS (
+        SELECT 1 FROM pg_locks
+        WHERE locktype = 'advisory' AND granted AND pid = pg_backend_pid()
+        AND classid::bigint = (CAST(:key AS BIGINT) >> 32) AND objid::bigint = (CAST(:key AS BIGINT) & 4294967295)
+    )
+""")
+# Число ведущих - сколько ключей LEADER_LOCK_KEY .. + slots - 1 сейчас заняты в этой БД
+_LEADERS_SQL = text("""
+    SELECT count(*) FROM pg_locks
+    WHERE locktype = 'advisory' AND granted
+    AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+    AND classid::bigint = (CAST(:key AS BIGINT) >> 32)
+    AND objid::bigint BETWEEN (CAST(:key AS BIGINT) & 4294967295) AND (CAST(:key AS BIGINT) & 4294967295) + :slots - 1
+""")
+
+
+class LeaderElection:
+    """Выбор ведущего процесса загрузки через advisory lock Postgres"""
+
+    def __init__(self, lock_key: int = LEADER_LOCK_KEY, slots: int = LEADER_SLOTS):
+        self.lock_key = lock_key
+        self.slots = max(1, slots)
+        # Владелец аренды источников: уникален для процесса
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.slot: Optional[int] = None
+        self.since: Optional[float] = None
+        self.elections = 0
+        self._connection = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._connection is not None
+
+    @property
+    def key(self) -> Optional[int]:
+        return self.lock_key + self.slot if self.slot is not None else None
+
+    async def try_acquire(self) -> bool:
+        """Пробует стать ведущим (взять один из свободных ключей). Не ждет"""
+        if self.is_leader:
+            return True
+
+        from server.db import async_engine
+
+        connection = await async_engine.connect()
+        try:
+            # Блокировка сессионная: транзакция соединению не нужна
+            await connection.execution_options(isolation_level="AUTOCOMMIT")
+            for slot in range(self.slots):
+                if (await connection.execute(_TRY_LOCK_SQL, {'key': self.lock_key + slot})).scalar():
+                    self._connection = connection
+                    self.slot = slot
+                    self.since = time.time()
+                    self.elections += 1
+                    logger.info(f"Процесс {self.owner} стал ведущим загрузки (ключ {self.key})")
+                    return True
+        except Exception:
+            await connection.invalidate()
+            raise
+        await connection.close()
+        return False
+
+    async def check(self) -> bool:
+        """Проверяет, что блокировка все еще за этим процессом; при потере освобождает соединение"""
+        if self._connection is None:
+            return False
+        try:
+            held = bool((await self._connection.execute(_HELD_SQL, {'key': self.key})).scalar())
+        except Exception as e:
+            logger.warning(f"Соединение ведущего процесса недоступно: {e}")
+            held = False
+        if not held:
+            logger.warning(f"Процесс {self.owner} больше не ведущий (ключ {self.key})")
+            await self._drop(unlock=False)
+        return held
+
+    async def count_leaders(self) -> int:
+        """Сколько процессов сейчас ведущие (включая этот)"""
+        if self._connection is None:
+            return 0
+        return (await self._connection.execute(_LEADERS_SQL, {'key': self.lock_key, 'slots': self.slots})).scalar()
+
+    async def release(self) -> None:
+        """Уступает загрузку: снимает блокировку и возвращает соединение"""
+        await self._drop(unlock=True)
+
+    async def _drop(self, unlock: bool) -> None:
+        connection, key = self._connection, self.key
+        self._connection = None
+        self.slot = None
+        self.since = None
+        if connection is None:
+            return
+        try:
+            if unlock:
+                await connection.execute(_UNLOCK_SQL, {'key': key})
+                await connection.close()
+                return
+        except Exception as e:
+            logger.warning(f"Ошибка при снятии блокировки ведущего: {e}")
+        # Соединение закрывается совсем, чтобы блокировка не осталась в пуле
+        await connection.invalidate()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'owner': self.owner,
+            'leader': self.is_leader,
+            'key': self.key,
+            'slots': self.slots,
+            'leader_for': round(time.time() - self.since, 1) if self.since is not None else None,
+            'elections': self.elections,
+        }
+
+
+class SourceLeases:
+    """Аренда источников ведущим процессом (нужна, когда ведущих несколько)"""
+
+    def __init__(self, owner: str, ttl: float = SOURCE_LEASE_TTL):
+        self.owner = owner
+        self.ttl = ttl
+        self.held: Set[str] = set()
+        # Сколько источников держать (доля при нескольких ведущих; None - без ограничения)
+        self.share: Optional[int] = None
+
+    async def acquire(self, sources: Dict[str, Dict[str, Optional[str]]]) -> Set[str]:
+        """
+        Арендует источники (название -> поля строки news_sources, строки создаются
+        при необходимости), новые - не сверх своей доли. Возвращает те, что
+        принадлежат этому процессу.
+        """
+        from server.db import AsyncSessionLocal
+        from server.services.news_service import get_or_create_sources
+        from server.services.source_service import acquire_source_leases, release_source_leases
+
+        names = list(sources)
+        async with AsyncSessionLocal() as db:
+            await get_or_create_sources(db, sources)
+            owned = set(await acquire_source_leases(db, names, self.owner, self.ttl))
+            # Какие из свободных окажутся взятыми, заранее неизвестно - лишние сразу отдаем
+            held = (self.held - set(names)) | owned
+            if self.share is not None and len(held) > self.share:
+                new = [name for name in names if name in owned and name not in self.held]
+                excess = new[:len(held) - self.share]
+                await release_source_leases(db, self.owner, excess)
+                owned.difference_update(excess)
+                held.difference_update(excess)
+            await db.commit()
+        self.held = held
+        return owned
+
+    async def rebalance(self, total: int, leaders: int) -> None:
+        """Отдает источники сверх доли total / leaders, чтобы их взяли другие ведущие"""
+        from server.db import AsyncSessionLocal
+        from server.services.source_service import release_source_leases
+
+        self.share = math.ceil(total / max(1, leaders))
+        excess = sorted(self.held)[self.share:]
+        if not excess:
+            return
+        async with AsyncSessionLocal() as db:
+            await release_source_leases(db, self.owner, excess)
+            await db.commit()
+        self.held.difference_update(excess)
+        logger.info(f"Ведущих {leaders}: отданы источники {', '.join(excess)}")
+
+    async def renew(self) -> None:
+        from server.db import AsyncSessionLocal
+        from server.services.source_service import renew_source_leases
+
+        async with AsyncSessionLocal() as db:
+            self.held = set(await renew_source_leases(db, self.owner, self.ttl))
+            await db.commit()
+
+    async def release(self) -> None:
+        from server.db import AsyncSessionLocal
+        from server.services.source_service import release_source_leases
+
+        async with AsyncSessionLocal() as db:
+            await release_source_leases(db, self.owner)
+            await db.commit()
+        self.held = set()
+        self.share = None
+
+
+async def cluster_stats(db, lock_key: int = LEADER_LOCK_KEY, slots: int = LEADER_SLOTS) -> Dict[str, Any]:
+    """
+    Состояние загрузки во всех процессах (из БД, одинаково на любом воркере):
+    число ведущих и кто какие источники арендовал.
+    """
+    from server.services.source_service import load_source_leases
+
+    leaders = (await db.execute(_LEADERS_SQL, {'key': lock_key, 'slots': max(1, slots)})).scalar()
+    owners: Dict[str, List[str]] = {}
+    for name, lease in (await load_source_leases(db)).items():
+        owners.setdefault(lease['owner'], []).append(name)
+    return {'leaders': leaders, 'leases': owners}
+
+
+async def run_ingestion(news_service, scheduler, election: Optional[LeaderElection] = None) -> None:
+    """
+    Загрузка источников только в ведущем процессе: ждет блокировку, затем ведет
+    run_polling, проверяя блокировку и продлевая аренды каждые LEADER_HEARTBEAT_INTERVAL.
+    При потере блокировки опрос останавливается, и процесс снова становится ведомым.
+    """
+    election = election or leader_election
+    leases = SourceLeases(election.owner)
+    while True:
+        try:
+            leading = await election.try_acquire()
+        except Exception as e:
+            logger.error(f"Ошибка при выборе ведущего процесса: {e}")
+            leading = False
+        if not leading:
+            await asyncio.sleep(LEADER_RETRY_INTERVAL)
+            continue
+
+        # Пока процесс был ведомым, состояние источников в БД менял другой ведущий
+        news_service.reload_source_state()
+        polling = asyncio.create_task(run_polling(news_service, scheduler, leases))
+        try:
+            if election.slots > 1:
+                await leases.rebalance(len(news_service.source_names()), await election.count_leaders())
+            while True:
+                done, _ = await asyncio.wait({polling}, timeout=LEADER_HEARTBEAT_INTERVAL)
+                if done:
+                    polling.result()
+                    logger.info("Нет источников для опроса")
+                    return
+                if not await election.check():
+                    break
+                try:
+                    await leases.renew()
+                    if election.slots > 1:
+                        await leases.rebalance(len(news_service.source_names()), await election.count_leaders())
+                except Exception as e:
+                    logger.error(f"Ошибка при продлении аренды источников: {e}")
+        except Exception as e:
+            logger.error(f"Ошибка в цикле загрузки: {e}")
+        finally:
+            polling.cancel()
+            await asyncio.gather(polling, return_exceptions=True)
+            try:
+                await leases.release()
+            except Exception as e:
+                logger.error(f"Ошибка при освобождении аренды источников: {e}")
+            await election.release()
+        await asyncio.sleep(LEADER_RETRY_INTERVAL)
+
+
+leader_election = LeaderElection()
@@ -1,4 +1,10 @@
 # services/news_service.py
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from server.db import NewsSource  # Импортируйте вашу модель NewsSource
 
@@ -33,4 +39,49 @@ def get_or_create_source(session: Session, source_name: str, url: str = None, so
         session.add(source)
         session.flush()  # Получаем ID без коммита всей транзакции
 
-    return source
\ No newline at end of file
+    return source
+
+async def get_or_create_sources(session: AsyncSession, sources: Dict[str, Dict[str, Optional[str]]]) -> Dict[str, int]:
+    """
+    Пакетно находит или создаёт источники новостей.
+    Выполняет не более трёх запросов независимо от числа источников и
+    безопасна при параллельной работе нескольких воркеров (ON CONFLICT DO NOTHING).
+
+    Args:
+        session: асинхронная SQLAlchemy сессия
+        sources: Название источника -> {'url', 'source_type', 'category'}
+
+    Returns:
+        Словарь название источника -> id
+    """
+    if not sources:
+        return {}
+
+    names = list(sources)
+    ids = dict((await session.execute(
+        select(NewsSource.name, NewsSource.id).where(NewsSource.name.in_(names))
+    )).all())
+
+    missing = [name for name in names if name not in ids]
+    if missing:
+        stmt = pg_insert(NewsSource).values([
+            {
+                'name': name,
+                'url': sources[name].get('url') or '',
+                'source_type': sources[name].get('source_type') or 'telegram',
+                'category': sources[name].get('category'),
+                'is_active': True,
+                'created_at': datetime.utcnow(),
+            }
+            for name in missing
+        ]).on_conflict_do_nothing(index_elements=['name']).returning(NewsSource.name, NewsSource.id)
+        ids.update(dict((await session.execute(stmt)).all()))
+
+        # Источники, созданные параллельно другим воркером
+        still_missing = [name for name in missing if name not in ids]
+        if still_missing:
+            ids.update(dict((await session.execute(
+                select(NewsSource.name, NewsSource.id).where(NewsSource.name.in_(still_missing))
+            )).all()))
+
+    return ids
@@ -0,0 +1,124 @@
+# server/services/news_stream.py
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from server.config import NEWS_STREAM_QUEUE_SIZE, NEWS_STREAM_MAX_SUBSCRIBERS
+
+logger = logging.getLogger(__name__)
+
+# Новость в событии: (id, категория, JSON фрагмент элемента списка)
+StreamItem = Tuple[int, str, bytes]
+
+
+class Subscription:
+    """Подписка одного клиента (SSE или long-poll) на новые новости"""
+
+    def __init__(self, category: Optional[str], queue_size: int):
+        self.category = category
+        self.queue: "asyncio.Queue[Optional[List[StreamItem]]]" = asyncio.Queue(maxsize=queue_size)
+        # Клиент не успевал читать события - подписка закрыта, догонять нужно из БД
+        self.overflowed = False
+        self.closed = False
+
+    def matches(self, category: str) -> bool:
+        return not self.category or self.category == "all" or self.category == category
+
+    async def get(self, timeout: float) -> Optional[List[StreamItem]]:
+        """
+        Ждет новые новости не дольше timeout секунд.
+        Возвращает все накопленные новости, [] по таймауту или None, если подписка закрыта.
+        """
+        if self.closed and self.queue.empty():
+            return None
+        try:
+            batch = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        items: List[StreamItem] = []
+        while batch is not None:
+            items.extend(batch)
+            if self.queue.empty():
+                return items
+            batch = self.queue.get_nowait()
+        # Подписка закрыта: отдаем то, что успели получить
+        return items or None
+
+
+class NewsBroker:
+    """
+    Внутрипроцессный pub/sub новых новостей.
+
+    save_to_database после коммита публикует вставленные новости одним событием,
+    а SSE и long-poll клиенты получают его из своих очередей без обращения к БД.
+    Медленный клиент не тормозит остальных: при переполнении очереди его подписка
+    закрывается, и он догоняет пропущенное запросом ?since= при переподключении.
+    """
+
+    def __init__(self, queue_size: int = NEWS_STREAM_QUEUE_SIZE,
+                 max_subscribers: int = NEWS_STREAM_MAX_SUBSCRIBERS):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers: Set[Subscription] = set()
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, category: Optional[str] = None) -> Optional[Subscription]:
+        """Новая подписка или None, если достигнут лимит подписчиков"""
+        if len(self._subscribers) >= self.max_subscribers:
+            return None
+        subscription = Subscription(category, self.queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def publish(self, items: List[StreamItem]) -> None:
+        """Рассылает новости подписчикам (по категории подписки)"""
+        if not items:
+            return
+        self.published += len(items)
+        for subscription in list(self._subscribers):
+            batch = [item for item in items if subscription.matches(item[1])]
+            if not batch:
+                continue
+            try:
+                subscription.queue.put_nowait(batch)
+                self.delivered += len(batch)
+            except asyncio.QueueFull:
+                self.overflows += 1
+                subscription.overflowed = True
+                self._close(subscription)
+                logger.warning("Подписчик не успевает читать новые новости, подписка закрыта")
+
+    def close(self) -> None:
+        """Закрывает все подписки (остановка приложения)"""
+        for subscription in list(self._subscribers):
+            self._close(subscription)
+
+    def _close(self, subscription: Subscription) -> None:
+        subscription.closed = True
+        self._subscribers.discard(subscription)
+        try:
+            subscription.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            # Очередь полна - читатель увидит closed после того, как разберет ее
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'subscribers': len(self._subscribers),
+            'max_subscribers': self.max_subscribers,
+            'published': self.published,
+            'delivered': self.delivered,
+            'overflows': self.overflows,
+        }
+
+
+news_broker = NewsBroker()
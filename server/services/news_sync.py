@@ -0,0 +1,166 @@
+# server/services/news_sync.py
+"""
+Синхронизация процессов с новостями, записанными в БД другими процессами.
+
+Загрузку источников ведет один процесс (server/services/leader.py), а запросы
+API обслуживают все. Каждый процесс раз в NEWS_SYNC_INTERVAL секунд читает по
+первичному ключу новости с id больше последнего увиденного, отдает их своим
+SSE / long-poll подписчикам и добавляет чужие в индексы дедупликации (на
+случай, если процесс станет ведущим). Свои новости save_to_database отмечает
+через note_local.
+
+id выдает последовательность до коммита, поэтому транзакции фиксируются не по
+порядку id: читать просто id > последнего нельзя - строка с меньшим id, чей
+коммит задержался, была бы пропущена. Читается только до settled_id - границы,
+до которой все вставки уже зафиксированы или откатились. Граница сдвигается по
+снимкам: в проверке запоминается последнее значение последовательности, в
+следующей - xmax снимка транзакций (к этому времени транзакции, взявшие эти id,
+уже получили номер транзакции), а когда xmin снимка дойдет до этого xmax, все
+они завершены. Новость попадает подписчикам через 2-3 интервала после записи,
+зато в порядке id и без пропусков; тот же settled_id ограничивает догоняющие
+выборки API (since).
+
+Заодно читается версия данных (последняя новость и состояние category_counts) -
+из нее строятся ETag ответов API, поэтому у всех воркеров они совпадают, а
+смена версии сбрасывает кэш ответов процесса.
+"""
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import text
+
+from server.config import NEWS_SYNC_INTERVAL, NEWS_STREAM_CATCHUP_LIMIT
+
+logger = logging.getLogger(__name__)
+
+# Все, от чего зависят ответы списка, категорий и статистики: просмотры в ETag не входят
+_DATA_VERSION_SQL = text("""
+    SELECT (SELECT max(id) FROM news_items),
+           (SELECT coalesce(sum(count), 0) FROM category_counts),
+           (SELECT max(updated_at) FROM category_counts)
+""")
+
+# Последнее выданное значение последовательности id и границы снимка транзакций
+_HORIZON_SQL = text("""
+    SELECT pg_sequence_last_value(pg_get_serial_sequence('news_items', 'id')),
+           txid_snapshot_xmin(snap), txid_snapshot_xmax(snap)
+    FROM (SELECT txid_current_snapshot() AS snap) AS s
+""")
+
+
+async def load_data_version(db) -> str:
+    """Версия данных в БД, одинаковая для всех процессов"""
+    last_id, total, updated_at = (await db.execute(_DATA_VERSION_SQL)).one()
+    stamp = updated_at.isoformat() if updated_at is not None else ''
+    return f"{last_id or 0}.{total}.{stamp}"
+
+
+class NewsSync:
+    """Отслеживание новостей, записанных другими процессами"""
+
+    def __init__(self, interval: float = NEWS_SYNC_INTERVAL, batch: int = NEWS_STREAM_CATCHUP_LIMIT):
+        self.interval = interval
+        self.batch = batch
+        # id последней увиденной новости (None - еще не читали)
+        self.last_id: Optional[int] = None
+        # Все новости с id <= settled_id зафиксированы (None - граница еще не известна)
+        self.settled_id: Optional[int] = None
+        # Снимки [значение последовательности, xmax следующей проверки или None]
+        self._captures: Deque[List[Optional[int]]] = deque()
+        # id новостей, записанных этим процессом и еще не увиденных синхронизацией
+        self._local: Set[int] = set()
+        self.checks = 0
+        self.synced = 0
+        self.errors = 0
+
+    def note_local(self, news_ids: Iterable[int]) -> None:
+        self._local.update(news_ids)
+
+    async def refresh_version(self) -> bool:
+        """Перечитывает версию данных (после своей записи). True - данные изменились"""
+        from server.db import AsyncSessionLocal
+        from server.utils.cache import news_cache
+
+        async with AsyncSessionLocal() as db:
+            version = await load_data_version(db)
+        return news_cache.set_data_version(version)
+
+    def advance(self, sequence: Optional[int], xmin: int, xmax: int) -> Optional[int]:
+        """
+        Сдвигает settled_id по значению последовательности и границам снимка
+        транзакций текущей проверки. Возвращает settled_id.
+        """
+        for capture in self._captures:
+            if capture[1] is None:
+                capture[1] = xmax
+        # Транзакции, которые могли взять id <= capture[0], имеют номер < capture[1] и все завершены
+        while self._captures and self._captures[0][1] is not None and self._captures[0][1] <= xmin:
+            self.settled_id = self._captures.popleft()[0]
+        self._captures.append([sequence or 0, None])
+        return self.settled_id
+
+    async def sync_once(self) -> int:
+        """Одна проверка. Возвращает число новых чужих новостей"""
+        from sqlalchemy import select
+        from server.api.news import publish_new_items
+        from server.db import AsyncSessionLocal, NewsItem
+        from server.services.dedup_service import remember_saved
+        from server.utils.cache import news_cache
+
+        self.checks += 1
+        async with AsyncSessionLocal() as db:
+            # Версия читается первой: новости, записанные после нее, сменят ее в следующей проверке
+            news_cache.set_data_version(await load_data_version(db))
+            settled_id = self.advance(*(await db.execute(_HORIZON_SQL)).one())
+            if settled_id is None:
+                return 0
+            if self.last_id is None:
+                # Новости до запуска процесса подписчикам уже не нужны
+                self.last_id = settled_id
+                return 0
+            if self.last_id >= settled_id:
+                return 0
+            rows = (await db.execute(
+                select(NewsItem.id, NewsItem.fingerprint, NewsItem.simhash)
+                .where(NewsItem.id > self.last_id, NewsItem.id <= settled_id)
+                .order_by(NewsItem.id)
+                .limit(self.batch)
+            )).all()
+
+        # Остаток после полной пачки дочитает следующая проверка
+        self.last_id = rows[-1][0] if len(rows) == self.batch else settled_id
+        foreign = [tuple(row) for row in rows if row[0] not in self._local]
+        # Отметки своих новостей дальше не нужны (в том числе от откатившихся записей)
+        self._local = {news_id for news_id in self._local if news_id > self.last_id}
+        if foreign:
+            self.synced += len(foreign)
+            remember_saved(foreign)
+        if rows:
+            await publish_new_items([row[0] for row in rows])
+        return len(foreign)
+
+    async def run(self) -> None:
+        """Цикл проверок (на все время работы процесса)"""
+        while True:
+            try:
+                count = await self.sync_once()
+                if count:
+                    logger.info(f"Получено {count} новостей, записанных другим процессом")
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Ошибка при синхронизации новостей: {e}")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'last_id': self.last_id,
+            'settled_id': self.settled_id,
+            'checks': self.checks,
+            'synced': self.synced,
+            'errors': self.errors,
+        }
+
+
+news_sync = NewsSync()
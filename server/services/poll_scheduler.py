@@ -0,0 +1,291 @@
+# server/services/poll_scheduler.py
+"""
+Адаптивное расписание опроса источников.
+
+Вместо общего цикла раз в час у каждого источника свой срок следующего опроса.
+Сроки хранятся в куче (heapq): цикл спит до ближайшего срока, опрашивает все
+источники, срок которых наступает в пределах POLL_BATCH_WINDOW, одним циклом
+загрузки и записи и ставит их обратно в кучу.
+
+Интервал источника рассчитывается по оценке частоты его публикаций так, чтобы
+на опрос приходилось около POLL_TARGET_ITEMS новых постов. Частота оценивается
+с экспоненциальным затуханием (примерно число постов за последние
+RATE_WINDOW секунд), при старте - по истории в БД. Опросы подряд без новых постов
+удлиняют интервал, ошибки - экспоненциально откладывают следующий опрос.
+"""
+import asyncio
+import heapq
+import logging
+import math
+import random
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from server.config import (
+    POLL_MIN_INTERVAL,
+    POLL_MAX_INTERVAL,
+    POLL_TARGET_ITEMS,
+    POLL_DEFAULT_INTERVAL,
+    POLL_RATE_HISTORY_DAYS,
+    POLL_EMPTY_BACKOFF,
+    POLL_ERROR_BACKOFF,
+    POLL_JITTER,
+    POLL_BATCH_WINDOW,
+)
+from server.services.circuit_breaker import source_breakers
+
+logger = logging.getLogger(__name__)
+
+# Исход опроса источника
+OK = 'ok'
+NOT_MODIFIED = 'not_modified'
+ERROR = 'error'
+
+
+def poll_outcome(status: int) -> str:
+    """Исход опроса по HTTP статусу страницы источника (0 - ошибка соединения)"""
+    if status == 304:
+        return NOT_MODIFIED
+    if status == 200:
+        return OK
+    return ERROR
+
+
+class SourceSchedule:
+    """Состояние опроса одного источника"""
+
+    def __init__(self, name: str, rate: Optional[float]):
+        self.name = name
+        # Оценка частоты публикаций, постов в секунду (None - неизвестна)
+        self.rate = rate
+        self.interval = 0.0
+        self.next_run = 0.0
+        self.last_run: Optional[float] = None
+        # Опросов подряд без новых постов и ошибок подряд
+        self.empty_streak = 0
+        self.errors = 0
+        self.polls = 0
+        self.new_items = 0
+        self.not_modified = 0
+        self.failures = 0
+
+
+class PollScheduler:
+    """Куча сроков опроса источников с адаптивными интервалами"""
+
+    # Окно оценки частоты публикаций (постоянная времени затухания), секунды
+    RATE_WINDOW = 6 * 3600
+    # Предел удлинения интервала за опросы без новых постов (степень POLL_EMPTY_BACKOFF)
+    MAX_EMPTY_STREAK = 8
+
+    def __init__(self, min_interval: float = POLL_MIN_INTERVAL, max_interval: float = POLL_MAX_INTERVAL,
+                 target_items: float = POLL_TARGET_ITEMS, default_interval: float = POLL_DEFAULT_INTERVAL,
+                 empty_backoff: float = POLL_EMPTY_BACKOFF, error_backoff: float = POLL_ERROR_BACKOFF,
+                 jitter: float = POLL_JITTER, clock=time.monotonic):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_items = target_items
+        self.default_interval = default_interval
+        self.empty_backoff = empty_backoff
+        self.error_backoff = error_backoff
+        self.jitter = jitter
+        self.clock = clock
+        self._sources: Dict[str, SourceSchedule] = {}
+        # (срок, название); у каждого источника не больше одной записи
+        self._heap: List[Tuple[float, str]] = []
+        # Источники, которые сейчас опрашиваются (сняты с кучи)
+        self._running: Set[str] = set()
+        self._random = random.Random()
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    def add(self, name: str, rate: Optional[float] = None, delay: float = 0.0) -> None:
+        """Добавляет источник (первый опрос через delay секунд); для известного обновляет оценку частоты"""
+        source = self._sources.get(name)
+        if source is not None:
+            if rate is not None:
+                source.rate = rate
+            return
+        source = self._sources[name] = SourceSchedule(name, rate)
+        source.interval = self._base_interval(source)
+        source.next_run = self.clock() + delay
+        heapq.heappush(self._heap, (source.next_run, name))
+
+    def next_run_in(self) -> Optional[float]:
+        """Секунды до ближайшего срока (0, если срок наступил) или None, если ждать нечего"""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - self.clock())
+
+    def pop_due(self, window: float = POLL_BATCH_WINDOW) -> List[str]:
+        """Снимает с кучи источники, срок которых наступает в пределах window секунд"""
+        limit = self.clock() + window
+        due = []
+        while self._heap and self._heap[0][0] <= limit:
+            _, name = heapq.heappop(self._heap)
+            self._running.add(name)
+            due.append(name)
+        return due
+
+    def record(self, name: str, outcome: str, new_items: int = 0) -> float:
+        """Учитывает результат опроса и ставит источник обратно в кучу. Возвращает новый интервал"""
+        source = self._sources[name]
+        now = self.clock()
+        source.polls += 1
+
+        if outcome == ERROR:
+            source.errors += 1
+            source.failures += 1
+            interval = min(self.max_interval, self.error_backoff * 2 ** (source.errors - 1))
+        else:
+            source.errors = 0
+            if outcome == NOT_MODIFIED:
+                source.not_modified += 1
+            source.new_items += new_items
+            # Первый опрос после запуска забирает накопившееся - частоту по нему не оцениваем
+            if source.last_run is not None:
+                self._update_rate(source, new_items, now - source.last_run)
+            source.last_run = now
+            source.empty_streak = 0 if new_items else min(source.empty_streak + 1, self.MAX_EMPTY_STREAK)
+            interval = self._base_interval(source) * self.empty_backoff ** source.empty_streak
+            interval = min(self.max_interval, max(self.min_interval, interval))
+
+        source.interval = interval
+        source.next_run = now + interval * (1 + self._random.uniform(-self.jitter, self.jitter))
+        self._running.discard(name)
+        heapq.heappush(self._heap, (source.next_run, name))
+        return interval
+
+    def requeue_running(self) -> None:
+        """Возвращает в кучу источники, опрос которых прерван (остановка цикла опроса)"""
+        for name in list(self._running):
+            self.defer(name, 0.0)
+
+    def defer(self, name: str, delay: float) -> None:
+        """Возвращает снятый источник в кучу без опроса (например, пока он отключен автоматом защиты)"""
+        source = self._sources[name]
+        source.next_run = self.clock() + delay
+        self._running.discard(name)
+        heapq.heappush(self._heap, (source.next_run, name))
+
+    def _update_rate(self, source: SourceSchedule, new_items: int, elapsed: float) -> None:
+        if elapsed <= 0:
+            return
+        decay = math.exp(-elapsed / self.RATE_WINDOW)
+        # Без истории начинаем с частоты, соответствующей интервалу по умолчанию
+        previous = source.rate if source.rate is not None else self.target_items / self.default_interval
+        source.rate = previous * decay + new_items / elapsed * (1 - decay)
+
+    def _base_interval(self, source: SourceSchedule) -> float:
+        """Интервал, за который в среднем выходит target_items постов"""
+        if source.rate is None:
+            interval = self.default_interval
+        elif source.rate <= 0:
+            interval = self.max_interval
+        else:
+            interval = self.target_items / source.rate
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def stats(self) -> Dict[str, Any]:
+        now = self.clock()
+        sources = sorted(self._sources.values(), key=lambda s: s.next_run)
+        polls = sum(s.polls for s in sources)
+        return {
+            'sources': len(sources),
+            'running': len(self._running),
+            'polls': polls,
+            'new_items': sum(s.new_items for s in sources),
+            'not_modified': sum(s.not_modified for s in sources),
+            'errors': sum(s.failures for s in sources),
+            'schedule': [
+                {
+                    'name': s.name,
+                    'interval': round(s.interval, 1),
+                    'next_run_in': round(max(0.0, s.next_run - now), 1) if s.name not in self._running else 0.0,
+                    'posts_per_hour': round(s.rate * 3600, 3) if s.rate is not None else None,
+                    'empty_streak': s.empty_streak,
+                    'errors': s.errors,
+                }
+                for s in sources
+            ],
+        }
+
+
+async def load_source_rates(names: Iterable[str]) -> Dict[str, float]:
+    """
+    Частота публикаций источников (постов в секунду) за последние POLL_RATE_HISTORY_DAYS дней.
+    Источников, которых еще нет в БД, в результате нет (частота неизвестна).
+    """
+    from server.db import AsyncSessionLocal
+    from server.services.source_service import count_recent_items
+
+    async with AsyncSessionLocal() as db:
+        counts = await count_recent_items(db, list(names), POLL_RATE_HISTORY_DAYS)
+    period = POLL_RATE_HISTORY_DAYS * 86400
+    return {name: count / period for name, count in counts.items()}
+
+
+async def run_polling(news_service, scheduler: "PollScheduler", leases=None) -> None:
+    """
+    Цикл опроса: ждет ближайший срок, опрашивает наступившие источники одним
+    вызовом update_news_async и передает результаты в расписание. Источники,
+    отключенные автоматом защиты, откладываются до конца паузы без запроса.
+    С leases (server/services/leader.py) опрашиваются только арендованные
+    источники, остальные откладываются на срок аренды.
+    """
+
+    names = news_service.source_names()
+    rates: Dict[str, float] = {}
+    try:
+        rates = await load_source_rates(names)
+    except Exception as e:
+        logger.error(f"Ошибка при оценке частоты публикаций источников: {e}")
+    for name in names:
+        scheduler.add(name, rates.get(name))
+
+    try:
+        while True:
+            delay = scheduler.next_run_in()
+            if delay is None:
+                return
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            due = []
+            for name in scheduler.pop_due():
+                retry_in = source_breakers.retry_in(name)
+                if retry_in > 0:
+                    scheduler.defer(name, retry_in)
+                else:
+                    due.append(name)
+            if due and leases is not None:
+                try:
+                    owned = await leases.acquire(news_service.source_rows(due))
+                except Exception as e:
+                    logger.error(f"Ошибка при аренде источников: {e}")
+                    for name in due:
+                        scheduler.defer(name, scheduler.error_backoff)
+                    continue
+                for name in due:
+                    if name not in owned:
+                        scheduler.defer(name, leases.ttl)
+                due = [name for name in due if name in owned]
+            if not due:
+                continue
+            try:
+                results = await news_service.update_news_async(due)
+            except Exception as e:
+                logger.error(f"Ошибка при обновлении новостей: {e}")
+                results = {}
+
+            for name in due:
+                status, new_items = results.get(name, (0, 0))
+                interval = scheduler.record(name, poll_outcome(status), new_items)
+                logger.info(f"  {name}: status {status}, {new_items} new, next poll in {interval:.0f}s")
+    finally:
+        # Опрос остановлен (например, процесс перестал быть ведущим) посреди цикла
+        scheduler.requeue_running()
+
+
+poll_scheduler = PollScheduler()
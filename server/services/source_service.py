@@ -1,7 +1,18 @@
 # server/services/source_service.py
+from datetime import datetime, timedelta
+from sqlalchemy import and_, bindparam, func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from server.db import NewsSource
-from typing import Optional
+from server.db import NewsItem, NewsSource
+from typing import Any, Dict, List, Optional
+
+# Отметки только растут: параллельный воркер мог уже продвинуть их дальше
+_SAVE_LAST_MESSAGE_IDS_SQL = text("""
+    UPDATE news_sources AS s
+    SET last_message_id = GREATEST(COALESCE(s.last_message_id, 0), v.last_message_id)
+    FROM unnest(CAST(:names AS VARCHAR[]), CAST(:ids AS BIGINT[])) AS v(name, last_message_id)
+    WHERE s.name = v.name
+""")
 
 
 def get_or_create_source(
@@ -31,4 +42,130 @@ def get_or_create_source(
 
 
 def get_source_by_id(db: Session, source_id: int) -> Optional[NewsSource]:
-    return db.query(NewsSource).filter(NewsSource.id == source_id).first()
\ No newline at end of file
+    return db.query(NewsSource).filter(NewsSource.id == source_id).first()
+
+async def load_last_message_ids(db: AsyncSession) -> Dict[str, int]:
+    """
+    Загружает id последних обработанных сообщений Telegram каналов.
+
+    Returns:
+        Словарь название источника -> id сообщения
+    """
+    rows = await db.execute(
+        select(NewsSource.name, NewsSource.last_message_id).where(NewsSource.last_message_id.is_not(None))
+    )
+    return dict(rows.all())
+
+
+async def save_last_message_ids(db: AsyncSession, marks: Dict[str, int]) -> None:
+    """
+    Сохраняет id последних обработанных сообщений (название источника -> id).
+    Источники без строки в news_sources пропускаются. Коммит выполняет вызывающая сторона.
+    """
+    if not marks:
+        return
+    await db.execute(_SAVE_LAST_MESSAGE_IDS_SQL, {'names': list(marks), 'ids': list(marks.values())})
+
+
+async def count_recent_items(db: AsyncSession, names: List[str], days: int) -> Dict[str, int]:
+    """
+    Число новостей каждого источника, опубликованных за последние days дней.
+    Возвращает только источники, для которых есть строка в news_sources (в том числе с 0).
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    rows = await db.execute(
+        select(NewsSource.name, func.count(NewsItem.id))
+        .outerjoin(NewsItem, and_(NewsItem.source_id == NewsSource.id, NewsItem.publish_date >= since))
+        .where(NewsSource.name.in_(names))
+        .group_by(NewsSource.name)
+    )
+    return dict(rows.all())
+
+
+_HEALTH_FIELDS = ('health_state', 'consecutive_failures', 'last_error',
+                  'last_success_at', 'last_failure_at', 'retry_at')
+
+
+async def load_source_health(db: AsyncSession) -> Dict[str, Dict[str, Any]]:
+    """
+    Загружает состояние автоматов защиты источников.
+
+    Returns:
+        Словарь название источника -> поля состояния (только источники, у которых оно сохранялось)
+    """
+    columns = [getattr(NewsSource, field) for field in _HEALTH_FIELDS]
+    rows = await db.execute(
+        select(NewsSource.name, *columns).where(NewsSource.health_state.is_not(None))
+    )
+    return {row[0]: dict(zip(_HEALTH_FIELDS, row[1:])) for row in rows.all()}
+
+
+async def save_source_health(db: AsyncSession, states: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Сохраняет состояние автоматов защиты (название источника -> поля состояния)
+    одним пакетным UPDATE. Коммит выполняет вызывающая сторона.
+    """
+    if not states:
+        return
+    stmt = (
+        update(NewsSource.__table__)
+        .where(NewsSource.__table__.c.name == bindparam('source_name'))
+        .values({field: bindparam(field) for field in _HEALTH_FIELDS})
+    )
+    await db.execute(stmt, [{'source_name': name, **values} for name, values in states.items()])
+
+
+# Источник берется, если он свободен, аренда истекла или уже принадлежит владельцу
+_ACQUIRE_LEASES_SQL = text("""
+    UPDATE news_sources
+    SET lease_owner = :owner, lease_until = :until
+    WHERE name = ANY(CAST(:names AS VARCHAR[]))
+    AND (lease_owner IS NULL OR lease_owner = :owner OR lease_until IS NULL OR lease_until < :now)
+    RETURNING name
+""")
+
+
+async def acquire_source_leases(db: AsyncSession, names: List[str], owner: str, ttl: float) -> List[str]:
+    """
+    Берет в аренду (или продлевает) источники names на ttl секунд.
+    Источники без строки в news_sources взять нельзя. Коммит выполняет вызывающая сторона.
+
+    Returns:
+        Названия источников, которые теперь принадлежат owner
+    """
+    if not names:
+        return []
+    now = datetime.utcnow()
+    rows = await db.execute(_ACQUIRE_LEASES_SQL, {
+        'names': list(names), 'owner': owner, 'now': now, 'until': now + timedelta(seconds=ttl),
+    })
+    return [row[0] for row in rows.all()]
+
+
+async def load_source_leases(db: AsyncSession) -> Dict[str, Dict[str, Any]]:
+    """Действующие аренды источников: название -> {'owner', 'until'}"""
+    rows = await db.execute(
+        select(NewsSource.name, NewsSource.lease_owner, NewsSource.lease_until)
+        .where(NewsSource.lease_owner.is_not(None), NewsSource.lease_until >= datetime.utcnow())
+        .order_by(NewsSource.name)
+    )
+    return {name: {'owner': owner, 'until': until} for name, owner, until in rows.all()}
+
+
+async def renew_source_leases(db: AsyncSession, owner: str, ttl: float) -> List[str]:
+    """Продлевает все аренды owner на ttl секунд. Возвращает названия источников, которые за ним остались"""
+    rows = await db.execute(
+        update(NewsSource)
+        .where(NewsSource.lease_owner == owner)
+        .values(lease_until=datetime.utcnow() + timedelta(seconds=ttl))
+        .returning(NewsSource.name)
+    )
+    return [row[0] for row in rows.all()]
+
+
+async def release_source_leases(db: AsyncSession, owner: str, names: Optional[List[str]] = None) -> None:
+    """Освобождает аренды owner: источники names или все (ведущий уступает загрузку)"""
+    stmt = update(NewsSource).where(NewsSource.lease_owner == owner)
+    if names is not None:
+        stmt = stmt.where(NewsSource.name.in_(names))
+    await db.execute(stmt.values(lease_owner=None, lease_until=None))
@@ -0,0 +1,89 @@
+# server/services/stats_service.py
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from server.db import CategoryCount
+
+# Полный пересчет таблицы category_counts из news_items одним GROUP BY
+REFRESH_CATEGORY_COUNTS_SQL = """
+    WITH actual AS (
+        SELECT category, COUNT(*) AS count FROM news_items GROUP BY category
+    ), removed AS (
+        DELETE FROM category_counts c
+        WHERE NOT EXISTS (SELECT 1 FROM actual a WHERE a.category = c.category)
+    )
+    INSERT INTO category_counts (category, count, updated_at)
+    SELECT category, count, NOW() FROM actual
+    ON CONFLICT (category) DO UPDATE
+    SET count = EXCLUDED.count, updated_at = EXCLUDED.updated_at
+    WHERE category_counts.count IS DISTINCT FROM EXCLUDED.count
+"""
+
+
+async def increment_category_counts(db: AsyncSession, deltas: Dict[str, int]) -> None:
+    """
+    Прибавляет количество вставленных новостей к счетчикам категорий.
+    Вызывается в той же транзакции, что и вставка, поэтому счетчики не расходятся с news_items.
+    Коммит выполняет вызывающая сторона.
+    """
+    if not deltas:
+        return
+
+    now = datetime.utcnow()
+    stmt = pg_insert(CategoryCount).values([
+        {'category': category, 'count': delta, 'updated_at': now}
+        for category, delta in sorted(deltas.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['category'],
+        set_={'count': CategoryCount.count + stmt.excluded.count, 'updated_at': stmt.excluded.updated_at}
+    )
+    await db.execute(stmt)
+
+
+async def refresh_category_counts(db: AsyncSession) -> None:
+    """Пересчитывает счетчики категорий по news_items (коммит - на вызывающей стороне)"""
+    await db.execute(text(REFRESH_CATEGORY_COUNTS_SQL))
+
+
+async def ensure_category_counts(db: AsyncSession) -> bool:
+    """
+    Пересчитывает счетчики, если таблица category_counts пуста, а новости есть
+    (таблица создана или очищена без миграции). Вызывается при старте приложения.
+    Возвращает True, если счетчики пересчитаны.
+    """
+    empty = (await db.execute(text(
+        "SELECT NOT EXISTS (SELECT 1 FROM category_counts) AND EXISTS (SELECT 1 FROM news_items)"
+    ))).scalar()
+    if not empty:
+        return False
+    await refresh_category_counts(db)
+    await db.commit()
+    return True
+
+
+async def get_category_counts(db: AsyncSession) -> Tuple[Dict[str, int], Optional[datetime]]:
+    """
+    Счетчики категорий одним чтением маленькой таблицы.
+
+    Returns:
+        (категория -> количество новостей, время последнего изменения счетчиков)
+    """
+    rows = (await db.execute(
+        select(CategoryCount.category, CategoryCount.count, CategoryCount.updated_at)
+        .where(CategoryCount.count > 0)
+        .order_by(CategoryCount.category)
+    )).all()
+    counts = {category: count for category, count, _ in rows}
+    last_updated = max((updated_at for _, _, updated_at in rows if updated_at), default=None)
+    return counts, last_updated
+
+
+async def list_categories(db: AsyncSession) -> List[str]:
+    """Категории, в которых есть новости"""
+    counts, _ = await get_category_counts(db)
+    return list(counts)
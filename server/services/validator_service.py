@@ -0,0 +1,49 @@
+# server/services/validator_service.py
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from server.db import SourceValidator
+
+
+async def load_validators(db: AsyncSession) -> Dict[str, Dict[str, Optional[str]]]:
+    """
+    Загружает сохраненные валидаторы условных запросов для всех URL.
+
+    Returns:
+        Словарь url -> {'etag', 'last_modified', 'content_hash'}
+    """
+    rows = (await db.execute(select(SourceValidator))).scalars().all()
+    return {
+        row.url: {
+            'etag': row.etag,
+            'last_modified': row.last_modified,
+            'content_hash': row.content_hash,
+        }
+        for row in rows
+    }
+
+
+async def save_validators(db: AsyncSession, validators: Dict[str, Dict[str, Optional[str]]]) -> None:
+    """
+    Сохраняет (создает или обновляет) валидаторы для переданных URL.
+    Коммит выполняет вызывающая сторона.
+    """
+    if not validators:
+        return
+
+    result = await db.execute(select(SourceValidator).where(SourceValidator.url.in_(list(validators))))
+    existing = {row.url: row for row in result.scalars().all()}
+    now = datetime.utcnow()
+
+    for url, values in validators.items():
+        row = existing.get(url)
+        if row is None:
+            row = SourceValidator(url=url)
+            db.add(row)
+        row.etag = values.get('etag')
+        row.last_modified = values.get('last_modified')
+        row.content_hash = values.get('content_hash')
+        row.checked_at = now
@@ -0,0 +1,101 @@
+# server/services/view_counter.py
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from sqlalchemy import text
+
+from server.config import VIEW_COUNTER_FLUSH_INTERVAL, VIEW_COUNTER_FLUSH_THRESHOLD
+from server.db import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Одно UPDATE на всю пачку; updated_at не трогаем, иначе просмотры меняли бы ETag новости
+_FLUSH_SQL = text("""
+    UPDATE news_items AS n
+    SET views_count = COALESCE(n.views_count, 0) + v.delta
+    FROM unnest(CAST(:ids AS INTEGER[]), CAST(:deltas AS INTEGER[])) AS v(id, delta)
+    WHERE n.id = v.id
+""")
+
+
+class ViewCounter:
+    """
+    Буферизованный счетчик просмотров (write-behind).
+
+    Просмотры накапливаются в памяти и записываются пачкой по таймеру или при
+    достижении порога, поэтому чтение новости не открывает транзакцию записи и
+    не ждет блокировки строки популярной новости.
+    """
+
+    def __init__(self, flush_interval: float = VIEW_COUNTER_FLUSH_INTERVAL,
+                 flush_threshold: int = VIEW_COUNTER_FLUSH_THRESHOLD):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._pending: Dict[int, int] = {}
+        self._pending_total = 0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def record(self, news_id: int, count: int = 1) -> None:
+        """Учитывает просмотр; при достижении порога запускает запись в фоне"""
+        self._pending[news_id] = self._pending.get(news_id, 0) + count
+        self._pending_total += count
+        if self._pending_total >= self.flush_threshold and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    def pending(self, news_id: int) -> int:
+        """Просмотры новости, еще не записанные в БД"""
+        return self._pending.get(news_id, 0)
+
+    async def flush(self) -> int:
+        """Записывает накопленные просмотры. Возвращает число записанных просмотров"""
+        async with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending, self._pending_total = self._pending, {}, 0
+
+            # Сортировка по id - одинаковый порядок блокировок у параллельных воркеров
+            ids = sorted(batch)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(_FLUSH_SQL, {'ids': ids, 'deltas': [batch[news_id] for news_id in ids]})
+                    await db.commit()
+            except Exception as e:
+                # Возвращаем просмотры в буфер, чтобы записать их в следующий раз
+                for news_id, delta in batch.items():
+                    self._pending[news_id] = self._pending.get(news_id, 0) + delta
+                    self._pending_total += delta
+                logger.error(f"Ошибка при записи просмотров: {e}")
+                return 0
+
+            total = sum(batch.values())
+            logger.debug(f"Записано {total} просмотров для {len(batch)} новостей")
+            return total
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        """Запускает периодическую запись (вызывается в lifespan)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает периодическую запись и записывает остаток буфера"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        await self.flush()
+
+
+view_counter = ViewCounter()
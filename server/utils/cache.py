@@ -0,0 +1,160 @@
+# server/utils/cache.py
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from server.config import NEWS_CACHE_MAX_ENTRIES, NEWS_CACHE_TTL, NEWS_FRAGMENT_CACHE_MAX_ENTRIES
+
+
+class ResponseCache:
+    """
+    TTL/LRU кэш готовых (сериализованных) ответов API.
+
+    Данные меняются только при записи новостей, поэтому вместо удаления отдельных
+    ключей используется счетчик поколений: запись после коммита вызывает
+    bump_generation(), и все ответы предыдущего поколения перестают считаться
+    актуальными. Работает в пределах одного процесса (event loop однопоточный).
+
+    Для HTTP валидаторов используется не поколение (оно свое у каждого процесса),
+    а версия данных из БД (server/services/news_sync.py), одинаковая у всех
+    воркеров: одинаковое содержимое получает одинаковый ETag на любом из них.
+    """
+
+    def __init__(self, max_entries: int = NEWS_CACHE_MAX_ENTRIES, ttl: float = NEWS_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.generation = 0
+        # Версия данных в БД (последняя новость, счетчики категорий); '' - еще не прочитана
+        self.data_version = ''
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # ключ -> (поколение, время истечения, тело ответа, сжатые варианты тела)
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, bytes, Dict[str, bytes]]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """Возвращает тело ответа или None, если его нет, оно устарело или истекло"""
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: Hashable) -> Optional[Tuple[bytes, Dict[str, bytes]]]:
+        """
+        Возвращает (тело, сжатые варианты) или None.
+        Словарь вариантов изменяемый: добавленные в него сжатые тела живут вместе с записью.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            generation, expires_at, body, variants = entry
+            if generation == self.generation and expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return body, variants
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, key: Hashable, body: bytes, generation: Optional[int] = None,
+            variants: Optional[Dict[str, bytes]] = None) -> None:
+        """
+        Сохраняет тело ответа.
+
+        Args:
+            generation: поколение, для которого ответ был построен; если за время
+                построения данные обновились, ответ не сохраняется
+            variants: уже сжатые варианты тела (кодировка -> байты)
+        """
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+        if generation is not None and generation != self.generation:
+            return
+        self._entries[key] = (self.generation, time.monotonic() + self.ttl, body, variants if variants is not None else {})
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    @property
+    def version(self) -> str:
+        """Версия данных для HTTP валидаторов (ETag), общая для всех процессов"""
+        return self.data_version
+
+    def set_data_version(self, version: str) -> bool:
+        """Запоминает версию данных из БД; при изменении сбрасывает сохраненные ответы"""
+        if version == self.data_version:
+            return False
+        self.data_version = version
+        self.bump_generation()
+        return True
+
+    def bump_generation(self) -> int:
+        """Инвалидирует все сохраненные ответы (вызывается после записи новостей)"""
+        self.generation += 1
+        self._entries.clear()
+        return self.generation
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий и промахов для мониторинга"""
+        requests = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'generation': self.generation,
+            'version': self.version,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': round(self.hits / requests, 4) if requests else 0.0,
+        }
+
+
+class FragmentCache:
+    """
+    LRU кэш готовых JSON фрагментов отдельных элементов ответа.
+
+    Фрагмент действителен, пока не изменилась его версия (stamp) - например,
+    updated_at строки и счетчик просмотров. Сброс поколения ResponseCache сюда
+    не распространяется: после записи новостей заново сериализуются только
+    новые и измененные элементы.
+    """
+
+    def __init__(self, max_entries: int = NEWS_FRAGMENT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # ключ -> (версия, фрагмент)
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, bytes]]" = OrderedDict()
+
+    def get(self, key: Hashable, stamp: Hashable) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def set(self, key: Hashable, stamp: Hashable, fragment: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (stamp, fragment)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / requests, 4) if requests else 0.0,
+        }
+
+
+# Кэш ответов GET /api/news/
+news_cache = ResponseCache()
+
+# Кэш JSON фрагментов элементов списка новостей
+news_fragment_cache = FragmentCache()
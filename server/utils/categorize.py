@@ -1 +1,159 @@
+# server/utils/categorize.py
+"""
+Категоризация текста по ключевым словам за один проход.
 
+Ключевые слова всех категорий компилируются один раз в автомат Ахо-Корасик.
+Каждое совпадение обязано начинаться на границе слова, поэтому все
+суффиксные (fail) ссылки автомата ведут в корень и автомат вырождается
+в бор. Бор записывается одним регулярным выражением (вложенные альтернативы
+по общим префиксам), которое модуль re исполняет в C за один проход по
+тексту: в начале каждого слова выполняется переход по бору, без перебора
+ключевых слов. Длинные ключевые слова совпадают как префиксы слов
+("токен" -> "токены"), короткие (it, ит, ai, ии, деф...) - только целыми
+словами, чтобы не срабатывать внутри произвольных слов.
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Узел бора: (переходы по символам, индексы ключевых слов, заканчивающихся в узле)
+_Node = Tuple[Dict[str, Any], List[int]]
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+
+class KeywordCategorizer:
+    """
+    Многошаблонный категоризатор: подсчет совпавших ключевых слов по категориям
+    и выбор категории с наибольшим счетом (при равенстве - по приоритету).
+    """
+
+    def __init__(
+            self,
+            keywords: Dict[str, Sequence[str]],
+            priority: Optional[Sequence[str]] = None,
+            min_prefix_length: int = 4,
+            default: str = 'general'
+    ):
+        """
+        Args:
+            keywords: категория -> список ключевых слов
+            priority: порядок категорий при равенстве очков
+            min_prefix_length: ключевые слова короче этой длины совпадают только целым словом
+            default: категория, если ничего не совпало
+        """
+        self.priority = list(priority or keywords.keys())
+        self.default = default
+        self.categories = list(keywords.keys())
+
+        # Одно ключевое слово может относиться к нескольким категориям (например, "блокчейн")
+        self._patterns: List[str] = []
+        self._pattern_categories: List[List[str]] = []
+        self._whole_word: List[bool] = []
+        index_by_pattern: Dict[str, int] = {}
+        for category, words in keywords.items():
+            for word in words:
+                word = word.lower()
+                if word not in index_by_pattern:
+                    index_by_pattern[word] = len(self._patterns)
+                    self._patterns.append(word)
+                    self._pattern_categories.append([])
+                    self._whole_word.append(len(word) < min_prefix_length)
+                categories = self._pattern_categories[index_by_pattern[word]]
+                if category not in categories:
+                    categories.append(category)
+
+        self._root: _Node = ({}, [])
+        for index, pattern in enumerate(self._patterns):
+            node = self._root
+            for ch in pattern:
+                node = node[0].setdefault(ch, ({}, []))
+            node[1].append(index)
+
+        # Ключевые слова, являющиеся префиксами более длинных: при совпадении длинного
+        # выражение возвращает только его, короткие добавляются по этому списку
+        self._prefixes: List[List[int]] = [
+            [other for other, prefix in enumerate(self._patterns)
+             if other != index and pattern.startswith(prefix)]
+            for index, pattern in enumerate(self._patterns)
+        ]
+        self._index_by_pattern = index_by_pattern
+
+        # Совпадение нулевой длины в начале каждого слова с захватом самого длинного ключевого слова
+        self._regex = re.compile(r'(?<!\w)(?=(' + self._compile(self._root) + r'))')
+
+    def _compile(self, node: _Node) -> str:
+        """Записывает узел бора как регулярное выражение; более длинные продолжения идут первыми"""
+        children, outputs = node
+        alternatives = [re.escape(ch) + self._compile(child) for ch, child in sorted(children.items())]
+        if outputs:
+            alternatives.append(r'(?!\w)' if self._whole_word[outputs[0]] else '')
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return '(?:' + '|'.join(alternatives) + ')'
+
+    def matches(self, text: str) -> List[str]:
+        """Возвращает ключевые слова, найденные в тексте (без повторов, в порядке появления)"""
+        return [self._patterns[index] for index in self._match_indices(text.lower())]
+
+    def _match_indices(self, content: str) -> List[int]:
+        found: List[int] = []
+        seen = set()
+        whole_word = self._whole_word
+        patterns = self._patterns
+
+        for matched in self._regex.findall(content):
+            index = self._index_by_pattern[matched]
+            candidates = [index]
+            for prefix in self._prefixes[index]:
+                if not (whole_word[prefix] and _is_word_char(matched[len(patterns[prefix])])):
+                    candidates.append(prefix)
+            for candidate in candidates:
+                if candidate not in seen:
+                    seen.add(candidate)
+                    found.append(candidate)
+
+        return found
+
+    def scores(self, text: str) -> Dict[str, int]:
+        """Количество различных совпавших ключевых слов по каждой категории (только ненулевые)"""
+        result: Dict[str, int] = {}
+        for index in self._match_indices(text.lower()):
+            for category in self._pattern_categories[index]:
+                result[category] = result.get(category, 0) + 1
+        return result
+
+    def _choose(self, scores: Dict[str, int]) -> str:
+        if not scores:
+            return self.default
+
+        # При равенстве очков используем приоритет
+        max_score = max(scores.values())
+        for category in self.priority:
+            if scores.get(category) == max_score:
+                return category
+        return next(category for category, score in scores.items() if score == max_score)
+
+    def categorize(self, title: str, description: str = "") -> str:
+        """Категория для заголовка и описания"""
+        return self._choose(self.scores(title + " " + description))
+
+    def categorize_many(self, items: Iterable[Union[Dict[str, Any], Tuple[str, str], str]]) -> List[str]:
+        """
+        Пакетная категоризация.
+
+        Args:
+            items: посты-словари ('title' и 'text'/'description'), пары (title, description) или строки
+        """
+        results = []
+        for item in items:
+            if isinstance(item, dict):
+                title = item.get('title') or ''
+                description = item.get('text') or item.get('description') or ''
+            elif isinstance(item, tuple):
+                title, description = item
+            else:
+                title, description = item, ''
+            results.append(self.categorize(title, description))
+        return results
@@ -0,0 +1,209 @@
+# server/utils/compression.py
+"""
+Сжатие ответов API (brotli / gzip).
+
+CompressionMiddleware сжимает готовые ответы не меньше COMPRESSION_MIN_SIZE байт
+по Accept-Encoding клиента. Ответы, у которых уже есть Content-Encoding (например,
+заранее сжатые тела из кэша ответов), потоковые ответы и SSE пропускаются без
+изменений. Vary: Accept-Encoding добавляется ко всем ответам сжимаемых типов, в том
+числе несжатым (клиент без Accept-Encoding, тело меньше порога), иначе общий кэш
+отдал бы сохраненный несжатый вариант всем клиентам. Счетчики байтов и
+процессорного времени доступны через compression_stats.
+"""
+import gzip
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from server.config import COMPRESSION_MIN_SIZE, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:  # brotli не установлен - используется только gzip
+    brotli = None
+
+# Кодировки в порядке предпочтения сервера
+SUPPORTED_ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+_SKIP_CONTENT_TYPES = ('text/event-stream', 'image/', 'video/', 'audio/', 'application/zip', 'application/gzip')
+
+
+class CompressionStats:
+    """Счетчики сжатия: байты до/после и процессорное время"""
+
+    def __init__(self):
+        self.responses = 0
+        self.precompressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    def record(self, size_in: int, size_out: int, cpu_seconds: float) -> None:
+        self.responses += 1
+        self.bytes_in += size_in
+        self.bytes_out += size_out
+        self.cpu_seconds += cpu_seconds
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'encodings': list(SUPPORTED_ENCODINGS),
+            'min_size': COMPRESSION_MIN_SIZE,
+            'responses': self.responses,
+            'precompressed': self.precompressed,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'ratio': round(self.bytes_out / self.bytes_in, 4) if self.bytes_in else None,
+            'cpu_ms_per_response': round(self.cpu_seconds * 1000 / self.responses, 3) if self.responses else None,
+        }
+
+
+compression_stats = CompressionStats()
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Выбирает кодировку по заголовку Accept-Encoding (с учетом q=0)"""
+    if not accept_encoding:
+        return None
+
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Сжимает тело ответа указанной кодировкой и учитывает затраты в compression_stats"""
+    started = time.process_time()
+    if encoding == 'br':
+        data = brotli.compress(body, quality=COMPRESSION_BROTLI_QUALITY, mode=brotli.MODE_TEXT)
+    else:
+        data = gzip.compress(body, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+    compression_stats.record(len(body), len(data), time.process_time() - started)
+    return data
+
+
+def encoded_body(body: bytes, accept_encoding: Optional[str], cached: Optional[Dict[str, bytes]] = None
+                 ) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Тело ответа в кодировке клиента и заголовки для него.
+
+    Args:
+        cached: словарь заранее сжатых вариантов этого тела (кодировка -> байты);
+            новый вариант добавляется в него, чтобы одинаковое тело не сжималось повторно
+    """
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None or not should_compress(body):
+        return body, {'Vary': 'Accept-Encoding'}
+
+    data = cached.get(encoding) if cached is not None else None
+    if data is None:
+        data = compress(body, encoding)
+        if cached is not None:
+            cached[encoding] = data
+    else:
+        compression_stats.precompressed += 1
+    return data, {'Content-Encoding': encoding, 'Vary': 'Accept-Encoding'}
+
+
+def should_compress(body: bytes, content_type: str = '') -> bool:
+    return len(body) >= COMPRESSION_MIN_SIZE and not content_type.startswith(_SKIP_CONTENT_TYPES)
+
+
+def merge_vary(vary: Optional[bytes]) -> bytes:
+    """Значение Vary с Accept-Encoding, сохраняющее уже перечисленные заголовки"""
+    if not vary:
+        return b'Accept-Encoding'
+    names = [name.strip().lower() for name in vary.split(b',')]
+    if b'accept-encoding' in names or b'*' in names:
+        return vary
+    return vary + b', Accept-Encoding'
+
+
+class CompressionMiddleware:
+    """ASGI middleware сжатия ответов (brotli / gzip) с порогом по размеру"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = None
+        for name, value in scope.get('headers', []):
+            if name == b'accept-encoding':
+                accept_encoding = value.decode('latin-1')
+                break
+        # Без подходящей кодировки ответ не сжимается, но Vary все равно нужен
+        encoding = choose_encoding(accept_encoding)
+
+        start_message: Optional[Dict[str, Any]] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, passthrough
+
+            if passthrough:
+                await send(message)
+                return
+
+            if message['type'] == 'http.response.start':
+                headers = _header_dict(message.get('headers', []))
+                if b'content-encoding' in headers or (message['status'] != 304 and _skip_content_type(headers)):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = dict(message, headers=_with_vary(message.get('headers', [])))
+                return
+
+            if message['type'] != 'http.response.body':
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            if message.get('more_body', False):
+                # Потоковый ответ - отправляем как есть
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers = list(start_message.get('headers', []))
+            content_type = _header_dict(headers).get(b'content-type', b'').decode('latin-1')
+            if encoding is not None and should_compress(body, content_type):
+                body = compress(body, encoding)
+                headers = [(k, v) for k, v in headers if k.lower() != b'content-length']
+                headers.append((b'content-encoding', encoding.encode('ascii')))
+                headers.append((b'content-length', str(len(body)).encode('ascii')))
+                start_message = dict(start_message, headers=headers)
+
+            await send(start_message)
+            await send({'type': 'http.response.body', 'body': body, 'more_body': False})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def _header_dict(headers: List[Tuple[bytes, bytes]]) -> Dict[bytes, bytes]:
+    return {name.lower(): value for name, value in headers}
+
+
+def _with_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    vary = _header_dict(headers).get(b'vary')
+    return [(k, v) for k, v in headers if k.lower() != b'vary'] + [(b'vary', merge_vary(vary))]
+
+
+def _skip_content_type(headers: Dict[bytes, bytes]) -> bool:
+    return headers.get(b'content-type', b'').decode('latin-1').startswith(_SKIP_CONTENT_TYPES)
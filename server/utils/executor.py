@@ -0,0 +1,43 @@
+# server/utils/executor.py
+import asyncio
+import functools
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from server.config import PARSE_EXECUTOR, PARSE_WORKERS
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[Executor] = None
+
+
+def get_parse_executor() -> Executor:
+    """
+    Возвращает общий пул для разбора лент и HTML страниц.
+    Тип пула задается PARSE_EXECUTOR ("thread" или "process"), размер - PARSE_WORKERS.
+    В режиме "process" функции и аргументы должны сериализоваться через pickle.
+    """
+    global _executor
+    if _executor is None:
+        if PARSE_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix="parser")
+        logger.info(f"Parse executor started ({PARSE_EXECUTOR}, workers={PARSE_WORKERS})")
+    return _executor
+
+
+async def run_in_parse_executor(func: Callable[..., Any], *args: Any) -> Any:
+    """Выполняет блокирующую функцию разбора в пуле, не блокируя event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_parse_executor(), functools.partial(func, *args))
+
+
+def shutdown_parse_executor() -> None:
+    """Останавливает пул разбора (вызывается при завершении приложения)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        logger.info("Parse executor stopped")
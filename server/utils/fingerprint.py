@@ -0,0 +1,17 @@
+# server/utils/fingerprint.py
+import hashlib
+
+
+def normalize_title(title: str) -> str:
+    """Нормализует заголовок для сравнения: нижний регистр, одиночные пробелы"""
+    return ' '.join((title or '').split()).lower()
+
+
+def news_fingerprint(title: str) -> str:
+    """
+    Уникальный ключ новости (колонка news_items.fingerprint).
+    Существующие строки заполняются этой же функцией (backfill_fingerprints в
+    server/services/dedup_service.py): SQL-аналог расходится с str.split() и lower()
+    Python на пробельных символах Unicode и в зависимости от локали БД.
+    """
+    return hashlib.sha256(normalize_title(title).encode('utf-8')).hexdigest()
@@ -0,0 +1,40 @@
+# server/utils/http_cache.py
+import hashlib
+from typing import Any, Dict, Optional
+
+from fastapi import Response
+
+
+def make_etag(*parts: Any) -> str:
+    """Слабый ETag из частей версии ответа (поколение данных, параметры запроса, updated_at)"""
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверка If-None-Match по правилам слабого сравнения (RFC 9110, 13.1.2)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def cache_headers(etag: str, max_age: int, stale_while_revalidate: int) -> Dict[str, str]:
+    """Заголовки валидации и кэширования для браузера и CDN"""
+    return {
+        'ETag': etag,
+        'Cache-Control': f'public, max-age={max_age}, stale-while-revalidate={stale_while_revalidate}',
+    }
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    """Ответ 304 без тела с теми же заголовками валидации"""
+    return Response(status_code=304, headers=headers)
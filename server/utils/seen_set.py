@@ -0,0 +1,260 @@
+# server/utils/seen_set.py
+"""
+Множество уже обработанных новостей (по fingerprint) с ограниченной памятью.
+
+Масштабируемый фильтр Блума помнит весь архив (~1.5-2 байта на новость при
+вероятности ложного срабатывания 0.1%), точный LRU - последние новости, которые
+парсер видит снова в каждом цикле. Ответы:
+
+- SEEN  - ключ есть в LRU, новость точно уже сохранена;
+- NEW   - фильтр ключа не видел, новость точно новая;
+- MAYBE - фильтр видел ключ, но в LRU его нет: старая новость или ложное
+  срабатывание фильтра, решает БД (INSERT ... ON CONFLICT).
+
+Состояние сохраняется в файл (snapshot) вместе с id последней учтенной новости
+и идентификатором БД, чтобы после перезапуска догружать из БД только новые
+строки. Снимок другой БД (или сброшенной) не загружается.
+"""
+import hashlib
+import json
+import math
+import os
+import struct
+import tempfile
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SEEN = 'seen'
+NEW = 'new'
+MAYBE = 'maybe'
+
+_SNAPSHOT_MAGIC = b'SEENSET1'
+
+
+def _key_hashes(key: str) -> Tuple[int, int]:
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+class BloomFilter:
+    """Фильтр Блума фиксированной емкости (двойное хеширование)"""
+
+    def __init__(self, capacity: int, error_rate: float, bits: Optional[bytearray] = None, count: int = 0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bits if bits is not None else bytearray((self.num_bits + 7) // 8)
+        self.count = count
+
+    def _positions(self, hashes: Tuple[int, int]):
+        h1, h2 = hashes
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, hashes: Tuple[int, int]) -> None:
+        for position in self._positions(hashes):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, hashes: Tuple[int, int]) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(hashes))
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+
+class ScalableBloomFilter:
+    """
+    Масштабируемый фильтр Блума: при заполнении добавляется фильтр вдвое большей
+    емкости с вдвое меньшей вероятностью ошибки, поэтому суммарная вероятность
+    ложного срабатывания не превышает error_rate при любом размере архива.
+    """
+
+    GROWTH = 2
+    TIGHTENING = 0.5
+
+    def __init__(self, initial_capacity: int, error_rate: float):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.filters: List[BloomFilter] = []
+
+    def _next_filter(self) -> BloomFilter:
+        number = len(self.filters)
+        return BloomFilter(
+            self.initial_capacity * self.GROWTH ** number,
+            self.error_rate * (1 - self.TIGHTENING) * self.TIGHTENING ** number,
+        )
+
+    def add(self, hashes: Tuple[int, int]) -> None:
+        if not self.filters or self.filters[-1].full:
+            self.filters.append(self._next_filter())
+        self.filters[-1].add(hashes)
+
+    def __contains__(self, hashes: Tuple[int, int]) -> bool:
+        return any(hashes in bloom for bloom in self.filters)
+
+    @property
+    def count(self) -> int:
+        return sum(bloom.count for bloom in self.filters)
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(len(bloom.bits) for bloom in self.filters)
+
+
+class SeenSet:
+    """Фильтр Блума по всему архиву перед точным LRU последних ключей"""
+
+    def __init__(self, lru_size: int, initial_capacity: int, error_rate: float):
+        self.lru_size = lru_size
+        self.bloom = ScalableBloomFilter(initial_capacity, error_rate)
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+        # id последней новости из БД, учтенной в множестве, и идентификатор этой БД
+        self.watermark = 0
+        self.database = ''
+        self.lookups = 0
+        self.lru_hits = 0
+        self.bloom_negatives = 0
+        self.bloom_positives = 0
+        self.false_positives = 0
+
+    def __len__(self) -> int:
+        return self.bloom.count
+
+    def add(self, key: str) -> None:
+        if key in self._recent:
+            self._recent.move_to_end(key)
+            return
+        hashes = _key_hashes(key)
+        if hashes not in self.bloom:
+            self.bloom.add(hashes)
+        self._recent[key] = None
+        if len(self._recent) > self.lru_size:
+            self._recent.popitem(last=False)
+
+    def update(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.add(key)
+
+    def check(self, key: str) -> str:
+        """SEEN, NEW или MAYBE (см. описание модуля)"""
+        self.lookups += 1
+        if key in self._recent:
+            self._recent.move_to_end(key)
+            self.lru_hits += 1
+            return SEEN
+        if _key_hashes(key) in self.bloom:
+            self.bloom_positives += 1
+            return MAYBE
+        self.bloom_negatives += 1
+        return NEW
+
+    def record_false_positive(self, count: int = 1) -> None:
+        """MAYBE оказался новой новостью (для оценки реальной доли ложных срабатываний)"""
+        self.false_positives += count
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'entries': self.bloom.count,
+            'recent': len(self._recent),
+            'lru_size': self.lru_size,
+            'filters': len(self.bloom.filters),
+            'error_rate': self.bloom.error_rate,
+            'memory_bytes': self.bloom.memory_bytes,
+            'watermark': self.watermark,
+            'lookups': self.lookups,
+            'lru_hits': self.lru_hits,
+            'bloom_negatives': self.bloom_negatives,
+            'bloom_positives': self.bloom_positives,
+            'false_positives': self.false_positives,
+            'rejected_without_db_ratio': round(self.lru_hits / self.lookups, 4) if self.lookups else 0.0,
+        }
+
+    def dumps(self) -> bytes:
+        """Снимок состояния: заголовок JSON, биты фильтров, ключи LRU"""
+        header = json.dumps({
+            'watermark': self.watermark,
+            'database': self.database,
+            'initial_capacity': self.bloom.initial_capacity,
+            'error_rate': self.bloom.error_rate,
+            'filters': [{'count': bloom.count, 'size': len(bloom.bits)} for bloom in self.bloom.filters],
+            'lru_size': self.lru_size,
+        }).encode('utf-8')
+        recent = '\n'.join(self._recent).encode('utf-8')
+        return b''.join([
+            _SNAPSHOT_MAGIC, struct.pack('<I', len(header)), header,
+            *(bytes(bloom.bits) for bloom in self.bloom.filters),
+            recent,
+        ])
+
+    def loads(self, data: bytes, database: Optional[str] = None, max_watermark: Optional[int] = None) -> bool:
+        """
+        Восстанавливает состояние из снимка. Возвращает False (состояние не меняется),
+        если снимок поврежден, сделан с другими параметрами фильтра, для другой БД
+        (database) или учитывает новости, которых в БД нет (watermark больше max_watermark).
+        """
+        try:
+            if not data.startswith(_SNAPSHOT_MAGIC):
+                return False
+            offset = len(_SNAPSHOT_MAGIC)
+            (header_size,) = struct.unpack_from('<I', data, offset)
+            offset += 4
+            header = json.loads(data[offset:offset + header_size])
+            offset += header_size
+            if (header['initial_capacity'], header['error_rate']) != (self.bloom.initial_capacity,
+                                                                      self.bloom.error_rate):
+                return False
+            if database is not None and header.get('database') != database:
+                return False
+            if max_watermark is not None and header['watermark'] > max_watermark:
+                return False
+
+            bloom = ScalableBloomFilter(self.bloom.initial_capacity, self.bloom.error_rate)
+            for info in header['filters']:
+                template = bloom._next_filter()
+                if len(template.bits) != info['size']:
+                    return False
+                template.bits = bytearray(data[offset:offset + info['size']])
+                template.count = info['count']
+                bloom.filters.append(template)
+                offset += info['size']
+
+            recent = data[offset:].decode('utf-8').split('\n') if offset < len(data) else []
+        except (ValueError, KeyError, struct.error, UnicodeDecodeError):
+            return False
+
+        self.bloom = bloom
+        self._recent = OrderedDict((key, None) for key in recent[-self.lru_size:])
+        self.watermark = header['watermark']
+        self.database = header.get('database', '')
+        return True
+
+
+def save_snapshot(path: str, data: bytes) -> None:
+    """
+    Атомарная запись снимка: через свой временный файл в том же каталоге,
+    поэтому одновременная запись из нескольких процессов не смешивает данные.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def load_snapshot(path: str) -> Optional[bytes]:
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,181 @@
+# server/utils/simhash.py
+"""
+SimHash отпечатки текста новостей и индекс для поиска почти-дубликатов.
+
+Репосты между каналами отличаются эмодзи, ссылкой, упоминанием канала или
+словом, поэтому точное сравнение заголовков их пропускает. SimHash дает 64-битный
+отпечаток, у похожих текстов отличающийся в немногих битах (расстояние Хэмминга).
+
+SimHashIndex ищет отпечатки на расстоянии не больше max_distance без перебора:
+отпечаток делится на max_distance + 1 полос, и по принципу Дирихле у двух
+отпечатков на таком расстоянии хотя бы одна полоса совпадает полностью. Поиск
+проверяет только отпечатки из тех же корзин полос.
+"""
+import hashlib
+import operator
+import re
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3
+
+_URL_RE = re.compile(r'https?://\S+|www\.\S+|t\.me/\S+|@\w+')
+_NON_WORD_RE = re.compile(r'[^\w\s]|_')
+
+# Для каждого бита байта - значения байта, в которых этот бит установлен
+_BYTE_VALUES_WITH_BIT = [operator.itemgetter(*[value for value in range(256) if value >> bit & 1]) for bit in range(8)]
+
+
+def normalize_text(text: str) -> str:
+    """Текст без ссылок, упоминаний, эмодзи и пунктуации, в нижнем регистре, с одиночными пробелами"""
+    text = _URL_RE.sub(' ', (text or '').lower())
+    return ' '.join(_NON_WORD_RE.sub(' ', text).split())
+
+
+def simhash(text: str) -> Optional[int]:
+    """
+    64-битный SimHash по символьным шинглам нормализованного текста.
+    Возвращает None для пустого текста.
+    """
+    normalized = normalize_text(text)
+    if not normalized:
+        return None
+
+    if len(normalized) <= SHINGLE_SIZE:
+        shingles = Counter([normalized])
+    else:
+        shingles = Counter([normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)])
+
+    # Веса значений байтов по позициям хеша, затем по битам: 8 операций на шингл
+    # вместо 64, а раскладка на биты - суммы по готовым спискам значений
+    byte_counts = [[0] * 256 for _ in range(SIMHASH_BITS // 8)]
+    for shingle, weight in shingles.items():
+        digest = hashlib.blake2b(shingle.encode('utf-8'), digest_size=SIMHASH_BITS // 8).digest()
+        for position, value in enumerate(digest):
+            byte_counts[position][value] += weight
+
+    half = sum(shingles.values()) / 2
+    result = 0
+    for position, counts in enumerate(byte_counts):
+        for bit, values_with_bit in enumerate(_BYTE_VALUES_WITH_BIT):
+            if sum(values_with_bit(counts)) > half:
+                result |= 1 << (position * 8 + bit)
+    return result
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def to_signed(value: int) -> int:
+    """Беззнаковый 64-битный отпечаток -> значение для колонки BIGINT"""
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def to_unsigned(value: int) -> int:
+    """Значение колонки BIGINT -> беззнаковый 64-битный отпечаток"""
+    return value & ((1 << SIMHASH_BITS) - 1)
+
+
+class SimHashIndex:
+    """
+    Индекс последних отпечатков для поиска почти-дубликатов.
+
+    Хранит не больше max_entries отпечатков (самые старые вытесняются), поэтому
+    стоимость поиска определяется размером окна, а не всего архива.
+    """
+
+    def __init__(self, max_distance: int, max_entries: int):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        bands = min(max_distance + 1, SIMHASH_BITS)
+        # Полосы (сдвиг, маска) почти равной ширины
+        self._bands: List[Tuple[int, int]] = []
+        start = 0
+        for band in range(bands):
+            width = SIMHASH_BITS // bands + (1 if band < SIMHASH_BITS % bands else 0)
+            self._bands.append((start, (1 << width) - 1))
+            start += width
+        # ключ -> отпечаток, в порядке добавления
+        self._hashes: "OrderedDict[Hashable, int]" = OrderedDict()
+        # (номер полосы, значение полосы) -> ключи
+        self._buckets: Dict[Tuple[int, int], Set[Hashable]] = {}
+        self.lookups = 0
+        self.candidates = 0
+        self.matches = 0
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def _band_keys(self, value: int):
+        for band, (shift, mask) in enumerate(self._bands):
+            yield band, (value >> shift) & mask
+
+    def add(self, key: Hashable, value: int) -> None:
+        if key in self._hashes:
+            self.remove(key)
+        self._hashes[key] = value
+        for band_key in self._band_keys(value):
+            self._buckets.setdefault(band_key, set()).add(key)
+        while len(self._hashes) > self.max_entries:
+            self.remove(next(iter(self._hashes)))
+
+    def remove(self, key: Hashable) -> None:
+        value = self._hashes.pop(key, None)
+        if value is None:
+            return
+        for band_key in self._band_keys(value):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def find(self, value: int) -> Optional[Tuple[Hashable, int]]:
+        """Ближайший отпечаток на расстоянии не больше max_distance: (ключ, расстояние) или None"""
+        self.lookups += 1
+        best: Optional[Tuple[Hashable, int]] = None
+        checked: Set[Hashable] = set()
+        for band_key in self._band_keys(value):
+            for key in self._buckets.get(band_key, ()):
+                if key in checked:
+                    continue
+                checked.add(key)
+                distance = hamming_distance(value, self._hashes[key])
+                if distance <= self.max_distance and (best is None or distance < best[1]):
+                    best = (key, distance)
+        self.candidates += len(checked)
+        if best is not None:
+            self.matches += 1
+        return best
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._hashes),
+            'max_entries': self.max_entries,
+            'max_distance': self.max_distance,
+            'bands': len(self._bands),
+            'lookups': self.lookups,
+            'matches': self.matches,
+            'candidates_per_lookup': round(self.candidates / self.lookups, 2) if self.lookups else 0.0,
+        }
+
+
+def dedupe_posts(posts: List[Dict], max_distance: int) -> List[Dict]:
+    """Оставляет первый пост из каждой группы почти-дубликатов (по тексту поста)"""
+    index = SimHashIndex(max_distance, max_entries=max(len(posts), 1))
+    unique = []
+    for number, post in enumerate(posts):
+        value = simhash(post_text(post))
+        if value is not None:
+            if index.find(value) is not None:
+                continue
+            index.add(number, value)
+        unique.append(post)
+    return unique
+
+
+def post_text(post: Dict) -> str:
+    """Текст поста для отпечатка: заголовок обычно повторяет начало текста, поэтому берется текст"""
+    return post.get('text') or post.get('title') or ''
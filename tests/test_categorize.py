@@ -0,0 +1,69 @@
+"""Категоризация по ключевым словам (server/utils/categorize.py)"""
+import pytest
+
+from server.utils.categorize import KeywordCategorizer
+
+KEYWORDS = {
+    'gifts': ['подарок', 'подарки', 'gift'],
+    'crypto': ['крипто', 'токен', 'блокчейн', 'defi'],
+    'nft': ['nft', 'блокчейн', 'коллекция'],
+    'tech': ['it', 'ai', 'технологии'],
+}
+
+
+@pytest.fixture(scope='module')
+def categorizer():
+    return KeywordCategorizer(KEYWORDS, priority=['gifts', 'crypto', 'nft', 'tech'])
+
+
+def test_long_keyword_matches_word_prefix(categorizer):
+    assert categorizer.matches('Новые токены в сети') == ['токен']
+
+
+def test_short_keyword_matches_only_whole_word(categorizer):
+    assert categorizer.matches('Инвестиции и bitcoin') == []
+    assert categorizer.matches('IT новости') == ['it']
+    assert categorizer.matches('AI, it.') == ['ai', 'it']
+
+
+def test_match_must_start_at_word_boundary(categorizer):
+    assert categorizer.matches('антитокен') == []
+
+
+def test_prefix_keywords_reported_with_longer_match():
+    categorizer = KeywordCategorizer({'crypto': ['крипто', 'криптовалюта', 'btc'], 'tech': ['bt']})
+    assert categorizer.matches('Криптовалюта дня') == ['криптовалюта', 'крипто']
+    assert categorizer.matches('криптобиржа') == ['крипто']
+    # Короткое "bt" - префикс "btc", но совпадает только целым словом
+    assert categorizer.matches('btc') == ['btc']
+
+
+def test_scores_count_distinct_keywords(categorizer):
+    assert categorizer.scores('токен токен крипто') == {'crypto': 2}
+    # Ключевое слово нескольких категорий добавляет очко каждой
+    assert categorizer.scores('блокчейн') == {'crypto': 1, 'nft': 1}
+
+
+def test_categorize_picks_highest_score(categorizer):
+    assert categorizer.categorize('NFT коллекция за токен') == 'nft'
+
+
+def test_categorize_ties_resolved_by_priority(categorizer):
+    assert categorizer.categorize('блокчейн') == 'crypto'
+    assert categorizer.categorize('Подарок', 'новые технологии') == 'gifts'
+
+
+def test_categorize_default(categorizer):
+    assert categorizer.categorize('Погода на завтра') == 'general'
+    assert KeywordCategorizer(KEYWORDS, default='other').categorize('') == 'other'
+
+
+def test_categorize_many_accepts_posts_pairs_and_strings(categorizer):
+    items = [
+        {'title': 'DeFi обзор', 'text': ''},
+        {'title': 'Новости', 'description': 'gift box'},
+        ('Новая коллекция', 'nft'),
+        'технологии',
+        'ничего',
+    ]
+    assert categorizer.categorize_many(items) == ['crypto', 'gifts', 'nft', 'tech', 'general']
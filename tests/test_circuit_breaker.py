@@ -0,0 +1,100 @@
+"""Автомат защиты источника (server/services/circuit_breaker.py)"""
+from server.services.circuit_breaker import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakers, SourceParseError, SourceUnavailable,
+)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(clock):
+    return CircuitBreaker('src', failure_threshold=3, cooldown=60, max_cooldown=300, clock=clock)
+
+
+def test_opens_after_threshold_failures():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(2):
+        breaker.record_failure('timeout')
+        assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure('timeout')
+    assert breaker.state == OPEN
+    assert breaker.retry_in() == 60
+    assert not breaker.allow()
+    assert breaker.skipped == 1
+
+
+def test_success_resets_failure_count():
+    breaker = make_breaker(FakeClock())
+    breaker.record_failure('a')
+    breaker.record_failure('b')
+    breaker.record_success()
+    breaker.record_failure('c')
+    assert breaker.state == CLOSED and breaker.consecutive_failures == 1
+
+
+def test_half_open_probe_success_closes():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(3):
+        breaker.record_failure('down')
+    clock.now += 60
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # Пока идет проба, второй запрос не пропускается
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.consecutive_failures == 0 and breaker.retry_in() == 0
+
+
+def test_half_open_probe_failure_reopens_with_longer_cooldown():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(3):
+        breaker.record_failure('down')
+    cooldowns = []
+    for _ in range(4):
+        clock.now += breaker.retry_in()
+        assert breaker.allow() and breaker.state == HALF_OPEN
+        breaker.record_failure('still down')
+        assert breaker.state == OPEN
+        cooldowns.append(breaker.retry_in())
+    assert cooldowns == [120, 240, 300, 300]
+
+
+def test_lost_probe_allows_new_probe_after_cooldown():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(3):
+        breaker.record_failure('down')
+    clock.now += 60
+    assert breaker.allow()
+    clock.now += 60
+    assert breaker.allow() and breaker.state == HALF_OPEN
+
+
+def test_row_roundtrip_and_dirty_rows():
+    clock = FakeClock()
+    breakers = CircuitBreakers(failure_threshold=1, cooldown=60, max_cooldown=300, clock=clock)
+    breakers.get('a').record_failure('x' * 1000)
+    breakers.get('b')
+    rows = breakers.take_dirty()
+    assert list(rows) == ['a']
+    assert rows['a']['health_state'] == OPEN and len(rows['a']['last_error']) == 500
+    assert breakers.take_dirty() == {}
+
+    restored = CircuitBreakers(failure_threshold=1, cooldown=60, max_cooldown=300, clock=clock)
+    restored.load(rows)
+    assert not restored.allow('a')
+    assert restored.retry_in('a') == 60
+    assert restored.retry_in('unknown') == 0
+
+
+def test_parse_error_is_source_unavailable():
+    assert issubclass(SourceParseError, SourceUnavailable)
@@ -0,0 +1,69 @@
+"""Выбор кодировки и сжатие ответов (server/utils/compression.py)"""
+import gzip
+
+import pytest
+
+from server.config import COMPRESSION_MIN_SIZE
+from server.utils import compression
+from server.utils.compression import choose_encoding, compression_stats, encoded_body, merge_vary
+
+LARGE_BODY = b'{"items": []}' * (COMPRESSION_MIN_SIZE // 10 + 1)
+
+
+@pytest.fixture
+def brotli_and_gzip(monkeypatch):
+    monkeypatch.setattr(compression, 'SUPPORTED_ENCODINGS', ('br', 'gzip'))
+
+
+@pytest.mark.parametrize('accept_encoding, expected', [
+    (None, None),
+    ('', None),
+    ('identity', None),
+    ('deflate', None),
+    ('gzip', 'gzip'),
+    ('gzip, br', 'br'),
+    ('br;q=0, gzip', 'gzip'),
+    ('BR;q=0.5, gzip;q=0.8', 'br'),
+    ('br;q=0, gzip;q=0', None),
+    ('br;q=abc, gzip', 'gzip'),
+    ('*', 'br'),
+    ('*;q=0', None),
+    ('br;q=0, *', 'gzip'),
+    ('gzip;q=0, *;q=0.1', 'br'),
+])
+def test_choose_encoding(brotli_and_gzip, accept_encoding, expected):
+    assert choose_encoding(accept_encoding) == expected
+
+
+@pytest.mark.parametrize('body, accept_encoding', [
+    (LARGE_BODY, None),
+    (LARGE_BODY, 'identity'),
+    (b'{}', 'gzip'),
+])
+def test_uncompressed_body_still_varies(body, accept_encoding):
+    data, headers = encoded_body(body, accept_encoding)
+    assert data == body
+    assert headers == {'Vary': 'Accept-Encoding'}
+
+
+def test_encoded_body_reuses_cached_variant():
+    cached = {}
+    data, headers = encoded_body(LARGE_BODY, 'gzip', cached)
+    assert headers == {'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'}
+    assert gzip.decompress(data) == LARGE_BODY
+    assert cached == {'gzip': data}
+
+    precompressed = compression_stats.precompressed
+    assert encoded_body(LARGE_BODY, 'gzip', cached) == (data, headers)
+    assert compression_stats.precompressed == precompressed + 1
+
+
+@pytest.mark.parametrize('vary, expected', [
+    (None, b'Accept-Encoding'),
+    (b'', b'Accept-Encoding'),
+    (b'Origin', b'Origin, Accept-Encoding'),
+    (b'Origin, accept-encoding', b'Origin, accept-encoding'),
+    (b'*', b'*'),
+])
+def test_merge_vary(vary, expected):
+    assert merge_vary(vary) == expected
@@ -0,0 +1,35 @@
+"""Курсор keyset пагинации GET /api/news/ (server/api/news.py)"""
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from server.api.news import make_cursor, parse_cursor
+
+
+def test_cursor_round_trip():
+    item = SimpleNamespace(publish_date=datetime(2025, 3, 1, 12, 30, 15, 123456), id=42)
+    assert parse_cursor(make_cursor(item)) == (item.publish_date, 42)
+
+
+def test_cursor_converts_timezone_to_naive_utc():
+    expected = (datetime(2025, 3, 1, 9, 0), 7)
+    assert parse_cursor('2025-03-01T09:00:00Z,7') == expected
+    assert parse_cursor('2025-03-01T12:00:00+03:00,7') == expected
+    assert parse_cursor(' 2025-03-01T09:00:00 , 7') == expected
+
+
+@pytest.mark.parametrize('cursor', [
+    '',
+    'abc',
+    '2025-03-01T09:00:00',
+    '2025-03-01T09:00:00,',
+    '2025-03-01T09:00:00,abc',
+    'not-a-date,7',
+    ',7',
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        parse_cursor(cursor)
+    assert error.value.status_code == 400
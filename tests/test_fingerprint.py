@@ -0,0 +1,34 @@
+"""Ключ новости и его заполнение для существующих строк"""
+from server.services.dedup_service import plan_fingerprints
+from server.utils.fingerprint import news_fingerprint, normalize_title
+
+
+def test_normalize_title_uses_python_whitespace_and_case():
+    assert normalize_title('\n Подарок ДНЯ\t') == 'подарок дня'
+    assert normalize_title('GIFT drop  ') == 'gift drop'
+    assert normalize_title(None) == ''
+
+
+def test_fingerprint_ignores_whitespace_and_case():
+    assert news_fingerprint('\nПодарок дня\t') == news_fingerprint('подарок дня')
+    assert news_fingerprint('Подарок дня') != news_fingerprint('Подарок недели')
+
+
+def test_plan_fills_and_fixes_keys():
+    rows = [
+        (1, 'Подарок дня', None),
+        (2, 'Новость', 'stale-key'),
+        (3, 'Готово', news_fingerprint('Готово')),
+    ]
+    assert plan_fingerprints(rows, set()) == [(1, news_fingerprint('Подарок дня')), (2, news_fingerprint('Новость'))]
+
+
+def test_plan_skips_taken_keys_and_later_duplicates():
+    taken = {news_fingerprint('Уже есть')}
+    rows = [
+        (1, 'Уже есть', None),
+        (2, 'Дубликат', None),
+        (3, ' дубликат ', None),
+    ]
+    assert plan_fingerprints(rows, taken) == [(2, news_fingerprint('Дубликат'))]
+    assert news_fingerprint('Дубликат') in taken
@@ -0,0 +1,39 @@
+"""ETag и условные запросы (server/utils/http_cache.py)"""
+import pytest
+
+from server.utils.http_cache import cache_headers, etag_matches, make_etag
+
+
+def test_make_etag_is_weak_and_stable():
+    etag = make_etag('11:5', 'news', 20)
+    assert etag.startswith('W/"') and etag.endswith('"')
+    assert etag == make_etag('11:5', 'news', 20)
+    assert etag != make_etag('12:5', 'news', 20)
+
+
+@pytest.mark.parametrize('if_none_match, expected', [
+    ('W/"abc"', True),
+    ('"abc"', True),
+    ('W/"other", W/"abc"', True),
+    ('"other","abc"', True),
+    ('*', True),
+    (' * ', True),
+    ('W/"other"', False),
+    ('abc', False),
+    ('', False),
+    (None, False),
+])
+def test_etag_matches_weak_comparison(if_none_match, expected):
+    assert etag_matches(if_none_match, 'W/"abc"') is expected
+
+
+def test_etag_matches_strong_etag():
+    assert etag_matches('W/"abc"', '"abc"')
+    assert not etag_matches('W/"abd"', '"abc"')
+
+
+def test_cache_headers():
+    assert cache_headers('W/"abc"', 10, 30) == {
+        'ETag': 'W/"abc"',
+        'Cache-Control': 'public, max-age=10, stale-while-revalidate=30',
+    }
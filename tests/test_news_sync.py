@@ -0,0 +1,144 @@
+"""Граница зафиксированных новостей и синхронизация процессов (server/services/news_sync.py)"""
+import asyncio
+
+import pytest
+
+import server.api.news
+import server.db
+import server.services.dedup_service
+import server.utils.cache
+from server.services import news_sync as news_sync_module
+from server.services.news_sync import NewsSync, _HORIZON_SQL
+from server.utils.cache import ResponseCache
+
+
+def test_advance_waits_for_lower_id_in_flight():
+    sync = NewsSync()
+    # Транзакция 100 взяла id 1, транзакция 101 - id 2 и зафиксировалась первой
+    assert sync.advance(2, 100, 102) is None
+    # Пока 100 не завершена, xmin снимка не доходит до xmax, запомненного для id 2
+    assert sync.advance(2, 100, 102) is None
+    assert sync.advance(2, 100, 102) is None
+    # Транзакция 100 зафиксировалась
+    assert sync.advance(2, 102, 102) == 2
+
+
+def test_advance_needs_two_checks_after_insert():
+    sync = NewsSync()
+    assert sync.advance(None, 10, 10) is None
+    assert sync.advance(None, 10, 10) == 0
+    # id 1 выдан, но транзакция, взявшая его, в снимке еще может не быть видна
+    assert sync.advance(1, 10, 10) == 0
+    assert sync.advance(1, 11, 11) == 1
+
+
+def test_advance_is_monotonic_while_inserts_continue():
+    sync = NewsSync()
+    settled = []
+    for check in range(10):
+        # Каждую проверку выдается новый id, транзакция с предыдущим еще открыта
+        settled.append(sync.advance(check + 1, 100 + check, 101 + check))
+    values = [value for value in settled if value is not None]
+    assert values == sorted(values)
+    assert values[-1] < 10
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def one(self):
+        return self.rows[0]
+
+    def all(self):
+        return self.rows
+
+
+class FakeDatabase:
+    """Таблица news_items и снимок транзакций, которые видит проверка"""
+
+    def __init__(self):
+        self.committed = {}
+        self.sequence = None
+        self.xmin = self.xmax = 1
+
+    def commit(self, news_id):
+        self.committed[news_id] = (news_id, f"fp-{news_id}", news_id)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        if statement is _HORIZON_SQL:
+            return FakeResult([(self.sequence, self.xmin, self.xmax)])
+        params = statement.compile().params
+        last_id, settled_id, limit = params['id_1'], params['id_2'], params['param_1']
+        ids = sorted(news_id for news_id in self.committed if last_id < news_id <= settled_id)
+        return FakeResult([self.committed[news_id] for news_id in ids[:limit]])
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+
+    async def load_data_version(db):
+        return str(max(database.committed, default=0))
+
+    monkeypatch.setattr(server.db, 'AsyncSessionLocal', lambda: database)
+    monkeypatch.setattr(news_sync_module, 'load_data_version', load_data_version)
+    monkeypatch.setattr(server.utils.cache, 'news_cache', ResponseCache(max_entries=10, ttl=60))
+    database.published = []
+    database.remembered = []
+
+    async def publish_new_items(news_ids):
+        database.published.append(news_ids)
+
+    monkeypatch.setattr(server.api.news, 'publish_new_items', publish_new_items)
+    monkeypatch.setattr(server.services.dedup_service, 'remember_saved', database.remembered.extend)
+    return database
+
+
+def test_sync_publishes_late_commit_in_order(database):
+    sync = NewsSync(batch=100)
+    for news_id in (1, 2, 3):
+        database.commit(news_id)
+    database.sequence, database.xmin, database.xmax = 3, 50, 50
+    asyncio.run(sync.sync_once())
+    asyncio.run(sync.sync_once())
+    # Новости до запуска процесса подписчикам не отдаются
+    assert sync.last_id == 3 and database.published == []
+
+    # Транзакция 50 взяла id 4, транзакция 51 - id 5 (своя) и зафиксировалась первой
+    database.sequence, database.xmax = 5, 52
+    database.commit(5)
+    sync.note_local([5])
+    for _ in range(3):
+        assert asyncio.run(sync.sync_once()) == 0
+    assert sync.settled_id == 3 and database.published == []
+
+    database.commit(4)
+    database.xmin = 52
+    assert asyncio.run(sync.sync_once()) == 1
+    assert database.published == [[4, 5]]
+    assert database.remembered == [(4, 'fp-4', 4)]
+    assert sync.last_id == 5 and sync.stats()['synced'] == 1
+
+
+def test_sync_reads_backlog_in_batches(database):
+    sync = NewsSync(batch=2)
+    database.sequence, database.xmin, database.xmax = 0, 10, 10
+    asyncio.run(sync.sync_once())
+    asyncio.run(sync.sync_once())
+    assert sync.last_id == 0
+
+    for news_id in range(1, 6):
+        database.commit(news_id)
+    database.sequence = 5
+    database.xmin = database.xmax = 11
+    for _ in range(4):
+        asyncio.run(sync.sync_once())
+    assert database.published == [[1, 2], [3, 4], [5]]
+    assert sync.last_id == 5
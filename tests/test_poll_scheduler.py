@@ -0,0 +1,120 @@
+"""Адаптивное расписание опроса источников (server/services/poll_scheduler.py)"""
+import pytest
+
+from server.services.poll_scheduler import ERROR, NOT_MODIFIED, OK, PollScheduler, poll_outcome
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def scheduler(clock):
+    # Без случайного разброса сроки опроса точные
+    return PollScheduler(min_interval=60, max_interval=3600, target_items=2, default_interval=600,
+                         empty_backoff=2, error_backoff=30, jitter=0, clock=clock)
+
+
+@pytest.mark.parametrize('status, outcome', [(200, OK), (304, NOT_MODIFIED), (0, ERROR), (500, ERROR)])
+def test_poll_outcome(status, outcome):
+    assert poll_outcome(status) == outcome
+
+
+def test_sources_popped_in_due_order(scheduler, clock):
+    scheduler.add('slow', delay=100)
+    scheduler.add('fast', delay=10)
+    scheduler.add('later', delay=500)
+    assert scheduler.next_run_in() == 10
+    assert scheduler.pop_due(window=0) == []
+
+    clock.now = 10
+    assert scheduler.pop_due(window=95) == ['fast', 'slow']
+    assert scheduler.next_run_in() == 490
+    assert scheduler.stats()['running'] == 2
+
+
+def test_interval_from_rate(scheduler):
+    scheduler.add('unknown')
+    scheduler.add('busy', rate=2 / 120)
+    scheduler.add('quiet', rate=0.0)
+    intervals = {entry['name']: entry['interval'] for entry in scheduler.stats()['schedule']}
+    assert intervals == {'unknown': 600, 'busy': 120, 'quiet': 3600}
+
+
+def test_add_existing_source_updates_rate_only(scheduler, clock):
+    scheduler.add('a', delay=50)
+    scheduler.add('a', rate=1.0, delay=0)
+    assert len(scheduler) == 1
+    assert scheduler.next_run_in() == 50
+
+
+def test_empty_polls_lengthen_interval(scheduler, clock):
+    scheduler.add('a')
+    intervals = []
+    for _ in range(4):
+        scheduler.pop_due()
+        intervals.append(scheduler.record('a', NOT_MODIFIED))
+        clock.now += intervals[-1]
+    # Частота затухает, интервал растет не меньше чем вдвое за опрос, до max_interval
+    assert intervals[0] == 1200
+    assert all(later >= earlier * 2 or later == 3600 for earlier, later in zip(intervals, intervals[1:]))
+    assert intervals[-1] == 3600
+
+
+def test_new_items_shorten_interval(scheduler, clock):
+    scheduler.add('a')
+    scheduler.pop_due()
+    # Первый опрос забирает накопившееся и частоту не меняет
+    assert scheduler.record('a', OK, new_items=5) == 600
+    intervals = []
+    for _ in range(5):
+        clock.now += 60
+        scheduler.pop_due(window=3600)
+        intervals.append(scheduler.record('a', OK, new_items=10))
+    assert intervals == sorted(intervals, reverse=True) and intervals[0] < 600
+    assert scheduler.stats()['new_items'] == 55
+    assert scheduler.stats()['schedule'][0]['posts_per_hour'] > 3600 * 2 / 600
+
+
+def test_errors_back_off_exponentially_and_reset(scheduler, clock):
+    scheduler.add('a')
+    intervals = []
+    for _ in range(4):
+        scheduler.pop_due(window=3600)
+        intervals.append(scheduler.record('a', ERROR))
+    assert intervals == [30, 60, 120, 240]
+    assert scheduler.next_run_in() == 240
+
+    scheduler.pop_due(window=3600)
+    assert scheduler.record('a', OK, new_items=1) == 600
+    assert scheduler.stats()['errors'] == 4
+
+
+def test_defer_and_requeue_running(scheduler, clock):
+    scheduler.add('a')
+    scheduler.add('b')
+    assert sorted(scheduler.pop_due()) == ['a', 'b']
+    scheduler.defer('a', 300)
+    scheduler.requeue_running()
+    assert scheduler.stats()['running'] == 0
+    assert scheduler.pop_due(window=0) == ['b']
+    clock.now = 300
+    assert scheduler.pop_due(window=0) == ['a']
+
+
+def test_jitter_spreads_next_run(clock):
+    scheduler = PollScheduler(min_interval=60, max_interval=3600, target_items=2, default_interval=600,
+                              empty_backoff=2, error_backoff=30, jitter=0.1, clock=clock)
+    scheduler.add('a')
+    scheduler.pop_due()
+    interval = scheduler.record('a', OK, new_items=1)
+    assert interval * 0.9 <= scheduler.next_run_in() <= interval * 1.1
@@ -0,0 +1,84 @@
+"""Кэш готовых ответов API (server/utils/cache.py)"""
+import pytest
+
+from server.utils import cache as cache_module
+from server.utils.cache import ResponseCache
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module.time, 'monotonic', clock)
+    return clock
+
+
+def test_set_get_and_ttl(clock):
+    cache = ResponseCache(max_entries=10, ttl=60)
+    cache.set('a', b'body')
+    assert cache.get('a') == b'body'
+    clock.now += 61
+    assert cache.get('a') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_lru_eviction(clock):
+    cache = ResponseCache(max_entries=2, ttl=60)
+    cache.set('a', b'1')
+    cache.set('b', b'2')
+    assert cache.get('a') == b'1'
+    cache.set('c', b'3')
+    assert cache.get('b') is None
+    assert cache.get('a') == b'1' and cache.get('c') == b'3'
+    assert cache.evictions == 1
+
+
+def test_data_version_change_invalidates(clock):
+    cache = ResponseCache(max_entries=10, ttl=60)
+    assert cache.set_data_version('10:5')
+    cache.set('a', b'old')
+    generation = cache.generation
+
+    # Та же версия - сохраненные ответы остаются
+    assert not cache.set_data_version('10:5')
+    assert cache.generation == generation
+    assert cache.get('a') == b'old'
+
+    assert cache.set_data_version('11:5')
+    assert cache.version == '11:5'
+    assert cache.generation == generation + 1
+    assert cache.get('a') is None
+
+
+def test_stale_generation_is_not_stored(clock):
+    cache = ResponseCache(max_entries=10, ttl=60)
+    generation = cache.generation
+    # Пока ответ строился, данные обновились
+    cache.set_data_version('12:0')
+    cache.set('a', b'stale', generation=generation)
+    assert cache.get('a') is None
+    cache.set('a', b'fresh', generation=cache.generation)
+    assert cache.get('a') == b'fresh'
+
+
+def test_variants_live_with_entry(clock):
+    cache = ResponseCache(max_entries=10, ttl=60)
+    cache.set('a', b'body')
+    body, variants = cache.get_entry('a')
+    variants['gzip'] = b'compressed'
+    assert cache.get_entry('a') == (b'body', {'gzip': b'compressed'})
+
+
+@pytest.mark.parametrize('max_entries, ttl', [(0, 60), (10, 0)])
+def test_disabled_cache_stores_nothing(clock, max_entries, ttl):
+    cache = ResponseCache(max_entries=max_entries, ttl=ttl)
+    cache.set('a', b'body')
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 0
@@ -0,0 +1,89 @@
+"""Множество уже обработанных новостей и его снимок (server/utils/seen_set.py)"""
+import os
+
+import pytest
+
+from server.utils.seen_set import MAYBE, NEW, SEEN, SeenSet, load_snapshot, save_snapshot
+
+
+def make_set(lru_size=3):
+    return SeenSet(lru_size=lru_size, initial_capacity=100, error_rate=0.001)
+
+
+def test_check_seen_maybe_new():
+    seen_set = make_set(lru_size=2)
+    seen_set.update(['a', 'b', 'c'])
+    # 'a' вытеснен из LRU, но остался в фильтре Блума
+    assert seen_set.check('c') == SEEN
+    assert seen_set.check('a') == MAYBE
+    assert seen_set.check('d') == NEW
+    stats = seen_set.stats()
+    assert (stats['lookups'], stats['lru_hits'], stats['bloom_positives'], stats['bloom_negatives']) == (3, 1, 1, 1)
+
+
+def test_check_refreshes_lru_order():
+    seen_set = make_set(lru_size=2)
+    seen_set.update(['a', 'b'])
+    assert seen_set.check('a') == SEEN
+    seen_set.add('c')
+    assert seen_set.check('a') == SEEN
+    assert seen_set.check('b') == MAYBE
+
+
+def test_no_false_negatives_across_filter_growth():
+    seen_set = SeenSet(lru_size=10, initial_capacity=50, error_rate=0.01)
+    keys = [f"key-{number}" for number in range(1000)]
+    seen_set.update(keys)
+    assert len(seen_set.bloom.filters) > 1
+    # Ключи, на которых фильтр уже срабатывал, повторно не считаются
+    assert len(keys) * 0.95 < len(seen_set) <= len(keys)
+    assert all(seen_set.check(key) in (SEEN, MAYBE) for key in keys)
+    false_positives = sum(seen_set.check(f"other-{number}") != NEW for number in range(2000))
+    assert false_positives < 2000 * 0.01 * 3
+
+
+def test_snapshot_roundtrip():
+    seen_set = make_set()
+    seen_set.update(['a', 'b', 'c', 'd'])
+    seen_set.watermark = 42
+    seen_set.database = 'news:16384'
+
+    restored = make_set()
+    assert restored.loads(seen_set.dumps(), database='news:16384', max_watermark=42)
+    assert (restored.watermark, restored.database) == (42, 'news:16384')
+    assert [restored.check(key) for key in 'abcd'] == [MAYBE, SEEN, SEEN, SEEN]
+    assert restored.check('e') == NEW
+
+
+def test_snapshot_rejected_for_other_database_or_newer_watermark():
+    seen_set = make_set()
+    seen_set.add('a')
+    seen_set.watermark = 42
+    seen_set.database = 'news:16384'
+    data = seen_set.dumps()
+
+    restored = make_set()
+    assert not restored.loads(data, database='other:16385')
+    # Снимок учитывает новости, которых в БД нет (БД сброшена)
+    assert not restored.loads(data, max_watermark=41)
+    assert (restored.watermark, restored.check('a')) == (0, NEW)
+
+
+@pytest.mark.parametrize('data', [b'', b'garbage', b'SEENSET1\x05\x00\x00\x00{bad'])
+def test_corrupted_snapshot_rejected(data):
+    assert not make_set().loads(data)
+
+
+def test_snapshot_with_other_filter_parameters_rejected():
+    data = make_set().dumps()
+    assert not SeenSet(lru_size=3, initial_capacity=200, error_rate=0.001).loads(data)
+
+
+def test_save_and_load_snapshot_file(tmp_path):
+    path = os.path.join(tmp_path, 'cache', 'seen_set.bin')
+    assert load_snapshot(path) is None
+    save_snapshot(path, b'first')
+    save_snapshot(path, b'second')
+    assert load_snapshot(path) == b'second'
+    # Временные файлы не остаются в каталоге
+    assert os.listdir(os.path.dirname(path)) == ['seen_set.bin']
@@ -0,0 +1,113 @@
+"""SimHash и индекс почти-дубликатов по полосам (server/utils/simhash.py)"""
+import random
+
+from server.utils.simhash import (
+    SIMHASH_BITS, SimHashIndex, dedupe_posts, hamming_distance, normalize_text, simhash, to_signed, to_unsigned,
+)
+
+
+def flip(value, bits):
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+
+def test_find_within_max_distance_for_any_bit_spread():
+    # Изменения в разных полосах: по принципу Дирихле одна полоса все равно совпадает
+    rng = random.Random(1)
+    index = SimHashIndex(max_distance=3, max_entries=100)
+    base = rng.getrandbits(SIMHASH_BITS)
+    index.add('base', base)
+    for _ in range(200):
+        bits = rng.sample(range(SIMHASH_BITS), rng.randint(0, 3))
+        assert index.find(flip(base, bits)) == ('base', len(bits))
+
+
+def test_find_ignores_hashes_beyond_max_distance():
+    index = SimHashIndex(max_distance=3, max_entries=100)
+    base = (1 << SIMHASH_BITS) - 1
+    index.add('base', base)
+    # Четыре бита в первой полосе: остальные полосы совпадают, но расстояние больше порога
+    assert index.find(flip(base, [0, 1, 2, 3])) is None
+    assert index.stats()['lookups'] == 1 and index.stats()['matches'] == 0
+
+
+def test_find_matches_brute_force():
+    rng = random.Random(2)
+    index = SimHashIndex(max_distance=4, max_entries=1000)
+    stored = {}
+    for key in range(300):
+        value = rng.getrandbits(SIMHASH_BITS)
+        if key % 3 == 0 and stored:
+            value = flip(rng.choice(list(stored.values())), rng.sample(range(SIMHASH_BITS), rng.randint(1, 6)))
+        stored[key] = value
+        index.add(key, value)
+
+    for _ in range(300):
+        probe = flip(rng.choice(list(stored.values())), rng.sample(range(SIMHASH_BITS), rng.randint(0, 6)))
+        distances = [hamming_distance(probe, value) for value in stored.values()]
+        nearest = min(distances)
+        found = index.find(probe)
+        if nearest > 4:
+            assert found is None
+        else:
+            assert found is not None and found[1] == nearest
+            assert hamming_distance(probe, stored[found[0]]) == nearest
+
+
+def test_find_returns_nearest():
+    index = SimHashIndex(max_distance=3, max_entries=10)
+    index.add('far', flip(0, [1, 20, 40]))
+    index.add('near', flip(0, [50]))
+    assert index.find(0) == ('near', 1)
+
+
+def test_oldest_entries_evicted():
+    index = SimHashIndex(max_distance=2, max_entries=2)
+    index.add('a', 0)
+    index.add('b', flip(0, range(0, 64, 2)))
+    index.add('c', flip(0, range(1, 64, 2)))
+    assert len(index) == 2
+    assert index.find(0) is None
+    assert index.find(flip(0, range(1, 64, 2))) == ('c', 0)
+
+
+def test_readd_and_remove_update_buckets():
+    index = SimHashIndex(max_distance=2, max_entries=10)
+    index.add('a', 0)
+    index.add('a', (1 << SIMHASH_BITS) - 1)
+    assert len(index) == 1
+    assert index.find(0) is None
+    index.remove('a')
+    index.remove('missing')
+    assert len(index) == 0 and index.find((1 << SIMHASH_BITS) - 1) is None
+
+
+def test_signed_roundtrip():
+    for value in (0, 1, (1 << 63) - 1, 1 << 63, (1 << SIMHASH_BITS) - 1):
+        signed = to_signed(value)
+        assert -(1 << 63) <= signed < 1 << 63
+        assert to_unsigned(signed) == value
+
+
+def test_simhash_ignores_links_mentions_and_punctuation():
+    assert normalize_text('Новые  подарки!!! https://t.me/x @channel 🎁') == 'новые подарки'
+    assert simhash('Новые подарки уже в продаже') == simhash('🎁 Новые подарки — уже в продаже! @gift_newstg')
+    assert simhash('') is None and simhash('🎁 !!!') is None
+
+
+def test_simhash_similar_texts_are_close():
+    text = 'Telegram запустил новые подарки, которые можно улучшить до NFT и продать на маркетплейсе'
+    near = simhash(text + ' Подробнее')
+    other = simhash('Биткоин обновил максимум на фоне притока средств в ETF')
+    assert hamming_distance(simhash(text), near) < hamming_distance(simhash(text), other)
+
+
+def test_dedupe_posts_keeps_first_of_group():
+    posts = [
+        {'title': 'a', 'text': 'Telegram запустил новые подарки, которые можно улучшить до NFT'},
+        {'title': 'b', 'text': 'Telegram запустил новые подарки, которые можно улучшить до NFT 🎁 @repost'},
+        {'title': 'c', 'text': 'Биткоин обновил максимум на фоне притока средств в ETF'},
+        {'title': 'd', 'text': ''},
+    ]
+    assert [post['title'] for post in dedupe_posts(posts, 3)] == ['a', 'c', 'd']
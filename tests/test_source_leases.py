@@ -0,0 +1,116 @@
+"""Аренда источников ведущими процессами (SourceLeases, server/services/leader.py)"""
+import asyncio
+
+import pytest
+
+import server.db
+import server.services.news_service
+import server.services.source_service
+from server.services.leader import SourceLeases
+
+SOURCES = {name: {} for name in ('a', 'b', 'c', 'd')}
+
+
+class FakeLeaseTable:
+    """Столбцы lease_owner / lease_until news_sources с теми же правилами, что в source_service"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.leases = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        pass
+
+    async def get_or_create_sources(self, db, sources):
+        for name in sources:
+            self.leases.setdefault(name, (None, None))
+
+    async def acquire(self, db, names, owner, ttl):
+        taken = []
+        for name in names:
+            lease_owner, until = self.leases[name]
+            if lease_owner is None or lease_owner == owner or until is None or until < self.now:
+                self.leases[name] = (owner, self.now + ttl)
+                taken.append(name)
+        return taken
+
+    async def renew(self, db, owner, ttl):
+        names = [name for name, (lease_owner, _) in self.leases.items() if lease_owner == owner]
+        for name in names:
+            self.leases[name] = (owner, self.now + ttl)
+        return names
+
+    async def release(self, db, owner, names=None):
+        for name, (lease_owner, _) in self.leases.items():
+            if lease_owner == owner and (names is None or name in names):
+                self.leases[name] = (None, None)
+
+    def owned_by(self, owner):
+        return {name for name, (lease_owner, _) in self.leases.items() if lease_owner == owner}
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = FakeLeaseTable()
+    monkeypatch.setattr(server.db, 'AsyncSessionLocal', lambda: table)
+    monkeypatch.setattr(server.services.news_service, 'get_or_create_sources', table.get_or_create_sources)
+    monkeypatch.setattr(server.services.source_service, 'acquire_source_leases', table.acquire)
+    monkeypatch.setattr(server.services.source_service, 'renew_source_leases', table.renew)
+    monkeypatch.setattr(server.services.source_service, 'release_source_leases', table.release)
+    return table
+
+
+def test_acquire_is_exclusive_until_expiry(table):
+    first, second = SourceLeases('first', ttl=30), SourceLeases('second', ttl=30)
+    assert asyncio.run(first.acquire(SOURCES)) == set(SOURCES)
+    assert asyncio.run(second.acquire(SOURCES)) == set()
+
+    # Продление держит аренду дольше ttl от первого захвата
+    table.now += 20
+    asyncio.run(first.renew())
+    table.now += 20
+    assert asyncio.run(second.acquire(SOURCES)) == set()
+
+    # Владелец перестал продлевать (упал) - после ttl источники забирает другой
+    table.now += 31
+    assert asyncio.run(second.acquire(SOURCES)) == set(SOURCES)
+    asyncio.run(first.renew())
+    assert first.held == set()
+    assert table.owned_by('second') == set(SOURCES)
+
+
+def test_acquire_trims_new_sources_to_share(table):
+    leases = SourceLeases('first', ttl=30)
+    leases.share = 2
+    owned = asyncio.run(leases.acquire(SOURCES))
+    assert len(owned) == 2 and leases.held == owned
+    # Лишние сразу освобождены для других ведущих
+    assert table.owned_by('first') == owned
+    assert table.owned_by(None) == set(SOURCES) - owned
+
+    # Уже арендованные остаются за владельцем, новые сверх доли не берутся
+    kept = sorted(owned)[0]
+    free = sorted(set(SOURCES) - owned)[0]
+    assert asyncio.run(leases.acquire({kept: {}, free: {}})) == {kept}
+    assert leases.held == owned
+    assert table.owned_by(None) == set(SOURCES) - owned
+
+
+def test_rebalance_and_release(table):
+    first, second = SourceLeases('first', ttl=30), SourceLeases('second', ttl=30)
+    asyncio.run(first.acquire(SOURCES))
+    # Появился второй ведущий: первый отдает источники сверх половины
+    asyncio.run(first.rebalance(len(SOURCES), 2))
+    assert first.share == 2 and first.held == {'a', 'b'}
+    assert asyncio.run(second.acquire(SOURCES)) == {'c', 'd'}
+
+    asyncio.run(first.release())
+    assert first.held == set() and first.share is None
+    assert table.owned_by(None) == {'a', 'b'}
+    assert table.owned_by('second') == {'c', 'd'}
@@ -0,0 +1,97 @@
+"""Однопроходный парсер страниц t.me (server/parsers/telegram_html.py) на fixtures/telegram"""
+import copy
+import os
+
+import pytest
+
+from server.parsers.telegram_html import _scan_page, build_posts, parse_telegram_updates, parse_views
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fixtures', 'telegram')
+
+CHANNEL = {'name': 'Gift News TG', 'username': 'gift_newstg', 'category': 'gifts'}
+# На странице сообщения 4810..4829, от старых к новым
+FIRST_ID, LAST_ID = 4810, 4829
+
+
+@pytest.fixture(scope='module')
+def page():
+    with open(os.path.join(FIXTURES_DIR, 'gift_newstg.html'), encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.fixture(scope='module')
+def messages(page):
+    return _scan_page(page)[0]
+
+
+def ids(items):
+    return [item['message_id'] for item in items]
+
+
+def test_scan_page_returns_all_messages_in_page_order(page):
+    messages, reached = _scan_page(page)
+    assert ids(messages) == list(range(FIRST_ID, LAST_ID + 1))
+    assert reached is False
+    assert messages[0]['post'] == 'gift_newstg/4810'
+    assert messages[0]['date'] == '2025-01-10T10:10:00+00:00'
+    assert messages[0]['photo']
+
+
+def test_scan_page_stops_at_seen_message(page):
+    messages, reached = _scan_page(page, after_id=4819)
+    assert ids(messages) == list(range(4820, LAST_ID + 1))
+    assert reached is True
+
+
+def test_scan_page_after_last_message(page):
+    assert _scan_page(page, after_id=LAST_ID) == ([], True)
+
+
+def test_scan_page_after_id_older_than_page(page):
+    # Отметка старше всей страницы: новых сообщений может быть больше страницы
+    messages, reached = _scan_page(page, after_id=FIRST_ID - 100)
+    assert ids(messages) == list(range(FIRST_ID, LAST_ID + 1))
+    assert reached is False
+
+
+def test_scan_page_ignores_markup_without_messages():
+    assert _scan_page('<html><body><div class="tgme_header" data-post="x/1"></div></body></html>') == ([], False)
+
+
+def test_parse_telegram_updates(page):
+    posts, new_ids, reached = parse_telegram_updates(page.encode('utf-8'), CHANNEL, after_id=4826)
+    assert new_ids == [4827, 4828, 4829]
+    assert ids(posts) == [4827, 4828, 4829]
+    assert reached is True
+
+
+def test_build_posts_limit_keeps_newest_in_page_order(messages):
+    posts = build_posts(messages, CHANNEL, limit=3)
+    assert ids(posts) == [4827, 4828, 4829]
+    assert posts[-1]['id'] == 'gift_newstg/4829'
+    assert posts[-1]['link'] == 'https://t.me/gift_newstg/4829'
+    assert posts[-1]['channel'] == 'gift_newstg'
+
+
+def test_build_posts_limit_counts_only_messages_with_text(messages):
+    messages = copy.deepcopy(messages)
+    messages[-1]['text'] = ''
+    messages[-3]['text'] = ''
+    assert ids(build_posts(messages, CHANNEL, limit=3)) == [4825, 4826, 4828]
+
+
+def test_build_posts_without_limit(messages):
+    assert ids(build_posts(messages, CHANNEL, limit=None)) == list(range(FIRST_ID, LAST_ID + 1))
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('845', 845),
+    ('1.2K', 1200),
+    ('12.3K', 12300),
+    ('3M', 3000000),
+    ('', None),
+    (None, None),
+    ('n/a', None),
+])
+def test_parse_views(value, expected):
+    assert parse_views(value) == expected